@@ -3,6 +3,13 @@ ASGI config for administrador project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Es la forma de servir el proyecto para la pantalla de cocina en vivo (SSE) y las
+vistas async; bajo runserver/WSGI el flujo de eventos responde 501:
+
+    DJANGO_SETTINGS_MODULE=administrador.settings_produccion uvicorn administrador.asgi:application
+
+Un solo proceso: el canal de eventos por defecto vive en memoria del proceso.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurante.metricas.metricas_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,10 @@ ROOT_URLCONF = 'administrador.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de renderizado (restaurante/metricas.py)
+        'BACKEND': 'restaurante.metricas.PlantillasMedidas',
+        # El alias se tomaría del módulo ('metricas'): se mantiene engines['django']
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -68,6 +72,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'administrador.wsgi.application'
+ASGI_APPLICATION = 'administrador.asgi.application'
 
 
 # Database
@@ -77,9 +82,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Pedidos cerrados viejos que saca de la principal manage.py archivar_pedidos
+    # (restaurante/archivo.py); el comando crea y migra la base
+    'archivo': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'archivo.sqlite3',
+    },
 }
 
+DATABASE_ROUTERS = ['restaurante.archivo.RouterArchivo']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -120,3 +133,26 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+
+# Tickets PDF: procesos del pool que ejecuta xhtml2pdf (0 = en el mismo proceso)
+# y segundos máximos de espera por un ticket desde la vista
+TICKETS_PROCESOS = 2
+TICKETS_TIMEOUT = 30
+TICKETS_DIR = os.path.join(MEDIA_ROOT, 'tickets')
+
+# Canal de eventos de la cocina (pub/sub en memoria del proceso por defecto)
+EVENTOS_BACKEND = 'restaurante.eventos.CanalLocal'
+
+# Escritura agrupada de pedidos nuevos (restaurante/escritura.py): máximo de
+# pedidos por transacción (0 = desactivada, cada petición confirma el suyo) y
+# milisegundos que el escritor espera a que lleguen más. Sólo sirve con un
+# servidor WSGI con hilos; bajo ASGI no hay peticiones simultáneas que juntar
+ESCRITURA_LOTE = 0
+ESCRITURA_ESPERA_MS = 2
+
+# Días que un pedido cerrado queda en la base principal antes de archivarse
+# (por defecto de manage.py archivar_pedidos)
+ARCHIVO_DIAS = 90
+
+# Muestras por vista que guarda el histograma móvil de /metricas/
+METRICAS_MUESTRAS = 1000
@@ -0,0 +1,52 @@
+"""
+Perfil de producción: DJANGO_SETTINGS_MODULE=administrador.settings_produccion
+
+Hereda todo de settings.py y ajusta SQLite para varias escrituras concurrentes
+(hora pico del restaurante). Benchmark: manage.py bench_escrituras.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES as _DATABASES, SECRET_KEY as _SECRET_KEY
+
+DEBUG = False
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', _SECRET_KEY)
+
+# PRAGMAs que se ejecutan al abrir cada conexión:
+# - WAL: los lectores no bloquean al escritor ni el escritor a los lectores
+# - synchronous=NORMAL: en WAL sólo se sincroniza en los checkpoints; es seguro
+#   ante caídas del proceso (se puede perder la última transacción si se corta la luz)
+# - mmap_size / cache_size: lecturas desde memoria en lugar de syscalls
+SQLITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=134217728',  # 128 MiB
+    'PRAGMA cache_size=-20000',    # ~20 MiB por conexión
+    'PRAGMA temp_store=MEMORY',
+]
+
+DATABASES = {
+    'default': {
+        **_DATABASES['default'],
+        'OPTIONS': {
+            'init_command': ';'.join(SQLITE_PRAGMAS),
+            # busy_timeout: esperar el bloqueo de escritura hasta 10 s en vez de
+            # fallar enseguida con "database is locked"
+            'timeout': 10,
+            # Las transacciones toman el bloqueo de escritura al empezar (BEGIN
+            # IMMEDIATE), así la espera la resuelve busy_timeout y no hay
+            # interbloqueos al pasar de lectura a escritura dentro de atomic()
+            'transaction_mode': 'IMMEDIATE',
+        },
+        # Sin conexiones persistentes: se sirve por ASGI (vistas async, SSE) y
+        # la documentación de Django pide desactivarlas en ese modo, porque el
+        # cierre de conexiones al terminar cada petición no se garantiza ahí.
+        # Cada petición abre la suya y corre los PRAGMAs (unos 0,3 ms).
+        'CONN_MAX_AGE': 0,
+    }
+}
+
+# La base de archivo (restaurante/archivo.py) con los mismos ajustes
+DATABASES['archivo'] = {**DATABASES['default'], 'NAME': _DATABASES['archivo']['NAME']}
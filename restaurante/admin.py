@@ -1,7 +1,9 @@
 from django.contrib import admin
-from .models import Categoria, Producto, Pedido, DetallePedido
+from .models import Categoria, Producto, Pedido, DetallePedido, TransicionPedido, VentaDiaria
 admin.site.register(Categoria)
 admin.site.register(Producto)
 admin.site.register(Pedido)
 admin.site.register(DetallePedido)
+admin.site.register(VentaDiaria)
+admin.site.register(TransicionPedido)
 # Register your models here.
@@ -0,0 +1,109 @@
+# Analítica de cocina sobre las marcas de tiempo por estado del pedido: cuánto
+# esperan en PENDIENTE hasta que la cocina los toma, cuánto tardan en
+# PREPARANDO, cuántos entran y salen por hora y qué hay en cola ahora. Todo se
+# agrega en SQL; en Python sólo se completan las horas sin pedidos y se saca el
+# promedio móvil de esa serie.
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Min, Q, Window
+from django.db.models.functions import CumeDist, TruncHour
+from django.utils import timezone
+
+from .models import Pedido
+
+PERCENTILES = (50, 90, 99)
+# Horas del promedio móvil de pedidos por hora
+MEDIA_MOVIL = 3
+
+# Tramo medido: (desde, hasta) como columnas de Pedido
+TIEMPOS = {
+    'espera': ('fecha', 'preparando_en'),
+    'preparacion': ('preparando_en', 'entregado_en'),
+}
+
+
+def _duracion(desde, hasta):
+    return ExpressionWrapper(F(hasta) - F(desde), output_field=DurationField())
+
+
+def _minutos(duracion):
+    return round(duracion.total_seconds() / 60, 1) if duracion is not None else None
+
+
+def percentiles(qs, desde, hasta):
+    # El percentil p es el menor valor cuya distribución acumulada (CUME_DIST()
+    # ordenado por duración) llega a p: sobre todo el rango y particionado por
+    # hora de entrega. Una sola consulta con las dos ventanas trae, ordenadas por
+    # duración, sólo las filas desde el percentil más bajo; de ellas se toma la
+    # primera que alcanza cada p.
+    orden = F('valor').asc()
+    filas = (
+        qs.annotate(
+            hora=TruncHour('entregado_en'),
+            valor=_duracion(desde, hasta),
+            en_rango=Window(CumeDist(), order_by=orden),
+            en_hora=Window(CumeDist(), partition_by=[TruncHour('entregado_en')], order_by=orden),
+        )
+        .filter(Q(en_rango__gte=min(PERCENTILES) / 100) | Q(en_hora__gte=min(PERCENTILES) / 100))
+        .order_by('valor').values_list('hora', 'valor', 'en_rango', 'en_hora')
+    )
+    total, por_hora = {}, defaultdict(dict)
+    for hora, valor, acumulado, acumulado_hora in filas:
+        for p in PERCENTILES:
+            clave = f'p{p}'
+            if acumulado >= p / 100:
+                total.setdefault(clave, _minutos(valor))
+            if acumulado_hora >= p / 100:
+                por_hora[hora].setdefault(clave, _minutos(valor))
+    return {f'p{p}': total.get(f'p{p}') for p in PERCENTILES}, por_hora
+
+
+def _por_hora(qs, campo):
+    return dict(
+        qs.annotate(hora=TruncHour(campo)).values('hora').annotate(cantidad=Count('id')).values_list('hora', 'cantidad')
+    )
+
+
+def resumen_cocina(horas=24):
+    ahora = timezone.now()
+    inicio = timezone.localtime(ahora - timedelta(hours=horas - 1)).replace(minute=0, second=0, microsecond=0)
+    entregados = Pedido.objects.filter(entregado_en__gte=inicio, preparando_en__isnull=False)
+
+    tiempos = {nombre: percentiles(entregados, desde, hasta) for nombre, (desde, hasta) in TIEMPOS.items()}
+    recibidos = _por_hora(Pedido.objects.filter(fecha__gte=inicio), 'fecha')
+    salidas = _por_hora(entregados, 'entregado_en')
+
+    serie = []
+    hora = inicio
+    while hora <= ahora:
+        fila = {'hora': hora, 'recibidos': recibidos.get(hora, 0), 'entregados': salidas.get(hora, 0)}
+        for nombre, (_, por_hora) in tiempos.items():
+            fila[nombre] = por_hora.get(hora, {})
+        serie.append(fila)
+        hora = timezone.localtime(hora + timedelta(hours=1))
+    # Promedio móvil sobre la serie ya agregada (una fila por hora)
+    for i, fila in enumerate(serie):
+        ventana = serie[max(0, i - MEDIA_MOVIL + 1):i + 1]
+        fila['recibidos_media'] = round(sum(f['recibidos'] for f in ventana) / len(ventana), 1)
+
+    # Pedidos abiertos por estado y antigüedad (desde su creación) del más viejo
+    cola = {
+        fila['estado']: {
+            'etiqueta': str(Pedido.Estado(fila['estado']).label),
+            'pedidos': fila['pedidos'],
+            'mas_antiguo': fila['mas_antiguo'],
+            'minutos': _minutos(ahora - fila['mas_antiguo']),
+        }
+        for fila in Pedido.objects.filter(estado__in=[Pedido.Estado.PENDIENTE, Pedido.Estado.PREPARANDO])
+        .values('estado').annotate(pedidos=Count('id'), mas_antiguo=Min('fecha')).order_by()
+    }
+
+    return {
+        'desde': inicio,
+        'horas': horas,
+        'espera': tiempos['espera'][0],
+        'preparacion': tiempos['preparacion'][0],
+        'por_hora': serie,
+        'cola': cola,
+    }
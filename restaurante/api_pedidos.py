@@ -0,0 +1,183 @@
+# API JSON para los terminales de venta: un POST con uno o muchos pedidos, cada
+# uno con la clave de idempotencia que genera el terminal. Se validan contra el
+# catálogo en memoria (sin consultas por línea) y los pedidos nuevos del lote
+# entran en una sola transacción con dos INSERT masivos, cabeceras y líneas.
+# Un reintento con claves ya guardadas devuelve los pedidos existentes en vez
+# de duplicarlos; si dos reintentos se cruzan, la restricción UNIQUE de la
+# clave (o el bloqueo de SQLite) hace fallar a uno, que se repite y los encuentra.
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, OperationalError, transaction
+
+from . import escritura
+from .catalogo import obtener_catalogo
+from .models import DetallePedido, Pedido
+
+MAX_PEDIDOS = 500
+MAX_LINEAS = 200
+INTENTOS = 3
+CENTAVO = Decimal('0.01')
+LARGO_CLAVE = Pedido._meta.get_field('clave_idempotencia').max_length
+TIPOS = frozenset(Pedido.TipoPedido.values)
+
+# Estado de cada pedido en la respuesta
+CREADO = 'creado'
+EXISTENTE = 'existente'
+RECHAZADO = 'rechazado'
+
+
+class ErrorLote(ValueError):
+    # El cuerpo entero es inválido: no se procesa ningún pedido
+    pass
+
+
+class ErrorPedido(ValueError):
+    pass
+
+
+def leer_lote(cuerpo):
+    # Acepta {"pedidos": [...]}, una lista de pedidos o un pedido suelto
+    try:
+        datos = json.loads(cuerpo)
+    except (UnicodeDecodeError, ValueError):
+        raise ErrorLote("JSON inválido")
+    if isinstance(datos, dict):
+        datos = datos['pedidos'] if 'pedidos' in datos else [datos]
+    if not isinstance(datos, list) or not datos:
+        raise ErrorLote("Se espera un pedido o una lista de pedidos")
+    if len(datos) > MAX_PEDIDOS:
+        raise ErrorLote(f"Como máximo {MAX_PEDIDOS} pedidos por envío")
+    return datos
+
+
+def _entero(valor, nombre):
+    if isinstance(valor, bool) or not isinstance(valor, int):
+        raise ErrorPedido(f"{nombre} debe ser un entero")
+    return valor
+
+
+def _texto(dato, campo):
+    valor = dato.get(campo)
+    if valor in (None, ''):
+        return None
+    largo = Pedido._meta.get_field(campo).max_length
+    if not isinstance(valor, str) or len(valor) > largo:
+        raise ErrorPedido(f"{campo} debe ser un texto de hasta {largo} caracteres")
+    return valor.strip() or None
+
+
+def _precio(valor, numero):
+    try:
+        precio = Decimal(str(valor))
+    except InvalidOperation:
+        raise ErrorPedido(f"línea {numero}: precio_unitario inválido")
+    if not precio.is_finite() or precio < 0 or precio != precio.quantize(CENTAVO) or precio >= 10 ** 8:
+        raise ErrorPedido(f"línea {numero}: precio_unitario inválido")
+    return precio
+
+
+def clave_de(dato):
+    clave = dato.get('clave') if isinstance(dato, dict) else None
+    if not isinstance(clave, str) or not clave.strip() or len(clave) > LARGO_CLAVE:
+        raise ErrorPedido(f"falta la clave o tiene más de {LARGO_CLAVE} caracteres")
+    return clave
+
+
+def construir(dato, por_id):
+    # Pedido y líneas sin guardar, con el total ya calculado (como escritura.guardar_lote)
+    tipo = dato.get('tipo', Pedido.TipoPedido.MESA)
+    if tipo not in TIPOS:
+        raise ErrorPedido(f"tipo desconocido {tipo!r}")
+    lineas = dato.get('lineas')
+    if not isinstance(lineas, list) or not lineas:
+        raise ErrorPedido("el pedido no tiene líneas")
+    if len(lineas) > MAX_LINEAS:
+        raise ErrorPedido(f"como máximo {MAX_LINEAS} líneas por pedido")
+
+    detalles = []
+    for numero, linea in enumerate(lineas, 1):
+        if not isinstance(linea, dict):
+            raise ErrorPedido(f"línea {numero}: se espera un objeto")
+        producto = por_id.get(_entero(linea.get('producto'), f"línea {numero}: producto"))
+        if producto is None or not producto.activo:
+            raise ErrorPedido(f"línea {numero}: producto #{linea['producto']} inexistente o inactivo")
+        cantidad = _entero(linea.get('cantidad', 1), f"línea {numero}: cantidad")
+        if cantidad < 1:
+            raise ErrorPedido(f"línea {numero}: la cantidad debe ser mayor que cero")
+        precio = linea.get('precio_unitario')
+        precio = producto.precio if precio in (None, '') else _precio(precio, numero)
+        detalles.append(DetallePedido(producto=producto, cantidad=cantidad, precio_unitario=precio))
+
+    pedido = Pedido(
+        tipo=tipo,
+        mesa=None if tipo == Pedido.TipoPedido.LLEVAR else _texto(dato, 'mesa'),
+        cliente_nombre=_texto(dato, 'cliente_nombre'),
+        clave_idempotencia=clave_de(dato),
+    )
+    pedido.total = sum(det.subtotal for det in detalles)
+    return pedido, detalles
+
+
+def _guardar(validos):
+    # Una transacción por lote: las claves ya guardadas se informan, el resto se
+    # inserta. Devuelve {clave: (id, total)} de las existentes.
+    with transaction.atomic():
+        existentes = {
+            clave: (pk, total)
+            for clave, pk, total in Pedido.objects.filter(clave_idempotencia__in=validos)
+            .values_list('clave_idempotencia', 'id', 'total')
+        }
+        nuevos = [(pedido, detalles) for clave, (pedido, detalles) in validos.items() if clave not in existentes]
+        if not nuevos:
+            return existentes
+        escritura.guardar_lote(nuevos)
+    return existentes
+
+
+def registrar_lote(datos):
+    # Un resultado por pedido recibido, en el mismo orden
+    por_id = obtener_catalogo().por_id
+    resultados = []
+    validos = {}
+    vistas = set()
+    for dato in datos:
+        clave = dato.get('clave') if isinstance(dato, dict) else None
+        try:
+            if not isinstance(dato, dict):
+                raise ErrorPedido("cada pedido debe ser un objeto")
+            clave = clave_de(dato)
+            if clave in vistas:
+                raise ErrorPedido("clave repetida en el envío")
+            vistas.add(clave)
+            validos[clave] = construir(dato, por_id)
+        except ErrorPedido as e:
+            resultados.append({'clave': clave, 'estado': RECHAZADO, 'error': str(e)})
+        else:
+            resultados.append({'clave': clave})
+    if not validos:
+        return resultados
+
+    for intento in range(INTENTOS):
+        try:
+            existentes = _guardar(validos)
+            break
+        except (IntegrityError, OperationalError):
+            # Otro envío con alguna de estas claves confirmó entre la lectura y
+            # el INSERT: se vuelve a empezar con instancias sin guardar
+            if intento == INTENTOS - 1:
+                raise
+            for pedido, detalles in validos.values():
+                escritura.reiniciar(pedido, detalles)
+
+    for resultado in resultados:
+        if resultado.get('estado') == RECHAZADO:
+            continue
+        clave = resultado['clave']
+        if clave in existentes:
+            pk, total = existentes[clave]
+            resultado.update(estado=EXISTENTE, id=pk, total=total.quantize(CENTAVO))
+        else:
+            pedido, _ = validos[clave]
+            resultado.update(estado=CREADO, id=pedido.pk, total=pedido.total.quantize(CENTAVO))
+    return resultados
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class RestauranteConfig(AppConfig):
     name = 'restaurante'
+
+    def ready(self):
+        from . import signals  # noqa: F401
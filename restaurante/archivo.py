@@ -0,0 +1,154 @@
+# Archivo de pedidos cerrados. Los ENTREGADO/CANCELADO de hace más de N días
+# pasan, con sus líneas y su historial de estados, a una segunda base SQLite
+# (alias 'archivo' en DATABASES) y se borran de la principal, que queda con lo
+# reciente y lo abierto: lo que leen la lista, los conteos y la cocina.
+# El archivo tiene las mismas tablas de pedidos y una copia del catálogo que
+# usan sus líneas; RouterArchivo sólo migra esas tablas allí. La tabla
+# CorteArchivo de la principal dice hasta qué fecha puede haber pedidos
+# archivados: las consultas por rango (lista de pedidos, exportación, resumen
+# de ventas) se repiten en el archivo sólo si el rango llega hasta ahí, y los
+# resultados de las dos bases se unen en el mismo orden (-fecha, -id).
+# Mientras una tanda se mueve, sus pedidos pueden verse un instante en las dos
+# bases: el archivo confirma antes de que la principal los borre.
+# Comando: manage.py archivar_pedidos.
+import heapq
+
+from django.db import connections, transaction
+from django.db.models import F, Max
+
+from .models import Categoria, CorteArchivo, DetallePedido, Pedido, Producto, TransicionPedido
+
+ALIAS = 'archivo'
+ESTADOS = (Pedido.Estado.ENTREGADO, Pedido.Estado.CANCELADO)
+LOTE = 500
+# Tablas que existen en el archivo (nombres de modelo en minúsculas)
+MODELOS = frozenset({'categoria', 'producto', 'pedido', 'detallepedido', 'transicionpedido'})
+
+
+class RouterArchivo:
+    # Sin .using(ALIAS) todo va a la base principal; los objetos leídos del
+    # archivo siguen en él al recorrer sus relaciones (líneas, productos)
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db != ALIAS:
+            return None
+        return app_label == 'restaurante' and model_name in MODELOS
+
+
+def limite():
+    # Fecha hasta la que (excluida) puede haber pedidos archivados; None si
+    # nunca se archivó nada
+    return CorteArchivo.objects.aggregate(hasta=Max('hasta'))['hasta']
+
+
+async def alimite():
+    return (await CorteArchivo.objects.aaggregate(hasta=Max('hasta')))['hasta']
+
+
+def _repartir(qs, desde, hasta):
+    if hasta is None or (desde is not None and desde >= hasta):
+        return [qs]
+    return [qs, qs.using(ALIAS)]
+
+
+def consultas(qs, desde=None):
+    # La consulta en la base principal y, si el rango que empieza en 'desde'
+    # (None = sin límite) llega a días archivados, la misma en el archivo
+    return _repartir(qs, desde, limite())
+
+
+async def aconsultas(qs, desde=None):
+    return _repartir(qs, desde, await alimite())
+
+
+def _orden(pedido):
+    return pedido.fecha, pedido.pk
+
+
+def mezclar(iterables, clave=_orden):
+    # Une resultados de varias bases, cada uno ya ordenado por (-fecha, -id)
+    if len(iterables) == 1:
+        return iter(iterables[0])
+    return heapq.merge(*iterables, key=clave, reverse=True)
+
+
+async def amezclar(consultas, chunk_size):
+    # Como mezclar() para aiterator(): lee de a bloques de cada base a la vez
+    iteradores = [qs.aiterator(chunk_size=chunk_size) for qs in consultas]
+    cabezas = []
+
+    async def avanzar(n):
+        pedido = await anext(iteradores[n], None)
+        if pedido is not None:
+            heapq.heappush(cabezas, (-pedido.fecha.timestamp(), -pedido.pk, n, pedido))
+
+    for n in range(len(iteradores)):
+        await avanzar(n)
+    while cabezas:
+        *_, n, pedido = heapq.heappop(cabezas)
+        yield pedido
+        await avanzar(n)
+
+
+def _copiar(modelo, qs, actualizar=False):
+    # Copia las filas al archivo con sus valores tal cual (bulk_create pondría la
+    # hora actual en los campos auto_now/auto_now_add). Las que ya están se
+    # saltean o, con 'actualizar', se pisan.
+    conexion = connections[ALIAS]
+    campos = modelo._meta.concrete_fields
+    columnas = [conexion.ops.quote_name(campo.column) for campo in campos]
+    pk = conexion.ops.quote_name(modelo._meta.pk.column)
+    if actualizar:
+        conflicto = f'({pk}) DO UPDATE SET ' + ', '.join(f'{c} = excluded.{c}' for c in columnas if c != pk)
+    else:
+        conflicto = 'DO NOTHING'
+    sql = (
+        f'INSERT INTO {conexion.ops.quote_name(modelo._meta.db_table)} ({", ".join(columnas)}) '
+        f'VALUES ({", ".join(["%s"] * len(campos))}) ON CONFLICT {conflicto}'
+    )
+    filas = [
+        [campo.get_db_prep_save(valor, conexion) for campo, valor in zip(campos, fila)]
+        for fila in qs.values_list(*[campo.attname for campo in campos])
+    ]
+    if filas:
+        with conexion.cursor() as cursor:
+            cursor.executemany(sql, filas)
+
+
+def _mover(ids):
+    # Dentro de una transacción de la principal: copia al archivo y confirma
+    # allí; recién después se borran de la principal. Si algo falla no se borra
+    # nada, y repetir la copia no duplica (mismas claves primarias).
+    ids = list(Pedido.objects.filter(pk__in=ids, estado__in=ESTADOS).values_list('pk', flat=True))
+    detalles = DetallePedido.objects.filter(pedido_id__in=ids)
+    productos = Producto.objects.filter(pk__in=detalles.values('producto_id'))
+    with transaction.atomic(using=ALIAS):
+        # El catálogo que usan las líneas, con nombres y precios al día
+        _copiar(Categoria, Categoria.objects.filter(pk__in=productos.values('categoria_id')), actualizar=True)
+        _copiar(Producto, productos, actualizar=True)
+        _copiar(Pedido, Pedido.objects.filter(pk__in=ids))
+        _copiar(DetallePedido, detalles)
+        _copiar(TransicionPedido, TransicionPedido.objects.filter(pedido_id__in=ids))
+    Pedido.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archivar(antes_de, lote=LOTE):
+    # Generador: mueve por tandas los pedidos cerrados con fecha anterior a
+    # 'antes_de' y devuelve cuántos movió en cada una. Cada tanda es una
+    # transacción corta en cada base. Lo movido se borra, así que cada vuelta
+    # toma los primeros 'lote' que da el índice (estado, fecha), sin ordenar
+    # todo lo pendiente.
+    corte = None
+    while True:
+        ids = list(
+            Pedido.objects.filter(estado__in=ESTADOS, fecha__lt=antes_de)
+            .order_by().values_list('pk', flat=True)[:lote]
+        )
+        if not ids:
+            return
+        with transaction.atomic():
+            if corte is None:
+                corte = CorteArchivo.objects.create(hasta=antes_de)
+            movidos = _mover(ids)
+            CorteArchivo.objects.filter(pk=corte.pk).update(pedidos=F('pedidos') + movidos)
+        yield movidos
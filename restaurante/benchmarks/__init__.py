@@ -0,0 +1,3 @@
+# Suite de benchmarks del flujo del restaurante (manage.py benchmark).
+# utilidades.py no importa modelos: lo usan comandos que lanzan procesos hijos
+# con spawn antes de django.setup().
@@ -0,0 +1,132 @@
+# Datos de prueba con la forma de un restaurante real: un menú de cientos de
+# productos y un año de pedidos con picos de almuerzo y cena. La misma semilla
+# genera siempre los mismos datos, así dos corridas en commits distintos miden
+# lo mismo. Pedidos y líneas se insertan con executemany porque bulk_create
+# pisaría la fecha (auto_now_add) y es varias veces más lento a esta escala.
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from restaurante import busqueda, catalogo, ventas
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+CATEGORIAS = [
+    'Entradas', 'Sopas', 'Platos de fondo', 'Parrilla', 'Pescados', 'Pastas',
+    'Ensaladas', 'Postres', 'Jugos', 'Refrescos', 'Cervezas', 'Vinos',
+]
+PLATOS = [
+    'Salteña', 'Sopa de maní', 'Pique macho', 'Silpancho', 'Charque', 'Majadito',
+    'Sajta de pollo', 'Fricasé', 'Chicharrón', 'Trucha', 'Surubí', 'Lomo montado',
+    'Tallarines', 'Ensalada', 'Helado', 'Flan', 'Mocochinchi', 'Api', 'Limonada',
+]
+# Hora local del pedido: (desde, hasta, peso) -> picos de almuerzo y cena
+FRANJAS = [(8, 11, 1), (11, 15, 5), (15, 19, 1), (19, 23, 4)]
+LOTE = 10000
+
+
+def _productos(cantidad, azar):
+    categorias = Categoria.objects.bulk_create(Categoria(nombre=nombre) for nombre in CATEGORIAS)
+    productos = Producto.objects.bulk_create(
+        Producto(
+            nombre=f"{PLATOS[i % len(PLATOS)]} {i // len(PLATOS) + 1}",
+            categoria=categorias[i % len(categorias)],
+            precio=Decimal(azar.randrange(500, 12000, 50)) / 100,
+            activo=azar.random() > 0.05,
+        )
+        for i in range(cantidad)
+    )
+    # bulk_create no dispara los signals del catálogo ni del índice de búsqueda
+    catalogo.invalidar()
+    busqueda.reconstruir()
+    return [p for p in productos if p.activo]
+
+
+def _fecha(dia, azar):
+    desde, hasta, _ = azar.choices(FRANJAS, weights=[f[2] for f in FRANJAS])[0]
+    hora = time(azar.randrange(desde, hasta), azar.randrange(60), azar.randrange(60))
+    return timezone.make_aware(datetime.combine(dia, hora))
+
+
+def _estado(dia, hoy, azar):
+    if dia < hoy:
+        return azar.choices(ventas.ESTADOS_CERRADOS, weights=[92, 8])[0].value
+    return azar.choice(Pedido.Estado.values)
+
+
+def _marcas(fecha, estado, azar):
+    # (preparando_en, entregado_en, cancelado_en); los minutos en cola y en
+    # cocina siguen una lognormal: casi todos rápidos, algunos muy lentos
+    espera = timedelta(minutes=azar.lognormvariate(1.5, 0.6))
+    if estado == Pedido.Estado.PENDIENTE:
+        return None, None, None
+    if estado == Pedido.Estado.CANCELADO:
+        return None, None, fecha + espera
+    preparando = fecha + espera
+    if estado == Pedido.Estado.PREPARANDO:
+        return preparando, None, None
+    return preparando, preparando + timedelta(minutes=azar.lognormvariate(2.6, 0.4)), None
+
+
+def sembrar(productos=300, pedidos=200000, lineas=3, dias=365, semilla=1):
+    # Devuelve {'productos': n, 'pedidos': n, 'lineas': n}
+    azar = random.Random(semilla)
+    # Los tiempos de cocina usan su propio generador, así el resto de los datos
+    # de cada semilla es el mismo que antes de agregarlos
+    azar_tiempos = random.Random(semilla + 1)
+    menu = _productos(productos, azar)
+    hoy = timezone.localdate()
+    ops = connection.ops
+    tabla_pedido = Pedido._meta.db_table
+    tabla_detalle = DetallePedido._meta.db_table
+
+    sql_pedido = (
+        f'INSERT INTO "{tabla_pedido}" (id, fecha, tipo, estado, mesa, cliente_nombre, total, '
+        'preparando_en, entregado_en, cancelado_en, actualizado) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    sql_detalle = (
+        f'INSERT INTO "{tabla_detalle}" (pedido_id, producto_id, cantidad, precio_unitario) '
+        'VALUES (%s, %s, %s, %s)'
+    )
+
+    inicio_id = (Pedido.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+    total_lineas = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for desde in range(0, pedidos, LOTE):
+            filas_pedido, filas_detalle = [], []
+            for n in range(desde, min(desde + LOTE, pedidos)):
+                pk = inicio_id + n
+                # Más pedidos en los días recientes que en los viejos
+                dia = hoy - timedelta(days=min(dias - 1, int(azar.expovariate(3 / dias))))
+                en_mesa = azar.random() < 0.6
+                total = Decimal('0.00')
+                for producto in azar.sample(menu, k=min(len(menu), max(1, round(azar.gauss(lineas, 1))))):
+                    cantidad = azar.choices([1, 2, 3, 4], weights=[60, 25, 10, 5])[0]
+                    total += cantidad * producto.precio
+                    filas_detalle.append(
+                        (pk, producto.pk, cantidad, ops.adapt_decimalfield_value(producto.precio, 10, 2))
+                    )
+                fecha = _fecha(dia, azar)
+                estado = _estado(dia, hoy, azar)
+                marcas = _marcas(fecha, estado, azar_tiempos)
+                filas_pedido.append((
+                    pk,
+                    ops.adapt_datetimefield_value(fecha),
+                    (Pedido.TipoPedido.MESA if en_mesa else Pedido.TipoPedido.LLEVAR).value,
+                    estado,
+                    str(azar.randrange(1, 25)) if en_mesa else None,
+                    None if en_mesa else f"Cliente {azar.randrange(1000)}",
+                    ops.adapt_decimalfield_value(total, 12, 2),
+                    *(ops.adapt_datetimefield_value(m) for m in marcas),
+                    # Última modificación: el último cambio de estado
+                    ops.adapt_datetimefield_value(max(m for m in (fecha, *marcas) if m is not None)),
+                ))
+            cursor.executemany(sql_pedido, filas_pedido)
+            cursor.executemany(sql_detalle, filas_detalle)
+            total_lineas += len(filas_detalle)
+
+    # Resumen del tablero al día, como si cada cierre hubiera pasado por registrar_venta
+    ventas.reconstruir()
+    return {'productos': productos, 'pedidos': pedidos, 'lineas': total_lineas}
@@ -0,0 +1,115 @@
+# Flujos clave del restaurante medidos con el cliente de pruebas de Django.
+# Cada flujo es una lista de peticiones (método, ruta, datos, cabeceras) que se
+# arma antes de medir, así las consultas para elegir pedidos no cuentan.
+import random
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurante import views
+from restaurante.catalogo import obtener_catalogo
+from restaurante.models import Pedido
+
+from .utilidades import resumir
+
+Peticion = namedtuple('Peticion', 'metodo ruta datos cabeceras', defaults=(None, None))
+AJAX = {'x-requested-with': 'XMLHttpRequest'}
+# Peticiones iniciales de cada flujo que no se miden (cachés, plantillas)
+CALENTAMIENTO = 3
+
+
+def _datos_pedido(productos):
+    datos = {
+        'tipo': Pedido.TipoPedido.MESA, 'estado': Pedido.Estado.PENDIENTE, 'mesa': '7', 'cliente_nombre': '',
+        'detalles-TOTAL_FORMS': str(len(productos)), 'detalles-INITIAL_FORMS': '0',
+        'detalles-MIN_NUM_FORMS': '0', 'detalles-MAX_NUM_FORMS': '1000',
+    }
+    for i, producto in enumerate(productos):
+        datos.update({
+            f'detalles-{i}-producto': producto.pk, f'detalles-{i}-cantidad': '2',
+            f'detalles-{i}-precio_unitario': '',
+        })
+    return datos
+
+
+def preparar(cantidad, semilla=1):
+    # {nombre del flujo: [Peticion, ...]} con 'cantidad' peticiones por flujo
+    azar = random.Random(semilla)
+    hoy = timezone.localdate()
+    lista = reverse('lista_pedidos')
+    ids = list(Pedido.objects.values_list('id', flat=True))
+    # Sólo un pedido en preparación puede pasar a ENTREGADO
+    preparando = list(
+        Pedido.objects.filter(estado=Pedido.Estado.PREPARANDO).values_list('id', flat=True)[:cantidad]
+    )
+    activos = obtener_catalogo().activos
+    mes = f'desde={hoy - timedelta(days=30)}&hasta={hoy}'
+    qs, _ = views.filtrar_pedidos({})
+    ultimo_primera_pagina = qs[views.PEDIDOS_POR_PAGINA - 1:views.PEDIDOS_POR_PAGINA].first()
+
+    filtros = {
+        'lista_pedidos': '',
+        'lista_pedidos_hoy': 'hoy=true',
+        'lista_pedidos_rango_30d': mes,
+        'lista_pedidos_estado': 'estado=ENTREGADO',
+        'lista_pedidos_tipo': 'tipo=LLEVAR',
+        'lista_pedidos_estado_rango': f'estado=ENTREGADO&{mes}',
+    }
+    if ultimo_primera_pagina:
+        filtros['lista_pedidos_pagina_2'] = f'cursor={views.codificar_cursor(ultimo_primera_pagina)}'
+
+    flujos = {
+        'crear_pedido': [
+            Peticion('post', reverse('crear_pedido'), _datos_pedido(azar.sample(activos, 3)))
+            for _ in range(cantidad)
+        ],
+        **{
+            nombre: [Peticion('get', f'{lista}?{params}')] * cantidad
+            for nombre, params in filtros.items()
+        },
+        'detalle_pedido_ajax': [
+            Peticion('get', reverse('detalle_pedido', args=[azar.choice(ids)]), cabeceras=AJAX)
+            for _ in range(cantidad)
+        ],
+        # Pedidos distintos: cada ticket se genera de cero (sin la caché en disco)
+        'exportar_ticket_pdf': [
+            Peticion('get', reverse('exportar_ticket_pdf', args=[pk])) for pk in azar.sample(ids, cantidad)
+        ],
+        'cambiar_estado_pedido': [
+            Peticion('post', reverse('cambiar_estado_pedido', args=[pk]), {'nuevo_estado': Pedido.Estado.ENTREGADO})
+            for pk in preparando
+        ],
+    }
+    return flujos
+
+
+def ejecutar(peticiones, calentamiento=CALENTAMIENTO):
+    cliente = Client()
+    tiempos, consultas, errores = [], [], 0
+    for n, peticion in enumerate(peticiones):
+        metodo = getattr(cliente, peticion.metodo)
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = metodo(peticion.ruta, peticion.datos, headers=peticion.cabeceras)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+            duracion = time.perf_counter() - inicio
+        respuesta.close()
+        if respuesta.status_code not in (200, 302):
+            errores += 1
+        if n >= calentamiento:
+            tiempos.append(duracion)
+            consultas.append(len(capturadas))
+    return {
+        'peticiones': len(tiempos),
+        **{clave: round(valor, 3) for clave, valor in resumir(tiempos).items()},
+        'consultas': sorted(consultas)[len(consultas) // 2] if consultas else 0,
+        'consultas_max': max(consultas, default=0),
+        'errores': errores,
+    }
@@ -0,0 +1,97 @@
+# Utilidades compartidas por los benchmarks y los comandos bench_*: nunca trabajan
+# sobre db.sqlite3, sino sobre una base temporal en disco con las migraciones aplicadas
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+@contextmanager
+def base_temporal(alias='default'):
+    conexion = connections[alias]
+    directorio = tempfile.mkdtemp(prefix='bench-restaurante-')
+    conexion.settings_dict['TEST'] = {
+        **conexion.settings_dict.get('TEST', {}),
+        'NAME': os.path.join(directorio, 'bench.sqlite3'),
+    }
+    nombre_original = conexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield conexion.settings_dict['NAME']
+    finally:
+        conexion.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def resumir(tiempos):
+    # Tiempos en segundos -> métricas en milisegundos
+    return {
+        'media_ms': statistics.fmean(tiempos) * 1000 if tiempos else 0.0,
+        'p50_ms': percentil(tiempos, 50) * 1000,
+        'p95_ms': percentil(tiempos, 95) * 1000,
+        'p99_ms': percentil(tiempos, 99) * 1000,
+    }
+
+
+# Peticiones GET en el mismo proceso contra los handlers reales de Django, sin
+# sockets; devuelven True si la respuesta fue 200 con cuerpo
+def pedir_wsgi(aplicacion, ruta, cabeceras=None):
+    ruta, _, consulta = ruta.partition('?')
+    entorno = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': ruta, 'QUERY_STRING': consulta, 'SCRIPT_NAME': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(), 'wsgi.url_scheme': 'http',
+        'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False, 'HTTP_HOST': 'localhost',
+        **{'HTTP_' + k.upper().replace('-', '_'): v for k, v in (cabeceras or {}).items()},
+    }
+    estado = []
+    respuesta = aplicacion(entorno, lambda status, headers: estado.append(status))
+    try:
+        cuerpo = b''.join(respuesta)
+    finally:
+        respuesta.close()
+    return estado[0].startswith('200') and bool(cuerpo)
+
+
+async def pedir_asgi(aplicacion, ruta, cabeceras=None):
+    ruta, _, consulta = ruta.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(),
+        'query_string': consulta.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost')] + [(k.encode(), v.encode()) for k, v in (cabeceras or {}).items()],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    enviado = False
+    fin = asyncio.Event()
+    estado = []
+
+    async def recibir():
+        nonlocal enviado
+        if not enviado:
+            enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await fin.wait()
+        return {'type': 'http.disconnect'}
+
+    async def enviar(mensaje):
+        if mensaje['type'] == 'http.response.start':
+            estado.append(mensaje['status'])
+        elif not mensaje.get('more_body'):
+            fin.set()
+
+    await aplicacion(scope, recibir, enviar)
+    return estado == [200]
@@ -0,0 +1,110 @@
+# Búsqueda de productos para el formulario de pedidos: índice FTS5 de SQLite
+# (migración 0008) sobre el nombre del producto y el nombre y la descripción de
+# su categoría, con coincidencia por prefijo y orden por relevancia (bm25). Los
+# signals de Producto/Categoría lo actualizan en la misma transacción que el
+# cambio; las cargas con bulk_create, que no disparan signals, llaman a
+# reconstruir(). En otros motores se busca con LIKE sobre los nombres.
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, Q
+
+from .models import Categoria, Producto
+
+TABLA = 'restaurante_producto_busqueda'
+LIMITE = 20
+# Peso de cada columna en bm25 (nombre, categoría, descripción): coincidir en
+# el nombre del producto vale más que en el de su categoría
+PESOS = (10.0, 3.0, 1.0)
+# Máximo de parámetros por sentencia en SQLite antiguos
+TRAMO = 900
+
+PALABRAS = re.compile(r'\w+')
+
+
+def _con_indice(conexion):
+    return conexion.vendor == 'sqlite'
+
+
+def _llenar(condicion=''):
+    # INSERT ... SELECT de los productos que cumplen 'condicion' (SQL sobre p/c)
+    return (
+        f'INSERT INTO {TABLA} (rowid, nombre, categoria, descripcion) '
+        f"SELECT p.id, p.nombre, c.nombre, COALESCE(c.descripcion, '') "
+        f'FROM {Producto._meta.db_table} p INNER JOIN {Categoria._meta.db_table} c ON c.id = p.categoria_id '
+        + (f'WHERE {condicion}' if condicion else '')
+    )
+
+
+def indexar_productos(pks, using=DEFAULT_DB_ALIAS):
+    conexion = connections[using]
+    if not _con_indice(conexion):
+        return
+    pks = list(pks)
+    with conexion.cursor() as cursor:
+        for desde in range(0, len(pks), TRAMO):
+            tramo = pks[desde:desde + TRAMO]
+            marcas = ', '.join(['%s'] * len(tramo))
+            cursor.execute(f'DELETE FROM {TABLA} WHERE rowid IN ({marcas})', tramo)
+            cursor.execute(_llenar(f'p.id IN ({marcas})'), tramo)
+
+
+def indexar_categoria(pk, using=DEFAULT_DB_ALIAS):
+    # El nombre y la descripción de la categoría van en la fila de cada producto
+    conexion = connections[using]
+    if not _con_indice(conexion):
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLA} WHERE rowid IN (SELECT id FROM {Producto._meta.db_table} WHERE categoria_id = %s)',
+            [pk],
+        )
+        cursor.execute(_llenar('p.categoria_id = %s'), [pk])
+
+
+def quitar_producto(pk, using=DEFAULT_DB_ALIAS):
+    conexion = connections[using]
+    if _con_indice(conexion):
+        with conexion.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [pk])
+
+
+def reconstruir(using=DEFAULT_DB_ALIAS):
+    conexion = connections[using]
+    if not _con_indice(conexion):
+        return
+    with conexion.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+        cursor.execute(_llenar())
+
+
+def consulta_fts(texto):
+    # Cada palabra escrita es un prefijo entre comillas ("chur"* "parri"*), todas
+    # obligatorias; los signos de la sintaxis FTS5 se descartan
+    return ' '.join(f'"{palabra}"*' for palabra in PALABRAS.findall(texto))
+
+
+def buscar(texto, limite=LIMITE, using=DEFAULT_DB_ALIAS):
+    # Productos activos que coinciden, los más relevantes primero; cada uno trae
+    # 'categoria_nombre' sin otra consulta
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return []
+    if not _con_indice(connections[using]):
+        return _buscar_like(texto, limite, using)
+    producto, categoria = Producto._meta.db_table, Categoria._meta.db_table
+    sql = (
+        f'SELECT p.id, p.nombre, p.precio, p.categoria_id, p.activo, c.nombre AS categoria_nombre '
+        f'FROM {TABLA} INNER JOIN {producto} p ON p.id = {TABLA}.rowid '
+        f'INNER JOIN {categoria} c ON c.id = p.categoria_id '
+        f'WHERE {TABLA} MATCH %s AND p.activo '
+        f'ORDER BY bm25({TABLA}, {", ".join(map(str, PESOS))}), p.nombre LIMIT %s'
+    )
+    return list(Producto.objects.db_manager(using).raw(sql, [consulta, limite]))
+
+
+def _buscar_like(texto, limite, using):
+    qs = Producto.objects.db_manager(using).filter(activo=True)
+    for palabra in PALABRAS.findall(texto):
+        qs = qs.filter(Q(nombre__icontains=palabra) | Q(categoria__nombre__icontains=palabra))
+    return list(qs.annotate(categoria_nombre=F('categoria__nombre')).order_by('nombre')[:limite])
@@ -0,0 +1,70 @@
+# Caché en memoria del menú (productos con su categoría). Cada proceso guarda
+# una copia etiquetada con un número de versión que vive en la caché de Django;
+# los signals de Producto/Categoría incrementan la versión y la próxima lectura
+# recarga todo con una sola consulta. Con varios procesos, CACHES debe apuntar
+# a un backend compartido para que la invalidación llegue a todos.
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .models import Producto
+
+CLAVE_VERSION = 'restaurante:catalogo:version'
+
+_catalogo = None
+
+
+class Catalogo:
+
+    def __init__(self, version, productos):
+        self.version = version
+        self.productos = productos
+        self.por_id = {p.id: p for p in productos}
+        self.activos = [p for p in productos if p.activo]
+
+    @cached_property
+    def modificacion(self):
+        # Para el ETag de la lista de productos (restaurante/condicional.py): sale
+        # de la copia en memoria, sin consultar; cualquier cambio la reemplaza
+        return {
+            'filas': len(self.productos),
+            'productos': max((p.actualizado for p in self.productos), default=None),
+            'categorias': max((p.categoria.actualizado for p in self.productos), default=None),
+        }
+
+
+def version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+        version = cache.get(CLAVE_VERSION, 1)
+    return version
+
+
+def obtener_catalogo():
+    global _catalogo
+    # La versión se lee antes de consultar: si cambia mientras cargamos, la copia
+    # queda con la versión vieja y se recarga en la siguiente lectura
+    version = version_actual()
+    catalogo = _catalogo
+    if catalogo is None or catalogo.version != version:
+        productos = list(Producto.objects.select_related('categoria').order_by('id'))
+        catalogo = Catalogo(version, productos)
+        _catalogo = catalogo
+    return catalogo
+
+
+def _incrementar_version():
+    global _catalogo
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.add(CLAVE_VERSION, 1, timeout=None)
+    _catalogo = None
+
+
+def invalidar():
+    # Se invalida ya (para esta misma petición/hilo) y otra vez al confirmar la
+    # transacción, para que nadie se quede con datos leídos antes del COMMIT
+    _incrementar_version()
+    transaction.on_commit(_incrementar_version)
@@ -0,0 +1,67 @@
+# Peticiones condicionales (ETag / Last-Modified) para las páginas que las
+# tablets consultan una y otra vez sin que nada haya cambiado. La versión de la
+# página sale de una sola consulta agregada sobre las filas que muestra (cuántas
+# hay y su última modificación): si el navegador ya la tiene, 304 sin ejecutar
+# la consulta completa ni renderizar la plantilla. Contar las filas detecta
+# también los borrados, que no dejan marca de modificación.
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+class Version:
+
+    def __init__(self, request, datos, *extra):
+        # datos: {'filas': cantidad, <nombre>: última modificación, ...}
+        datos = dict(datos)
+        self.filas = datos.pop('filas')
+        ultimas = [valor for valor in datos.values() if valor is not None]
+        self.ultima = max(ultimas) if ultimas else None
+        # La página también depende de la URL (filtros, cursor), del día (filtro
+        # "hoy") y del token CSRF de sus formularios, que cambia al iniciar sesión
+        partes = [
+            request.get_full_path(),
+            timezone.localdate(),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            self.filas,
+            *datos.values(),
+            *extra,
+        ]
+        self.etag = '"%s"' % hashlib.md5('|'.join(map(str, partes)).encode()).hexdigest()
+
+    def no_modificado(self, request):
+        # Devuelve la respuesta 304 (o 412) si corresponde, None si hay que
+        # generar la página. Con mensajes pendientes se genera para mostrarlos.
+        if len(messages.get_messages(request)):
+            return None
+        ultima = int(self.ultima.timestamp()) if self.ultima else None
+        return get_conditional_response(request, etag=self.etag, last_modified=ultima)
+
+    def marcar(self, response):
+        response['ETag'] = self.etag
+        if self.ultima:
+            response['Last-Modified'] = http_date(self.ultima.timestamp())
+        # Cada uso vuelve a validar: la página sólo se reutiliza tras un 304
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+
+def _agregados(campos):
+    return {'filas': Count('pk'), **{f'ultima_{i}': Max(campo) for i, campo in enumerate(campos)}}
+
+
+def version(request, qs, campos=('actualizado',), extra=()):
+    # 'campos': fechas de modificación de las filas y de lo que la página muestra
+    # de ellas (p. ej. 'categoria__actualizado' en la lista de productos)
+    return Version(request, qs.aggregate(**_agregados(campos)), *extra)
+
+
+async def aversion(request, qs, campos=('actualizado',), extra=()):
+    return Version(request, await qs.aaggregate(**_agregados(campos)), *extra)
@@ -0,0 +1,191 @@
+# Escritura agrupada (group commit) de pedidos nuevos. Con varias peticiones a
+# la vez cada una confirma su propia transacción y todas hacen fila por el único
+# bloqueo de escritura de SQLite, pagando cada una su BEGIN/COMMIT. Con la cola
+# activa (ESCRITURA_LOTE > 0) la petición deja su pedido a un hilo escritor del
+# proceso, que junta lo que llega durante ESCRITURA_ESPERA_MS (hasta
+# ESCRITURA_LOTE pedidos), lo confirma en una sola transacción con dos INSERT
+# masivos y devuelve a cada petición su pedido ya guardado, con su id.
+# Sólo agrupa peticiones que llegan a la vez desde varios hilos del mismo
+# proceso: un servidor WSGI con hilos (gunicorn --threads, runserver). Bajo
+# ASGI la vista síncrona crear_pedido corre en el único hilo compartido de
+# Django (thread_sensitive), de a una petición por vez, y no hay nada que juntar.
+# Benchmark: manage.py bench_escritura_agrupada.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import eventos, tickets
+from .models import DetallePedido, Pedido
+
+# Segundos máximos que una petición espera a que se confirme su lote
+TIEMPO_MAXIMO = 30
+
+_FIN = object()
+
+
+def anunciar(creados):
+    # Dentro de la transacción que guardó los pedidos [(pedido, detalles)]: al
+    # confirmar, la cocina recibe cada pedido y sus tickets se generan en segundo plano
+    for pedido, detalles in creados:
+        eventos.publicar_al_confirmar(eventos.evento_pedido(eventos.PEDIDO_CREADO, pedido, detalles))
+    ids = [pedido.pk for pedido, _ in creados]
+    transaction.on_commit(lambda: tickets.pre_renderizar_lote(ids), robust=True)
+
+
+def reiniciar(pedido, detalles):
+    # Después de un intento revertido las instancias conservan los id que les
+    # dio el INSERT: se vuelven a dejar como nuevas para reintentar
+    pedido.pk = None
+    pedido._state.adding = True
+    for det in detalles:
+        det.pk = None
+        det._state.adding = True
+        det.pedido = pedido
+
+
+def guardar_lote(creados):
+    # Pedidos nuevos con sus líneas en una transacción: un INSERT para las
+    # cabeceras y otro para todas las líneas (SQLite devuelve los id de bulk_create)
+    for pedido, detalles in creados:
+        pedido.total = sum(det.subtotal for det in detalles)
+    with transaction.atomic():
+        Pedido.objects.bulk_create([pedido for pedido, _ in creados])
+        lineas = []
+        for pedido, detalles in creados:
+            for det in detalles:
+                det.pedido = pedido
+            lineas.extend(detalles)
+        DetallePedido.objects.bulk_create(lineas)
+        anunciar(creados)
+    return [pedido for pedido, _ in creados]
+
+
+class ColaEscritura:
+    def __init__(self, lote, espera):
+        self.lote = lote
+        self.espera = espera
+        self._cola = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._pid = None
+        self._ultimo = 0
+
+    def guardar(self, pedido, detalles, timeout=TIEMPO_MAXIMO):
+        futuro = Future()
+        self._arrancar()
+        self._cola.put((pedido, detalles, futuro))
+        try:
+            return futuro.result(timeout)
+        except TimeoutError:
+            # Si el escritor todavía no lo tomó se descarta; si ya está en una
+            # transacción, se espera a que termine para no dar por perdido un
+            # pedido que sí quedó guardado
+            if futuro.cancel():
+                raise
+            return futuro.result()
+
+    def detener(self):
+        # Termina el hilo después de confirmar lo que ya estaba en la cola
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None and hilo.is_alive():
+            self._cola.put(_FIN)
+            hilo.join()
+
+    def _arrancar(self):
+        # Un hilo por proceso: después de un fork el del padre no existe en el hijo
+        with self._lock:
+            if self._hilo is None or self._pid != os.getpid() or not self._hilo.is_alive():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._escribir, name='escritura-pedidos', daemon=True)
+                self._hilo.start()
+
+    def _escribir(self):
+        try:
+            while True:
+                tanda, seguir = self._juntar()
+                # Los que vencieron esperando ya no se guardan
+                tanda = [item for item in tanda if item[2].set_running_or_notify_cancel()]
+                if tanda:
+                    self._confirmar(tanda)
+                if not seguir:
+                    return
+        finally:
+            connection.close()
+
+    def _juntar(self):
+        # Espera el primer pedido y después, como mucho 'espera' segundos, los
+        # que lleguen hasta completar el lote. Sin concurrencia (el lote
+        # anterior fue de uno y no hay nadie más en la cola) no se espera: un
+        # pedido solo no paga la latencia del agrupamiento.
+        primero = self._cola.get()
+        if primero is _FIN:
+            return [], False
+        tanda = [primero]
+        espera = self.espera if self._ultimo > 1 or not self._cola.empty() else 0
+        limite = time.monotonic() + espera
+        while len(tanda) < self.lote:
+            restante = limite - time.monotonic()
+            try:
+                item = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FIN:
+                return tanda, False
+            tanda.append(item)
+        self._ultimo = len(tanda)
+        return tanda, True
+
+    def _confirmar(self, tanda):
+        # El hilo conserva su conexión entre lotes (CONN_MAX_AGE no aplica);
+        # sólo se reabre si un error la dejó inservible
+        try:
+            guardar_lote([(pedido, detalles) for pedido, detalles, _ in tanda])
+        except Exception as error:
+            if not connection.is_usable():
+                connection.close()
+            if len(tanda) == 1:
+                tanda[0][2].set_exception(error)
+                return
+            # Un pedido con datos inválidos no hace fallar a los demás: se
+            # vuelve a intentar cada uno en su propia transacción
+            for pedido, detalles, futuro in tanda:
+                reiniciar(pedido, detalles)
+                self._confirmar([(pedido, detalles, futuro)])
+        else:
+            for pedido, _, futuro in tanda:
+                futuro.set_result(pedido)
+
+
+_cola = None
+_lock = threading.Lock()
+
+
+def obtener_cola():
+    # None si la escritura agrupada está desactivada
+    global _cola
+    lote = getattr(settings, 'ESCRITURA_LOTE', 0)
+    espera = getattr(settings, 'ESCRITURA_ESPERA_MS', 2) / 1000
+    with _lock:
+        if _cola is not None and (_cola.lote, _cola.espera) != (lote, espera):
+            _cola.detener()
+            _cola = None
+        if _cola is None and lote > 0:
+            _cola = ColaEscritura(lote, espera)
+        return _cola
+
+
+def guardar(pedido, detalles):
+    # Lo que usa crear_pedido. Si el llamador ya está dentro de una transacción
+    # el pedido se guarda en ella: el escritor confirma por su cuenta y se
+    # saltaría el atomic() de afuera
+    cola = obtener_cola()
+    if cola is None or transaction.get_connection().in_atomic_block:
+        guardar_lote([(pedido, detalles)])
+        return pedido
+    return cola.guardar(pedido, detalles)
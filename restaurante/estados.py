@@ -0,0 +1,104 @@
+# Máquina de estados del pedido: PENDIENTE -> PREPARANDO -> ENTREGADO y
+# cualquier estado abierto -> CANCELADO. Todos los pedidos de una llamada se
+# cambian juntos con un UPDATE ... WHERE id IN (...) AND estado = <origen>
+# RETURNING id por cada estado de origen, sin leerlos antes: si otro mozo o la
+# cocina ya cambió alguno, el UPDATE no lo toca y queda rechazado en vez de
+# pisar el cambio ajeno, y RETURNING dice cuáles cambiaron (y desde qué
+# estado, para el historial). Así un pedido se cierra (y suma al resumen de
+# ventas) una sola vez aunque lleguen dos cierres a la par.
+import logging
+
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from . import eventos, ventas
+from .models import Pedido, TransicionPedido
+
+logger = logging.getLogger(__name__)
+
+Estado = Pedido.Estado
+
+# Estado nuevo -> estados desde los que se puede llegar
+ORIGENES = {
+    Estado.PREPARANDO: (Estado.PENDIENTE,),
+    Estado.ENTREGADO: (Estado.PREPARANDO,),
+    Estado.CANCELADO: (Estado.PENDIENTE, Estado.PREPARANDO),
+}
+# Columna con el momento en que el pedido entró a cada estado
+MARCAS = {
+    Estado.PREPARANDO: 'preparando_en',
+    Estado.ENTREGADO: 'entregado_en',
+    Estado.CANCELADO: 'cancelado_en',
+}
+
+
+# Ids por sentencia, por debajo del límite de parámetros de SQLite
+TRAMO = 900
+
+
+class TransicionInvalida(ValueError):
+    pass
+
+
+def _actualizar(pks, origen, cambios):
+    # Aplica 'cambios' a los pedidos de 'pks' que siguen en 'origen' y devuelve
+    # sus ids. SQL directo: el ORM no devuelve las filas de un UPDATE.
+    ops = connection.ops
+    campos = [Pedido._meta.get_field(nombre) for nombre in cambios]
+    valores = [campo.get_db_prep_save(cambios[campo.name], connection) for campo in campos]
+    pk = ops.quote_name(Pedido._meta.pk.column)
+    sql = 'UPDATE {tabla} SET {asignaciones} WHERE {pk} IN ({{}}) AND {estado} = %s RETURNING {pk}'.format(
+        tabla=ops.quote_name(Pedido._meta.db_table),
+        asignaciones=', '.join(f'{ops.quote_name(campo.column)} = %s' for campo in campos),
+        pk=pk,
+        estado=ops.quote_name(Pedido._meta.get_field('estado').column),
+    )
+    cambiados = []
+    with connection.cursor() as cursor:
+        for desde in range(0, len(pks), TRAMO):
+            tramo = pks[desde:desde + TRAMO]
+            cursor.execute(sql.format(', '.join(['%s'] * len(tramo))), [*valores, *tramo, origen])
+            cambiados.extend(fila[0] for fila in cursor.fetchall())
+    return cambiados
+
+
+def cambiar_estado(pks, nuevo, usuario=None):
+    # Aplica la transición a los pedidos indicados y devuelve los que cambiaron,
+    # ya con el estado nuevo; los demás no existen o no estaban en un estado de
+    # origen válido
+    if nuevo not in ORIGENES:
+        raise TransicionInvalida(f"No se puede pasar un pedido a {nuevo!r}")
+    if usuario is not None and not usuario.is_authenticated:
+        usuario = None
+
+    ahora = timezone.now()
+    cambios = {'estado': nuevo, MARCAS[nuevo]: ahora, 'actualizado': ahora}
+    pks = list(dict.fromkeys(pks))
+    try:
+        with transaction.atomic():
+            # Un pedido que pasa desde el primer origen ya no está en el segundo
+            anteriores = {}
+            for origen in ORIGENES[nuevo]:
+                for pk in _actualizar(pks, origen, cambios):
+                    anteriores[pk] = origen
+            if not anteriores:
+                return []
+
+            TransicionPedido.objects.bulk_create(
+                TransicionPedido(pedido_id=pk, estado_anterior=origen, estado_nuevo=nuevo, usuario=usuario)
+                for pk, origen in anteriores.items()
+            )
+            cambiados = list(Pedido.objects.filter(pk__in=anteriores).order_by('id'))
+            for pedido in cambiados:
+                if nuevo in ventas.ESTADOS_CERRADOS:
+                    # El pedido se cierra: sus líneas pasan al resumen de ventas
+                    ventas.registrar_venta(pedido)
+                eventos.publicar_al_confirmar(eventos.evento_pedido(eventos.ESTADO_CAMBIADO, pedido))
+    except OperationalError as exc:
+        if 'locked' not in str(exc):
+            raise
+        # La base siguió bloqueada más allá de su timeout: la transacción se
+        # deshizo entera, así que ninguno cambió y todos quedan rechazados
+        logger.warning("Cambio a %s sin aplicar, base bloqueada: pedidos %s", nuevo, pks)
+        return []
+    return cambiados
@@ -0,0 +1,91 @@
+# Eventos de pedidos para las pantallas de cocina. Las vistas síncronas publican
+# (al confirmar la transacción) y el endpoint SSE asíncrono reenvía cada evento
+# a las pantallas conectadas. El canal por defecto vive en memoria del proceso;
+# EVENTOS_BACKEND permite cambiarlo por otro con la misma interfaz
+# (publicar(evento) y suscripcion() como async context manager con una cola).
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+PEDIDO_CREADO = 'pedido_creado'
+ESTADO_CAMBIADO = 'estado_cambiado'
+
+_canal = None
+_canal_lock = threading.Lock()
+
+
+class CanalLocal:
+    # Pub/sub en memoria: cada suscriptor tiene su cola en su propio event loop.
+    # Una pantalla lenta pierde los eventos más viejos en vez de frenar al resto.
+
+    def __init__(self, tamano_cola=100):
+        self.tamano_cola = tamano_cola
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+
+    @property
+    def conectados(self):
+        return len(self._suscriptores)
+
+    @staticmethod
+    def _encolar(cola, evento):
+        if cola.full():
+            cola.get_nowait()
+        cola.put_nowait(evento)
+
+    def publicar(self, evento):
+        # Se puede llamar desde cualquier hilo (vistas WSGI incluidas)
+        with self._lock:
+            suscriptores = list(self._suscriptores)
+        for loop, cola in suscriptores:
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, evento)
+            except RuntimeError:
+                # El loop ya se cerró; la suscripción se limpia al salir
+                pass
+
+    @asynccontextmanager
+    async def suscripcion(self):
+        entrada = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.tamano_cola))
+        with self._lock:
+            self._suscriptores.add(entrada)
+        try:
+            yield entrada[1]
+        finally:
+            with self._lock:
+                self._suscriptores.discard(entrada)
+
+
+def obtener_canal():
+    global _canal
+    with _canal_lock:
+        if _canal is None:
+            backend = getattr(settings, 'EVENTOS_BACKEND', 'restaurante.eventos.CanalLocal')
+            _canal = import_string(backend)()
+        return _canal
+
+
+def evento_pedido(tipo, pedido, detalles=None):
+    evento = {
+        'tipo': tipo,
+        'id': pedido.id,
+        'estado': pedido.estado,
+        'tipo_pedido': pedido.tipo,
+        'mesa': pedido.mesa,
+        'cliente': pedido.cliente_nombre,
+        'fecha': pedido.fecha.isoformat() if pedido.fecha else None,
+    }
+    if detalles is not None:
+        evento['lineas'] = [
+            {'producto': det.producto.nombre, 'cantidad': det.cantidad} for det in detalles
+        ]
+    return evento
+
+
+def publicar_al_confirmar(evento):
+    # Las pantallas sólo se enteran de lo que quedó guardado
+    transaction.on_commit(lambda: obtener_canal().publicar(evento), robust=True)
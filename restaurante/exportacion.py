@@ -0,0 +1,247 @@
+# Exportación de pedidos y ventas filtrados a CSV o XLSX sin armar el archivo en
+# memoria: las filas salen de la base con iterator() por tramos, se escriben a
+# un búfer y el búfer se vacía hacia la respuesta después de cada tramo. El
+# total es el guardado en el pedido; el subtotal de cada línea se calcula en SQL.
+import codecs
+import csv
+import re
+import zipfile
+from datetime import datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.db.models import DecimalField, F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .models import DetallePedido, Pedido
+
+TRAMO = 2000
+# SQLite devuelve los importes calculados sin escala fija (182 en vez de 182.00)
+CENTAVO = Decimal('0.01')
+# Texto que Excel tomaría como fórmula al abrir el CSV
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+# Caracteres de control que XML no admite: dejarían el XLSX ilegible
+CONTROL_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+COLUMNAS_PEDIDOS = ['Pedido', 'Fecha', 'Tipo', 'Mesa', 'Cliente', 'Estado', 'Total']
+COLUMNAS_LINEAS = [
+    'Pedido', 'Fecha', 'Tipo', 'Estado', 'Producto', 'Categoría', 'Cantidad', 'Precio unitario', 'Subtotal',
+]
+
+
+def _etiquetas():
+    # Traducidas y zona horaria resuelta una sola vez, no por cada fila
+    return (
+        {valor: str(etiqueta) for valor, etiqueta in Pedido.TipoPedido.choices},
+        {valor: str(etiqueta) for valor, etiqueta in Pedido.Estado.choices},
+        timezone.get_current_timezone(),
+    )
+
+
+def filas_pedidos(qs):
+    # Una fila por pedido, con el total guardado (se mantiene al día con las líneas)
+    tipos, estados, zona = _etiquetas()
+    filas = qs.values_list('id', 'fecha', 'tipo', 'mesa', 'cliente_nombre', 'estado', 'total')
+    for pk, fecha, tipo, mesa, cliente, estado, total in filas.iterator(chunk_size=TRAMO):
+        yield [pk, fecha.astimezone(zona), tipos[tipo], mesa or '', cliente or '', estados[estado], total]
+
+
+def filas_lineas(qs):
+    # Una fila por línea de pedido, en el orden de los pedidos. Las líneas se
+    # piden por tramos de pedidos (como un prefetch), no con un JOIN ordenado
+    # por fecha que obligaría a SQLite a ordenar todo el año antes de la primera
+    # fila. Las líneas se leen de la misma base que los pedidos (principal o archivo).
+    tipos, estados, zona = _etiquetas()
+    subtotal = Round(
+        F('cantidad') * F('precio_unitario'), 2, output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+    tramo = []
+
+    def lineas_del_tramo():
+        lineas = {}
+        consulta = (
+            DetallePedido.objects.using(qs.db).filter(pedido_id__in=[p[0] for p in tramo])
+            .annotate(subtotal=subtotal)
+            .order_by('id')
+            .values_list('pedido_id', 'producto__nombre', 'producto__categoria__nombre',
+                         'cantidad', 'precio_unitario', 'subtotal')
+        )
+        for pedido_id, *resto in consulta:
+            lineas.setdefault(pedido_id, []).append(resto)
+        for pk, fecha, tipo, estado in tramo:
+            fecha = fecha.astimezone(zona)
+            for producto, categoria, cantidad, precio, importe in lineas.get(pk, ()):
+                yield [
+                    pk, fecha, tipos[tipo], estados[estado],
+                    producto, categoria, cantidad, precio, importe.quantize(CENTAVO),
+                ]
+
+    for pedido in qs.values_list('id', 'fecha', 'tipo', 'estado').iterator(chunk_size=TRAMO):
+        tramo.append(pedido)
+        if len(tramo) == TRAMO:
+            yield from lineas_del_tramo()
+            tramo = []
+    if tramo:
+        yield from lineas_del_tramo()
+
+
+class Bufer:
+    # Archivo de sólo escritura que acumula lo escrito (en UTF-8) hasta que se lo
+    # vacía; sin seek/tell, así zipfile escribe el XLSX en modo streaming
+    def __init__(self):
+        self.partes = []
+
+    def write(self, datos):
+        self.partes.append(datos.encode() if isinstance(datos, str) else datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.partes)
+        self.partes = []
+        return datos
+
+
+def _celda_csv(valor):
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    # Nombres y clientes los escribe el usuario: con ' adelante Excel los
+    # muestra como texto en vez de evaluarlos
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        return "'" + valor
+    return valor
+
+
+def generar_csv(columnas, filas):
+    bufer = Bufer()
+    escritor = csv.writer(bufer)
+    # BOM para que Excel abra el archivo como UTF-8
+    yield codecs.BOM_UTF8
+    escritor.writerow(columnas)
+    for n, fila in enumerate(filas, 1):
+        escritor.writerow([_celda_csv(valor) for valor in fila])
+        if n % TRAMO == 0:
+            yield bufer.vaciar()
+    yield bufer.vaciar()
+
+
+# ----- XLSX mínimo (Office Open XML) -----
+# Una hoja con cadenas en línea (sin sharedStrings, que obligaría a conocer
+# todas las cadenas antes de escribir) y estilos para fecha, importe y encabezado.
+TIPOS_CONTENIDO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# Estilo 1: fecha y hora (formato propio 164); 2: importe con 2 decimales; 3: negrita
+ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '</styleSheet>'
+)
+CABECERA_HOJA = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+)
+PIE_HOJA = '</sheetData></worksheet>'
+EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+def _celda_xlsx(valor, estilo_texto=''):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, datetime):
+        # Número de serie de Excel en hora local, sin zona
+        serie = (valor.replace(tzinfo=None) - EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c s="1"><v>{serie:.6f}</v></c>'
+    if isinstance(valor, Decimal):
+        return f'<c s="2"><v>{valor}</v></c>'
+    if isinstance(valor, int):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(CONTROL_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"{estilo_texto}><is><t>{texto}</t></is></c>'
+
+
+def generar_xlsx(columnas, filas, hoja='Pedidos'):
+    bufer = Bufer()
+    with zipfile.ZipFile(bufer, 'w', zipfile.ZIP_DEFLATED) as libro:
+        libro.writestr('[Content_Types].xml', TIPOS_CONTENIDO)
+        libro.writestr('_rels/.rels', RELACIONES)
+        libro.writestr('xl/workbook.xml', LIBRO.format(hoja=escape(hoja)))
+        libro.writestr('xl/_rels/workbook.xml.rels', RELACIONES_LIBRO)
+        libro.writestr('xl/styles.xml', ESTILOS)
+        with libro.open('xl/worksheets/sheet1.xml', 'w') as hoja_xml:
+            encabezado = ''.join(_celda_xlsx(columna, ' s="3"') for columna in columnas)
+            hoja_xml.write(f'{CABECERA_HOJA}<row>{encabezado}</row>'.encode())
+            partes = []
+            for fila in filas:
+                partes.append('<row>' + ''.join(_celda_xlsx(valor) for valor in fila) + '</row>')
+                if len(partes) == TRAMO:
+                    hoja_xml.write(''.join(partes).encode())
+                    partes = []
+                    yield bufer.vaciar()
+            hoja_xml.write((''.join(partes) + PIE_HOJA).encode())
+    yield bufer.vaciar()
+
+
+async def en_tramos(generador):
+    # Bajo ASGI, StreamingHttpResponse lee un iterador síncrono entero (en un
+    # hilo, con sync_to_async(list)) antes de enviar el primer byte. Así cada
+    # tramo se genera en el hilo de la petición y sale apenas está listo.
+    siguiente = sync_to_async(next)
+    fin = object()
+    while (tramo := await siguiente(generador, fin)) is not fin:
+        yield tramo
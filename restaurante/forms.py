@@ -1,8 +1,12 @@
 from decimal import Decimal
 from django import forms
+from django.db import transaction
 from django.forms import inlineformset_factory
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 from .models import Pedido, DetallePedido, Producto, Categoria
+from .catalogo import obtener_catalogo
+from .ventas import ESTADOS_CERRADOS
 
 class CategoriaForm(forms.ModelForm):
     class Meta:
@@ -35,6 +39,14 @@ class PedidoForm(forms.ModelForm):
             'cliente_nombre': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Nombre del cliente'}),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Un pedido nace abierto: se cierra (ENTREGADO/CANCELADO) con
+        # estados.cambiar_estado, que es lo que lo suma al resumen de ventas
+        self.fields['estado'].choices = [
+            (valor, etiqueta) for valor, etiqueta in Pedido.Estado.choices if valor not in ESTADOS_CERRADOS
+        ]
+
     def clean(self):
         cleaned = super().clean()
         tipo = cleaned.get('tipo')
@@ -44,18 +56,34 @@ class PedidoForm(forms.ModelForm):
         return cleaned
 
 
+class ProductoChoiceField(forms.ModelChoiceField):
+    # Si el formset ya cargó los productos enviados (in_bulk) se toman de ahí
+    # en lugar de hacer un SELECT por línea
+    productos = None
+
+    def to_python(self, value):
+        if self.productos is not None and value not in self.empty_values:
+            try:
+                return self.productos[int(value)]
+            except (KeyError, TypeError, ValueError):
+                pass
+        return super().to_python(value)
+
+
 class DetallePedidoForm(forms.ModelForm):
     class Meta:
         model = DetallePedido
         fields = ['producto', 'cantidad', 'precio_unitario']
+        field_classes = {'producto': ProductoChoiceField}
         widgets = {
             'producto': forms.Select(attrs={'class': 'form-control producto-select'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'precio_unitario': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, productos=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.fields['producto'].productos = productos
    
         self.fields['producto'].required = False
         self.fields['cantidad'].required = False
@@ -84,7 +112,29 @@ class DetallePedidoForm(forms.ModelForm):
 
         return cleaned
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Un producto tomado del diccionario del formset ya existe: no hace falta
+        # que la validación del modelo lo vuelva a consultar
+        if self.fields['producto'].productos is not None:
+            exclude.add('producto')
+        return exclude
+
 class DetallePedidoBaseFormSet(forms.BaseInlineFormSet):
+
+    @cached_property
+    def productos_enviados(self):
+        # Los productos de las filas (y su precio por defecto) salen del catálogo
+        # en memoria, sin consultar la base
+        if not self.is_bound:
+            return None
+        return obtener_catalogo().por_id
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        kwargs['productos'] = self.productos_enviados
+        return kwargs
+
     def clean(self):
         super().clean()
         if any(self.errors):
@@ -102,6 +152,15 @@ class DetallePedidoBaseFormSet(forms.BaseInlineFormSet):
         if formularios_validos < 1:
             raise ValidationError('Debe agregar al menos un producto al pedido.')
 
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        # Las líneas y el total guardado del pedido cambian juntos o no cambian
+        with transaction.atomic():
+            detalles = super().save(commit=True)
+            self.instance.recalcular_total()
+        return detalles
+
 
 DetallePedidoFormSet = inlineformset_factory(
     Pedido,
@@ -0,0 +1,338 @@
+# Importación masiva de menú e historial de ventas desde CSV o JSON Lines.
+# Las filas se leen de a una y se guardan por lotes (una transacción por lote),
+# así la memoria depende del tamaño del lote y no del archivo. Las claves
+# foráneas se resuelven con mapas nombre -> id en memoria (categorías y
+# productos); los pedidos de cada lote de líneas se validan con una consulta.
+import csv
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import busqueda, catalogo
+from .models import Categoria, DetallePedido, Pedido, Producto
+
+VERDADEROS = {'1', 'true', 'si', 'sí', 'yes', 'x'}
+CERO = '0.00'
+TIPOS = frozenset(Pedido.TipoPedido.values)
+ESTADOS = frozenset(Pedido.Estado.values)
+
+
+class ErrorFila(ValueError):
+    pass
+
+
+def leer_filas(archivo, formato):
+    # Generador de dicts: nunca carga el archivo entero. Una línea JSON ilegible
+    # se entrega como ErrorFila para que se rechace sin cortar la lectura.
+    if formato == 'csv':
+        yield from csv.DictReader(archivo)
+        return
+    for linea in archivo:
+        linea = linea.strip()
+        if linea:
+            try:
+                yield json.loads(linea)
+            except ValueError as exc:
+                yield ErrorFila(f"JSON inválido: {exc}")
+
+
+def _texto(fila, campo, obligatorio=True):
+    valor = fila.get(campo)
+    # CSV siempre trae str; JSON puede traer números
+    valor = valor.strip() if type(valor) is str else '' if valor is None else str(valor).strip()
+    if obligatorio and not valor:
+        raise ErrorFila(f"falta '{campo}'")
+    return valor or None
+
+
+def _decimal(fila, campo):
+    try:
+        return Decimal(_texto(fila, campo)).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ErrorFila(f"'{campo}' no es un número: {fila.get(campo)!r}")
+
+
+def _entero(fila, campo):
+    try:
+        return int(_texto(fila, campo))
+    except ValueError:
+        raise ErrorFila(f"'{campo}' no es un entero: {fila.get(campo)!r}")
+
+
+def _opcion(fila, campo, opciones, defecto):
+    valor = (_texto(fila, campo, obligatorio=False) or defecto).upper()
+    if valor not in opciones:
+        raise ErrorFila(f"'{campo}' inválido: {valor!r}")
+    return valor
+
+
+def _insertar(modelo, columnas, filas):
+    # INSERT con executemany: bulk_create compila el SQL de cada tanda y crea
+    # una instancia por fila, y a millones de filas eso domina el tiempo
+    ops = connection.ops
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        ops.quote_name(modelo._meta.db_table),
+        ', '.join(ops.quote_name(modelo._meta.get_field(c).column) for c in columnas),
+        ', '.join(['%s'] * len(columnas)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, filas)
+
+
+def _existentes(ids):
+    # Qué pedidos del lote ya están en la base. SQL directo: con miles de ids el
+    # lookup __in del ORM prepara cada valor por separado. De a 900 para no pasar
+    # el límite de parámetros de SQLite con lotes grandes.
+    ids = list(ids)
+    ops = connection.ops
+    sql = 'SELECT {pk} FROM {tabla} WHERE {pk} IN '.format(
+        pk=ops.quote_name(Pedido._meta.pk.column), tabla=ops.quote_name(Pedido._meta.db_table)
+    )
+    encontrados = set()
+    with connection.cursor() as cursor:
+        for desde in range(0, len(ids), 900):
+            tramo = ids[desde:desde + 900]
+            cursor.execute(sql + '({})'.format(', '.join(['%s'] * len(tramo))), tramo)
+            encontrados.update(pk for pk, in cursor.fetchall())
+    return encontrados
+
+
+class Importador(ABC):
+    # Cada subclase define 'modelo' y construir(); sin construir() no se puede
+    # instanciar, en lugar de fallar a mitad de la importación
+    modelo = None
+
+    def __init__(self, lote=5000, progreso=None):
+        self.lote = lote
+        self.progreso = progreso
+        self.leidas = 0
+        self.creadas = 0
+        self.rechazadas = 0
+        self.errores = []
+        self.inicio = None
+
+    def rechazar(self, numero, motivo):
+        self.rechazadas += 1
+        if len(self.errores) < 20:
+            self.errores.append(f"fila {numero}: {motivo}")
+
+    @property
+    def por_segundo(self):
+        transcurrido = time.perf_counter() - self.inicio if self.inicio else 0
+        return self.creadas / transcurrido if transcurrido else 0.0
+
+    @abstractmethod
+    def construir(self, fila):
+        # Fila leída (dict) -> instancia sin guardar; ErrorFila si no es válida
+        ...
+
+    def guardar(self, objetos):
+        # objetos: [(número de fila, instancia)]; devuelve cuántas se insertaron
+        self.modelo.objects.bulk_create([obj for _, obj in objetos])
+        return len(objetos)
+
+    def preparar(self):
+        pass
+
+    def finalizar(self):
+        pass
+
+    def ejecutar(self, filas):
+        self.inicio = time.perf_counter()
+        self.preparar()
+        pendientes = []
+        for numero, fila in enumerate(filas, 1):
+            self.leidas += 1
+            try:
+                if isinstance(fila, ErrorFila):
+                    raise fila
+                pendientes.append((numero, self.construir(fila)))
+            except ErrorFila as exc:
+                self.rechazar(numero, exc)
+            if len(pendientes) >= self.lote:
+                self._guardar_lote(pendientes)
+                pendientes = []
+        if pendientes:
+            self._guardar_lote(pendientes)
+        self.finalizar()
+        return self
+
+    def _guardar_lote(self, objetos):
+        with transaction.atomic():
+            self.creadas += self.guardar(objetos)
+        if self.progreso:
+            self.progreso(self)
+
+
+class ImportadorCategorias(Importador):
+    # Columnas: nombre, descripcion. Las que ya existen se ignoran.
+    modelo = Categoria
+
+    def construir(self, fila):
+        return Categoria(nombre=_texto(fila, 'nombre'), descripcion=_texto(fila, 'descripcion', obligatorio=False))
+
+    def guardar(self, objetos):
+        nombres = {obj.nombre for _, obj in objetos}
+        existentes = set(Categoria.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+        nuevas, vistas = [], set()
+        for numero, obj in objetos:
+            if obj.nombre in existentes or obj.nombre in vistas:
+                self.rechazar(numero, f"la categoría {obj.nombre!r} ya existe")
+                continue
+            vistas.add(obj.nombre)
+            nuevas.append(obj)
+        Categoria.objects.bulk_create(nuevas)
+        return len(nuevas)
+
+    def finalizar(self):
+        # bulk_create no dispara los signals del catálogo ni del índice de búsqueda
+        catalogo.invalidar()
+        busqueda.reconstruir()
+
+
+class ImportadorProductos(Importador):
+    # Columnas: nombre, categoria (nombre), precio, activo (opcional)
+    modelo = Producto
+
+    def preparar(self):
+        self.categorias = dict(Categoria.objects.values_list('nombre', 'id'))
+
+    def construir(self, fila):
+        categoria = _texto(fila, 'categoria')
+        if categoria not in self.categorias:
+            raise ErrorFila(f"categoría desconocida {categoria!r}")
+        activo = _texto(fila, 'activo', obligatorio=False)
+        return Producto(
+            nombre=_texto(fila, 'nombre'),
+            categoria_id=self.categorias[categoria],
+            precio=_decimal(fila, 'precio'),
+            activo=True if activo is None else activo.lower() in VERDADEROS,
+        )
+
+    def finalizar(self):
+        catalogo.invalidar()
+        busqueda.reconstruir()
+
+
+class ImportadorPedidos(Importador):
+    # Columnas: id, fecha (ISO 8601), tipo, estado, mesa, cliente_nombre. Se
+    # conserva el número de pedido original para que las líneas lo referencien;
+    # el total arranca en cero y lo suman las líneas. Las filas van directo al
+    # INSERT (sin instancias), así la fecha no pasa por auto_now_add; actualizado
+    # es el momento de la importación.
+    modelo = Pedido
+
+    def preparar(self):
+        self.zona = timezone.get_current_timezone()
+        self.adaptar_fecha = connection.ops.adapt_datetimefield_value
+        self.ahora = self.adaptar_fecha(timezone.now())
+
+    def construir(self, fila):
+        try:
+            fecha = datetime.fromisoformat(_texto(fila, 'fecha'))
+        except ValueError:
+            raise ErrorFila(f"fecha inválida: {fila.get('fecha')!r}")
+        if fecha.tzinfo is None:
+            fecha = timezone.make_aware(fecha, self.zona)
+        return (
+            _entero(fila, 'id'),
+            self.adaptar_fecha(fecha),
+            _opcion(fila, 'tipo', TIPOS, Pedido.TipoPedido.MESA),
+            _opcion(fila, 'estado', ESTADOS, Pedido.Estado.ENTREGADO),
+            _texto(fila, 'mesa', obligatorio=False),
+            _texto(fila, 'cliente_nombre', obligatorio=False),
+            CERO,
+            self.ahora,
+        )
+
+    def guardar(self, objetos):
+        existentes = _existentes(fila[0] for _, fila in objetos)
+        nuevos, vistos = [], set()
+        for numero, fila in objetos:
+            if fila[0] in existentes or fila[0] in vistos:
+                self.rechazar(numero, f"el pedido #{fila[0]} ya existe")
+                continue
+            vistos.add(fila[0])
+            nuevos.append(fila)
+        _insertar(Pedido, ('id', 'fecha', 'tipo', 'estado', 'mesa', 'cliente_nombre', 'total', 'actualizado'), nuevos)
+        return len(nuevos)
+
+
+class ImportadorDetalles(Importador):
+    # Columnas: pedido (id), producto (nombre) o producto_id, cantidad y
+    # precio_unitario (opcional: el precio actual del producto). Cada lote suma
+    # sus subtotales al total de los pedidos tocados.
+    modelo = DetallePedido
+
+    def __init__(self, *args, totales=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.totales = totales
+
+    def preparar(self):
+        self.adaptar = connection.ops.adapt_decimalfield_value
+        self.productos = {}
+        # pk -> (precio, precio ya adaptado para el INSERT)
+        self.precios = {}
+        # Con nombres repetidos gana el producto más antiguo
+        for pk, nombre, precio in Producto.objects.order_by('-id').values_list('id', 'nombre', 'precio'):
+            self.productos[nombre] = pk
+            self.precios[pk] = (precio, self.adaptar(precio, 10, 2))
+
+    def construir(self, fila):
+        if _texto(fila, 'producto_id', obligatorio=False):
+            producto = _entero(fila, 'producto_id')
+            if producto not in self.precios:
+                raise ErrorFila(f"producto #{producto} desconocido")
+        else:
+            nombre = _texto(fila, 'producto')
+            producto = self.productos.get(nombre)
+            if producto is None:
+                raise ErrorFila(f"producto desconocido {nombre!r}")
+        cantidad = _entero(fila, 'cantidad')
+        if cantidad < 1:
+            raise ErrorFila("la cantidad debe ser positiva")
+        if _texto(fila, 'precio_unitario', obligatorio=False):
+            precio = _decimal(fila, 'precio_unitario')
+            precio = (precio, self.adaptar(precio, 10, 2))
+        else:
+            precio = self.precios[producto]
+        return (_entero(fila, 'pedido'), producto, cantidad, precio)
+
+    def guardar(self, objetos):
+        existentes = _existentes({fila[0] for _, fila in objetos})
+        validos = []
+        subtotales = defaultdict(Decimal)
+        for numero, (pedido, producto, cantidad, (precio, adaptado)) in objetos:
+            if pedido in existentes:
+                validos.append((pedido, producto, cantidad, adaptado))
+                subtotales[pedido] += cantidad * precio
+            else:
+                self.rechazar(numero, f"el pedido #{pedido} no existe")
+        _insertar(DetallePedido, ('pedido', 'producto', 'cantidad', 'precio_unitario'), validos)
+        if self.totales and subtotales:
+            # Suma incremental en vez de recalcular_totales(): no vuelve a leer
+            # las líneas ya importadas de cada pedido
+            ops = connection.ops
+            total = ops.quote_name(Pedido._meta.get_field('total').column)
+            sql = 'UPDATE {tabla} SET {total} = ROUND({total} + %s, 2), {actualizado} = %s WHERE {pk} = %s'.format(
+                tabla=ops.quote_name(Pedido._meta.db_table), total=total, pk=ops.quote_name(Pedido._meta.pk.column),
+                actualizado=ops.quote_name(Pedido._meta.get_field('actualizado').column),
+            )
+            ahora = ops.adapt_datetimefield_value(timezone.now())
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, [(self.adaptar(valor, 12, 2), ahora, pk) for pk, valor in subtotales.items()])
+        return len(validos)
+
+
+IMPORTADORES = {
+    'categorias': ImportadorCategorias,
+    'productos': ImportadorProductos,
+    'pedidos': ImportadorPedidos,
+    'detalles': ImportadorDetalles,
+}
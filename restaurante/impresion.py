@@ -0,0 +1,121 @@
+# Tickets para impresoras térmicas: texto de ancho fijo y ESC/POS generados
+# directamente desde el pedido, sin plantillas ni PDF. Ambos formatos salen de
+# la misma lista de renglones; ESC/POS sólo agrega los comandos de estilo.
+from django.utils import timezone
+
+ENCABEZADO = [
+    "El Porteño Restauran",
+    "NIT: 123456789 | Cel: 70012345",
+    "El Varador Frente al puerto de carga  #456",
+]
+PIE = [
+    "¡Gracias por su visita!",
+    "Conserve su ticket para cualquier reclamo.",
+]
+
+# Ancho en caracteres de la fuente A: 42 en papel de 80 mm, 32 en 58 mm
+ANCHO = 42
+
+NORMAL = 'normal'
+CENTRADO = 'centrado'
+TITULO = 'titulo'
+NEGRITA = 'negrita'
+
+# Comandos ESC/POS
+ESC = b'\x1b'
+GS = b'\x1d'
+INICIAR = ESC + b'@'
+PAGINA_CODIGOS = ESC + b't\x02'  # PC850 (acentos y ñ)
+CODIFICACION = 'cp850'
+ALINEAR_IZQUIERDA = ESC + b'a\x00'
+ALINEAR_CENTRO = ESC + b'a\x01'
+NEGRITA_SI = ESC + b'E\x01'
+NEGRITA_NO = ESC + b'E\x00'
+DOBLE_TAMANO = GS + b'!\x11'
+TAMANO_NORMAL = GS + b'!\x00'
+CORTAR = GS + b'V\x42\x03'  # avanza 3 líneas y corta parcial
+
+
+def _partir(texto, ancho):
+    # Corta por palabras; una palabra más larga que el ancho se corta a la fuerza
+    renglones, actual = [], ''
+    for palabra in texto.split():
+        while len(palabra) > ancho:
+            if actual:
+                renglones.append(actual)
+                actual = ''
+            renglones.append(palabra[:ancho])
+            palabra = palabra[ancho:]
+        if not actual:
+            actual = palabra
+        elif len(actual) + 1 + len(palabra) <= ancho:
+            actual = f'{actual} {palabra}'
+        else:
+            renglones.append(actual)
+            actual = palabra
+    if actual or not renglones:
+        renglones.append(actual)
+    return renglones
+
+
+def _columnas(izquierda, derecha, ancho):
+    espacio = max(1, ancho - len(izquierda) - len(derecha))
+    return f'{izquierda}{" " * espacio}{derecha}'
+
+
+def renglones(pedido, ancho=ANCHO):
+    # Lista de (estilo, texto) del ticket; pedido.detalles debería venir con
+    # el producto precargado para no consultar por línea
+    fecha = timezone.localtime(pedido.fecha).strftime('%d/%m/%Y %H:%M')
+    separador = '-' * ancho
+
+    salida = [(TITULO, ENCABEZADO[0])]
+    salida += [(CENTRADO, linea) for texto in ENCABEZADO[1:] for linea in _partir(texto, ancho)]
+    salida.append((NORMAL, separador))
+    salida.append((NORMAL, _columnas(f'PEDIDO: #{pedido.id}', fecha, ancho)))
+    salida.append((NORMAL, _columnas(
+        f'TIPO: {pedido.get_tipo_display()}', f'Mesa: {pedido.mesa}' if pedido.mesa else '', ancho,
+    )))
+    cliente = pedido.cliente_nombre or "Consumidor Final"
+    salida += [(NORMAL, linea) for linea in _partir(f'CLIENTE: {cliente}', ancho)]
+    salida.append((NORMAL, separador))
+
+    # Columnas: cantidad (4) | detalle | subtotal (10)
+    ancho_detalle = ancho - 4 - 10
+    salida.append((NEGRITA, f'{"CT.":<4}{"DETALLE":<{ancho_detalle}}{"SUBT.":>10}'))
+    for detalle in pedido.detalles.all():
+        nombre = _partir(detalle.producto.nombre, ancho_detalle - 1)
+        salida.append((NORMAL, f'{detalle.cantidad:<4}{nombre[0]:<{ancho_detalle}}{detalle.subtotal:>10.2f}'))
+        salida += [(NORMAL, f'{"":<4}{resto}') for resto in nombre[1:]]
+
+    salida.append((NORMAL, separador))
+    salida.append((TITULO, _columnas('TOTAL:', f'Bs. {pedido.total:.2f}', ancho // 2)))
+    salida.append((NORMAL, ''))
+    salida += [(CENTRADO, linea) for texto in PIE for linea in _partir(texto, ancho)]
+    return salida
+
+
+def ticket_texto(pedido, ancho=ANCHO):
+    lineas = []
+    for estilo, texto in renglones(pedido, ancho):
+        if estilo in (CENTRADO, TITULO):
+            texto = texto.center(ancho).rstrip()
+        lineas.append(texto)
+    return '\n'.join(lineas) + '\n'
+
+
+def ticket_escpos(pedido, ancho=ANCHO):
+    salida = bytearray(INICIAR + PAGINA_CODIGOS)
+    for estilo, texto in renglones(pedido, ancho):
+        datos = texto.encode(CODIFICACION, errors='replace') + b'\n'
+        if estilo == TITULO:
+            # Doble tamaño: la mitad de columnas, por eso el total usa ancho // 2
+            salida += ALINEAR_CENTRO + DOBLE_TAMANO + NEGRITA_SI + datos + NEGRITA_NO + TAMANO_NORMAL + ALINEAR_IZQUIERDA
+        elif estilo == CENTRADO:
+            salida += ALINEAR_CENTRO + datos + ALINEAR_IZQUIERDA
+        elif estilo == NEGRITA:
+            salida += NEGRITA_SI + datos + NEGRITA_NO
+        else:
+            salida += datos
+    salida += CORTAR
+    return bytes(salida)
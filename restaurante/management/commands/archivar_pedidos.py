@@ -0,0 +1,72 @@
+import math
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.utils import timezone
+
+from restaurante import archivo
+from restaurante.models import Pedido
+from restaurante.views import HORAS_ANALITICA
+
+# La analítica de cocina lee sólo la base principal: lo que abarca no se archiva
+DIAS_MINIMOS = math.ceil(max(HORAS_ANALITICA) / 24)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la base de archivo los pedidos entregados y cancelados de hace más de N días, "
+        "con sus líneas y su historial, por tandas. Si se interrumpe se puede volver a ejecutar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'ARCHIVO_DIAS', 90),
+            help="Se archivan los pedidos cerrados anteriores a hoy menos estos días.",
+        )
+        parser.add_argument('--lote', type=int, default=archivo.LOTE, help="Pedidos por tanda/transacción.")
+        parser.add_argument('--simular', action='store_true', help="Sólo contar lo que se archivaría.")
+
+    def handle(self, *args, **options):
+        if archivo.ALIAS not in settings.DATABASES:
+            raise CommandError(f"Falta la base '{archivo.ALIAS}' en DATABASES.")
+        if options['dias'] < DIAS_MINIMOS:
+            raise CommandError(f"--dias debe ser al menos {DIAS_MINIMOS} (ventana de la analítica de cocina).")
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser mayor que cero.")
+
+        # Medianoche local: se archivan días completos
+        dia = timezone.localdate() - timedelta(days=options['dias'])
+        antes_de = timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+
+        if options['simular']:
+            pendientes = Pedido.objects.filter(estado__in=archivo.ESTADOS, fecha__lt=antes_de).aggregate(
+                pedidos=Count('pk', distinct=True), lineas=Count('detalles')
+            )
+            self.stdout.write(
+                f"Se archivarían {pendientes['pedidos']} pedido(s) con {pendientes['lineas']} línea(s) "
+                f"anteriores al {dia:%Y-%m-%d}."
+            )
+            return
+
+        # Crea la base de archivo o la pone al día con las migraciones
+        call_command('migrate', 'restaurante', database=archivo.ALIAS, verbosity=0)
+
+        inicio = time.perf_counter()
+        ultimo = inicio
+        movidos = 0
+        for cantidad in archivo.archivar(antes_de, lote=options['lote']):
+            movidos += cantidad
+            # Como mucho una línea de progreso por segundo
+            if options['verbosity'] and time.perf_counter() - ultimo >= 1:
+                ultimo = time.perf_counter()
+                self.stderr.write(f"  {movidos} pedidos archivados ({movidos / (ultimo - inicio):,.0f}/s)")
+
+        duracion = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{movidos} pedido(s) anteriores al {dia:%Y-%m-%d} archivados en {duracion:.1f} s; "
+            f"quedan {Pedido.objects.count()} en la base principal."
+        ))
@@ -0,0 +1,98 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.template import engines
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from restaurante import busqueda, catalogo
+from restaurante.benchmarks import datos
+from restaurante.benchmarks.utilidades import base_temporal, resumir
+from restaurante.models import Categoria, Producto
+
+# Lo que teclea un mesero: prefijos cortos, palabras completas y dos palabras
+CONSULTAS = [
+    'sa', 'sal', 'salte', 'pique', 'sopa m', 'lomo mon', 'parri', 'cerv', 'trucha 1', 'api',
+    'silp', 'majadito 3', 'postr', 'fric', 'limonada gr',
+]
+TAMANOS = ['chico', 'mediano', 'grande', 'familiar', 'especial']
+# Cada selector del formulario cuando traía el menú entero
+OPCIONES = """{% for p in productos %}<option value="{{ p.id }}" data-precio="{{ p.precio }}">{{ p.nombre }}</option>
+{% endfor %}"""
+
+
+def buscar_like(texto):
+    # Alternativa sin índice: LIKE '%palabra%' sobre nombre y categoría
+    qs = Producto.objects.filter(activo=True)
+    for palabra in busqueda.PALABRAS.findall(texto):
+        qs = qs.filter(Q(nombre__icontains=palabra) | Q(categoria__nombre__icontains=palabra))
+    return list(qs.select_related('categoria').order_by('nombre')[:busqueda.LIMITE])
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la búsqueda de productos (FTS5 frente a LIKE y el endpoint JSON) con menús "
+        "de distintos tamaños, y el peso del selector con el menú completo. Usa una base temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menus', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        azar = random.Random(1)
+        with base_temporal(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            categorias = Categoria.objects.bulk_create(Categoria(nombre=nombre) for nombre in datos.CATEGORIAS)
+            cliente = Client()
+            self.stdout.write(
+                f"{'menú':>6} {'fts p50':>8} {'fts p95':>8} {'like p50':>9} {'like p95':>9} "
+                f"{'http p50':>9} {'json KiB':>9} {'menú KiB':>9}"
+            )
+            for menu in options['menus']:
+                Producto.objects.all().delete()
+                Producto.objects.bulk_create(
+                    Producto(
+                        nombre=f"{datos.PLATOS[i % len(datos.PLATOS)]} {azar.choice(TAMANOS)} {i // len(datos.PLATOS) + 1}",
+                        categoria=categorias[i % len(categorias)],
+                        precio=Decimal(azar.randrange(500, 12000, 50)) / 100,
+                    )
+                    for i in range(menu)
+                )
+                # bulk_create no dispara signals
+                inicio = time.perf_counter()
+                busqueda.reconstruir()
+                reconstruir_s = time.perf_counter() - inicio
+                catalogo.invalidar()
+
+                tiempos = {'fts': [], 'like': [], 'http': []}
+                bytes_json = []
+                for _ in range(options['repeticiones']):
+                    for consulta in CONSULTAS:
+                        inicio = time.perf_counter()
+                        busqueda.buscar(consulta)
+                        tiempos['fts'].append(time.perf_counter() - inicio)
+
+                        inicio = time.perf_counter()
+                        buscar_like(consulta)
+                        tiempos['like'].append(time.perf_counter() - inicio)
+
+                        inicio = time.perf_counter()
+                        respuesta = cliente.get(reverse('buscar_productos'), {'q': consulta})
+                        tiempos['http'].append(time.perf_counter() - inicio)
+                        bytes_json.append(len(respuesta.content))
+
+                # Lo que pesaba cada selector del formulario con todas las opciones
+                opciones = len(
+                    engines['django'].from_string(OPCIONES).render({'productos': catalogo.obtener_catalogo().activos}).encode()
+                )
+                fts, like, http = (resumir(tiempos[k]) for k in ('fts', 'like', 'http'))
+                self.stdout.write(
+                    f"{menu:>6} {fts['p50_ms']:>8.2f} {fts['p95_ms']:>8.2f} {like['p50_ms']:>9.2f} "
+                    f"{like['p95_ms']:>9.2f} {http['p50_ms']:>9.2f} {max(bytes_json) / 1024:>9.1f} "
+                    f"{opciones / 1024:>9.1f}"
+                )
+                self.stderr.write(f"  índice reconstruido en {reconstruir_s * 1000:.0f} ms")
@@ -0,0 +1,70 @@
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from restaurante import escritura, tickets
+from restaurante.benchmarks.utilidades import base_temporal, resumir
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+
+def guardar_linea_por_linea(pedido, detalles):
+    # Camino anterior de crear_pedido: un INSERT por línea y un UPDATE del total
+    with transaction.atomic():
+        pedido.save()
+        for det in detalles:
+            det.pedido = pedido
+            det.save()
+        pedido.recalcular_total()
+    return pedido
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuánto tiempo se mantiene el bloqueo de escritura de SQLite al guardar "
+        "un pedido, línea por línea frente a bulk_create. Usa una base temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=200, help="Pedidos por escenario.")
+        parser.add_argument(
+            '--lineas', type=int, nargs='+', default=[1, 10, 50],
+            help="Cantidades de líneas por pedido a medir.",
+        )
+
+    def handle(self, *args, **options):
+        # El camino de crear_pedido sin cola (una transacción por pedido); los
+        # PDF se generan después del COMMIT y no son lo que se mide
+        with base_temporal(), override_settings(ESCRITURA_LOTE=0), mock.patch.object(tickets, 'pre_renderizar_lote'):
+            categoria = Categoria.objects.create(nombre="Bench")
+            productos = Producto.objects.bulk_create(
+                Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('10.50') + i)
+                for i in range(100)
+            )
+
+            self.stdout.write(f"{'líneas':>7} {'modo':<16} {'media ms':>9} {'p95 ms':>8} {'consultas':>10}")
+            for lineas in options['lineas']:
+                for nombre, guardar in (('linea_por_linea', guardar_linea_por_linea), ('bulk_create', escritura.guardar)):
+                    tiempos = []
+                    consultas = 0
+                    for n in range(options['pedidos']):
+                        detalles = [
+                            DetallePedido(producto=p, cantidad=2, precio_unitario=p.precio)
+                            for p in productos[n % 50:n % 50 + lineas]
+                        ]
+                        connection.queries_log.clear()
+                        with CaptureQueriesContext(connection) as ctx:
+                            inicio = time.perf_counter()
+                            # Desde el primer INSERT hasta el COMMIT se retiene el bloqueo
+                            guardar(Pedido(), detalles)
+                            tiempos.append(time.perf_counter() - inicio)
+                        consultas += len(ctx.captured_queries)
+
+                    metricas = resumir(tiempos)
+                    self.stdout.write(
+                        f"{lineas:>7} {nombre:<16} {metricas['media_ms']:>9.3f} "
+                        f"{metricas['p95_ms']:>8.3f} {consultas / options['pedidos']:>10.1f}"
+                    )
@@ -0,0 +1,88 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from restaurante.benchmarks.utilidades import base_temporal, pedir_asgi, pedir_wsgi, resumir
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+# Apertura del modal desde la lista de pedidos
+CABECERAS = {'x-requested-with': 'XMLHttpRequest'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara WSGI y ASGI sirviendo el modal de detalle de pedido a varios meseros "
+        "concurrentes (peticiones/s y p99). Usa una base temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--peticiones', type=int, default=1000, help="Peticiones por escenario.")
+        parser.add_argument('--pedidos', type=int, default=300)
+        parser.add_argument('--lineas', type=int, default=6)
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            categoria = Categoria.objects.create(nombre="Bench")
+            productos = Producto.objects.bulk_create(
+                Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('12.50'))
+                for i in range(50)
+            )
+            for n in range(options['pedidos']):
+                pedido = Pedido.objects.create(mesa=str(n % 20))
+                DetallePedido.objects.bulk_create(
+                    DetallePedido(pedido=pedido, producto=productos[(n + i) % 50], cantidad=1, precio_unitario=Decimal('12.50'))
+                    for i in range(options['lineas'])
+                )
+            ids = list(Pedido.objects.values_list('id', flat=True))
+            rutas = [reverse('detalle_pedido', args=[random.choice(ids)]) for _ in range(options['peticiones'])]
+
+            self.stdout.write(f"{'servidor':<8} {'meseros':>8} {'pet/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+            for concurrencia in options['concurrencia']:
+                for nombre, medir in (('wsgi', self.medir_wsgi), ('asgi', self.medir_asgi)):
+                    inicio = time.perf_counter()
+                    tiempos, errores = medir(rutas, concurrencia)
+                    duracion = time.perf_counter() - inicio
+                    metricas = resumir(tiempos)
+                    self.stdout.write(
+                        f"{nombre:<8} {concurrencia:>8} {len(rutas) / duracion:>9.1f} "
+                        f"{metricas['p50_ms']:>8.2f} {metricas['p99_ms']:>8.2f}"
+                        + (f"  errores={errores}" if errores else "")
+                    )
+
+    def medir_wsgi(self, rutas, concurrencia):
+        # Un hilo por mesero, como un servidor WSGI con hilos (gunicorn gthread)
+        aplicacion = WSGIHandler()
+
+        def una(ruta):
+            inicio = time.perf_counter()
+            ok = pedir_wsgi(aplicacion, ruta, CABECERAS)
+            return time.perf_counter() - inicio, ok
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(una, rutas))
+        return [t for t, _ in resultados], sum(not ok for _, ok in resultados)
+
+    def medir_asgi(self, rutas, concurrencia):
+        aplicacion = ASGIHandler()
+
+        async def todas():
+            limite = asyncio.Semaphore(concurrencia)
+
+            async def una(ruta):
+                async with limite:
+                    inicio = time.perf_counter()
+                    ok = await pedir_asgi(aplicacion, ruta, CABECERAS)
+                    return time.perf_counter() - inicio, ok
+
+            return await asyncio.gather(*(una(r) for r in rutas))
+
+        resultados = asyncio.run(todas())
+        return [t for t, _ in resultados], sum(not ok for _, ok in resultados)
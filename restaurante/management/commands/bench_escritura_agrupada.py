@@ -0,0 +1,94 @@
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from restaurante import escritura, tickets
+from restaurante.benchmarks.utilidades import base_temporal, resumir
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Pedidos por segundo con varios hilos del mismo proceso creando pedidos a la vez: "
+        "cada uno en su transacción (ESCRITURA_LOTE=0) y con la escritura agrupada. "
+        "Los números corresponden a un servidor WSGI con hilos (varias peticiones a la vez en un "
+        "proceso); bajo ASGI la vista síncrona corre en un solo hilo y no se agrupa nada. "
+        "Usa una base temporal con los ajustes SQLite del perfil de producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--pedidos', type=int, default=200, help="Pedidos por escritor.")
+        parser.add_argument('--lote', type=int, default=64)
+        parser.add_argument('--espera-ms', type=float, nargs='+', default=[2, 5])
+
+    def handle(self, *args, **options):
+        from administrador import settings_produccion
+
+        modos = [('directo', 0, 0)] + [
+            (f"agrupado {espera:g}ms", options['lote'], espera) for espera in options['espera_ms']
+        ]
+        with base_temporal():
+            connection.settings_dict['OPTIONS'] = settings_produccion.DATABASES['default']['OPTIONS']
+            connection.close()
+            categoria = Categoria.objects.create(nombre="Bench")
+            self.productos = Producto.objects.bulk_create(
+                Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('12.50')) for i in range(50)
+            )
+            self.stdout.write(
+                f"{'modo':<14} {'escrit.':>7} {'pedidos/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'pedidos/tx':>11}"
+            )
+            # Los PDF se generan fuera de la transacción y no son lo que se mide
+            with mock.patch.object(tickets, 'pre_renderizar_lote'):
+                for escritores in options['escritores']:
+                    for modo, lote, espera in modos:
+                        with override_settings(ESCRITURA_LOTE=lote, ESCRITURA_ESPERA_MS=espera):
+                            self.medir(modo, escritores, options['pedidos'])
+                        # Detiene el hilo escritor antes de cambiar de ajustes
+                        escritura.obtener_cola()
+
+    def medir(self, modo, escritores, pedidos):
+        barrera = threading.Barrier(escritores + 1)
+        tiempos, errores = [], []
+
+        def escritor(n):
+            propios = []
+            barrera.wait()
+            try:
+                for i in range(pedidos):
+                    detalles = [
+                        DetallePedido(producto=self.productos[(n + i + j) % len(self.productos)],
+                                      cantidad=2, precio_unitario=Decimal('12.50'))
+                        for j in range(5)
+                    ]
+                    inicio = time.perf_counter()
+                    escritura.guardar(Pedido(mesa=str(n % 20)), detalles)
+                    propios.append(time.perf_counter() - inicio)
+            except Exception as e:
+                errores.append(e)
+            finally:
+                tiempos.extend(propios)
+                connections.close_all()
+
+        hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(escritores)]
+        for hilo in hilos:
+            hilo.start()
+        with mock.patch.object(escritura, 'guardar_lote', wraps=escritura.guardar_lote) as guardar_lote:
+            barrera.wait()
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.join()
+            duracion = time.perf_counter() - inicio
+
+        metricas = resumir(tiempos)
+        self.stdout.write(
+            f"{modo:<14} {escritores:>7} {len(tiempos) / duracion:>10.1f} {metricas['p50_ms']:>8.2f} "
+            f"{metricas['p99_ms']:>8.2f} {len(tiempos) / max(guardar_lote.call_count, 1):>11.1f}"
+        )
+        if errores:
+            self.stderr.write(f"  {len(errores)} escritores fallaron: {errores[0]!r}")
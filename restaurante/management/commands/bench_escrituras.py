@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from restaurante.benchmarks.utilidades import base_temporal, resumir
+
+# Los procesos hijos arrancan con spawn e importan este módulo antes de
+# django.setup(): los modelos se importan dentro de cada función.
+
+
+def _preparar(nombre, perfil):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES['default'].update(NAME=nombre, **perfil)
+    django.setup()
+
+
+def _escritor(nombre, perfil, productos, pedidos, barrera, resultados):
+    _preparar(nombre, perfil)
+    from django.db import OperationalError
+    from restaurante import escritura, tickets
+    from restaurante.models import DetallePedido, Pedido
+
+    creados, bloqueos, tiempos = 0, 0, []
+    # Los PDF se generan después del COMMIT y no son lo que se mide
+    with mock.patch.object(tickets, 'pre_renderizar_lote'):
+        barrera.wait()
+        for n in range(pedidos):
+            detalles = [
+                DetallePedido(
+                    producto_id=productos[(n + i) % len(productos)], cantidad=2, precio_unitario=Decimal('12.50')
+                )
+                for i in range(5)
+            ]
+            inicio = time.perf_counter()
+            try:
+                # Igual que crear_pedido: cabecera y líneas en una transacción
+                escritura.guardar(Pedido(mesa=str(n % 20)), detalles)
+            except OperationalError as exc:
+                if 'locked' not in str(exc):
+                    raise
+                bloqueos += 1
+            else:
+                creados += 1
+                tiempos.append(time.perf_counter() - inicio)
+    resultados.put(('escritor', creados, bloqueos, tiempos))
+
+
+def _lector(nombre, perfil, barrera, fin, resultados):
+    _preparar(nombre, perfil)
+    from django.db import OperationalError
+    from restaurante.models import Pedido
+
+    lecturas, bloqueos = 0, 0
+    barrera.wait()
+    while not fin.is_set():
+        # Lo que consulta lista_pedidos en cada carga
+        try:
+            qs = Pedido.objects.order_by('-fecha', '-id')
+            qs.count()
+            qs.filter(estado=Pedido.Estado.ENTREGADO).ingresos()
+            list(qs[:50])
+        except OperationalError as exc:
+            if 'locked' not in str(exc):
+                raise
+            bloqueos += 1
+        else:
+            lecturas += 1
+    resultados.put(('lector', lecturas, bloqueos, []))
+
+
+class Command(BaseCommand):
+    help = (
+        "Contención de escritura en SQLite con varios procesos creando pedidos a la vez "
+        "(más lectores de la lista), con la configuración por defecto y con el perfil "
+        "administrador.settings_produccion. Usa bases temporales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, nargs='+', default=[4, 16])
+        parser.add_argument('--lectores', type=int, default=2)
+        parser.add_argument('--pedidos', type=int, default=200, help="Pedidos por escritor.")
+
+    def handle(self, *args, **options):
+        from administrador import settings_produccion
+        from restaurante.models import Categoria, Producto
+
+        produccion = settings_produccion.DATABASES['default']
+        perfiles = {
+            'defecto': {'OPTIONS': {}},
+            'produccion': {'OPTIONS': produccion['OPTIONS']},
+        }
+        directorio = tempfile.mkdtemp(prefix='bench-escrituras-')
+        try:
+            with base_temporal() as nombre:
+                categoria = Categoria.objects.create(nombre="Bench")
+                productos = [
+                    p.pk for p in Producto.objects.bulk_create(
+                        Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('12.50'))
+                        for i in range(50)
+                    )
+                ]
+                connection.close()
+                self.stdout.write(
+                    f"{'perfil':<11} {'escrit.':>7} {'pedidos/s':>10} {'bloqueos':>9} "
+                    f"{'p99 ms':>8} {'lecturas/s':>11} {'bloq. lect.':>12}"
+                )
+                for escritores in options['escritores']:
+                    for perfil, ajustes in perfiles.items():
+                        # Copia nueva por escenario: WAL queda grabado en el archivo
+                        copia = os.path.join(directorio, f'{perfil}_{escritores}.sqlite3')
+                        shutil.copy(nombre, copia)
+                        self.medir(perfil, copia, ajustes, productos, escritores, options)
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def medir(self, perfil, nombre, ajustes, productos, escritores, options):
+        contexto = multiprocessing.get_context('spawn')
+        lectores = options['lectores']
+        barrera = contexto.Barrier(escritores + lectores + 1)
+        fin = contexto.Event()
+        resultados = contexto.Queue()
+        procesos = [
+            contexto.Process(target=_escritor, args=(nombre, ajustes, productos, options['pedidos'], barrera, resultados))
+            for _ in range(escritores)
+        ] + [
+            contexto.Process(target=_lector, args=(nombre, ajustes, barrera, fin, resultados))
+            for _ in range(lectores)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+
+        creados = bloqueos = lecturas = bloqueos_lectura = 0
+        tiempos = []
+        for _ in range(escritores):
+            _, ok, errores, duraciones = resultados.get()
+            creados += ok
+            bloqueos += errores
+            tiempos.extend(duraciones)
+        duracion = time.perf_counter() - inicio
+        fin.set()
+        for _ in range(lectores):
+            _, ok, errores, _ = resultados.get()
+            lecturas += ok
+            bloqueos_lectura += errores
+        for proceso in procesos:
+            proceso.join()
+
+        self.stdout.write(
+            f"{perfil:<11} {escritores:>7} {creados / duracion:>10.1f} {bloqueos:>9} "
+            f"{resumir(tiempos)['p99_ms']:>8.1f} {lecturas / duracion:>11.1f} {bloqueos_lectura:>12}"
+        )
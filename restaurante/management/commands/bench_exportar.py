@@ -0,0 +1,60 @@
+import resource
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurante.benchmarks import datos
+from restaurante.benchmarks.utilidades import base_temporal
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una base temporal con un año de pedidos y mide la exportación CSV/XLSX "
+        "filtrada: tiempo hasta el primer byte, tiempo total, tamaño y memoria máxima."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=200000)
+        parser.add_argument('--dias', type=int, default=365)
+
+    def handle(self, *args, **options):
+        with base_temporal(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            sembrados = datos.sembrar(pedidos=options['pedidos'], dias=options['dias'])
+            self.stderr.write(f"Sembrados {sembrados['pedidos']} pedidos y {sembrados['lineas']} líneas")
+            hoy = timezone.localdate()
+            # De menor a mayor: si la memoria no depende del tamaño, el máximo no sube
+            rangos = [('mes', 30), ('año', options['dias'])]
+            cliente = Client()
+            self.stdout.write(
+                f"{'rango':<5} {'detalle':<8} {'fmt':<5} {'filas':>8} {'1er byte ms':>12} "
+                f"{'total s':>8} {'MiB':>7} {'RSS MiB':>8}"
+            )
+            for rango, dias in rangos:
+                for detalle in ('pedidos', 'lineas'):
+                    for formato in ('csv', 'xlsx'):
+                        params = f"?desde={hoy - timedelta(days=dias - 1)}&hasta={hoy}"
+                        if detalle == 'lineas':
+                            params += '&detalle=lineas'
+                        inicio = time.perf_counter()
+                        respuesta = cliente.get(reverse('exportar_pedidos', args=[formato]) + params)
+                        partes = iter(respuesta.streaming_content)
+                        tamano = len(next(partes))
+                        primer_byte = time.perf_counter() - inicio
+                        filas = 0
+                        for parte in partes:
+                            tamano += len(parte)
+                            if formato == 'csv':
+                                filas += parte.count(b'\n')
+                        total = time.perf_counter() - inicio
+                        respuesta.close()
+                        # ru_maxrss en KiB (Linux)
+                        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                        self.stdout.write(
+                            f"{rango:<5} {detalle:<8} {formato:<5} {filas - 1 if filas else '-':>8} "
+                            f"{primer_byte * 1000:>12.1f} {total:>8.2f} {tamano / 2**20:>7.1f} {rss:>8.0f}"
+                        )
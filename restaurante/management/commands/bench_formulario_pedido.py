@@ -0,0 +1,91 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from restaurante import catalogo
+from restaurante.benchmarks.utilidades import base_temporal, resumir
+from restaurante.forms import DetallePedidoFormSet, PedidoForm
+from restaurante.models import Categoria, Producto
+
+# Selector tal como se renderizaba antes: el bucle de productos completo en cada fila
+FILAS_ANTES = """{% for form in formset %}<select>
+{% for p in productos %}<option value="{{ p.id }}" data-precio="{{ p.precio }}"
+{% if form.producto.value|stringformat:"s" == p.id|stringformat:"s" %}selected{% endif %}>{{ p.nombre }}</option>
+{% endfor %}</select>{% endfor %}"""
+
+# Ahora: sólo la opción elegida; las demás llegan con la búsqueda (restaurante/busqueda.py)
+FILAS_AHORA = """{% load catalogo_tags %}{% for form in formset %}<select>
+{% opcion_producto form.producto.value %}</select>{% endfor %}"""
+
+
+def datos_formset(productos, lineas):
+    datos = {
+        'detalles-TOTAL_FORMS': str(lineas),
+        'detalles-INITIAL_FORMS': '0',
+        'detalles-MIN_NUM_FORMS': '0',
+        'detalles-MAX_NUM_FORMS': '1000',
+    }
+    for i in range(lineas):
+        datos[f'detalles-{i}-producto'] = str(productos[i % len(productos)].pk)
+        datos[f'detalles-{i}-cantidad'] = '1'
+    return datos
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el renderizado de los selectores del formulario de pedidos con el menú completo "
+        "en cada fila y con sólo el producto elegido (búsqueda por FTS)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--menus', type=int, nargs='+', default=[50, 500])
+        parser.add_argument('--lineas', type=int, nargs='+', default=[1, 20, 100])
+
+    def handle(self, *args, **options):
+        motor = engines['django']
+        antes = motor.from_string(FILAS_ANTES)
+        ahora = motor.from_string(FILAS_AHORA)
+        peticion = RequestFactory().get('/nuevo/')
+
+        with base_temporal():
+            categoria = Categoria.objects.create(nombre="Bench")
+            self.stdout.write(
+                f"{'menú':>5} {'líneas':>7} {'filas antes ms':>15} {'filas ahora ms':>15} {'página completa ms':>19}"
+            )
+            for menu in options['menus']:
+                Producto.objects.all().delete()
+                productos = Producto.objects.bulk_create(
+                    Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('12.50'))
+                    for i in range(menu)
+                )
+                # bulk_create no dispara signals
+                catalogo.invalidar()
+                activos = catalogo.obtener_catalogo().activos
+
+                for lineas in options['lineas']:
+                    formset = DetallePedidoFormSet(datos_formset(productos, lineas))
+                    tiempos = {'antes': [], 'ahora': [], 'pagina': []}
+                    for _ in range(options['repeticiones']):
+                        inicio = time.perf_counter()
+                        antes.render({'formset': formset, 'productos': activos})
+                        tiempos['antes'].append(time.perf_counter() - inicio)
+
+                        inicio = time.perf_counter()
+                        ahora.render({'formset': formset})
+                        tiempos['ahora'].append(time.perf_counter() - inicio)
+
+                        inicio = time.perf_counter()
+                        render_to_string('pedidos/order_form.html', {
+                            'form': PedidoForm(), 'formset': formset, 'is_create': True,
+                        }, peticion)
+                        tiempos['pagina'].append(time.perf_counter() - inicio)
+
+                    self.stdout.write(
+                        f"{menu:>5} {lineas:>7} {resumir(tiempos['antes'])['p50_ms']:>15.2f} "
+                        f"{resumir(tiempos['ahora'])['p50_ms']:>15.2f} {resumir(tiempos['pagina'])['p50_ms']:>19.2f}"
+                    )
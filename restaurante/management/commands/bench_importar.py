@@ -0,0 +1,86 @@
+import csv
+import os
+import random
+import resource
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from restaurante.benchmarks.datos import CATEGORIAS, PLATOS
+from restaurante.benchmarks.utilidades import base_temporal
+
+
+def escribir_csv(ruta, columnas, filas):
+    with open(ruta, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(columnas)
+        escritor.writerows(filas)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera archivos CSV de historial (menú, pedidos y líneas) y mide 'importar' sobre "
+        "una base temporal: filas por segundo de cada paso y memoria máxima."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lineas', type=int, default=1000000, help="Líneas de pedido a importar.")
+        parser.add_argument('--productos', type=int, default=300)
+        parser.add_argument('--lote', type=int, nargs='+', default=[5000])
+
+    def handle(self, *args, **options):
+        azar = random.Random(1)
+        directorio = tempfile.mkdtemp(prefix='bench-importar-')
+        try:
+            archivos = self.generar(directorio, options['productos'], options['lineas'], azar)
+            self.stdout.write(f"{'lote':>6} {'paso':<11} {'filas':>9} {'segundos':>9} {'filas/s':>10} {'RSS MiB':>8}")
+            for lote in options['lote']:
+                with base_temporal():
+                    for modelo, ruta in archivos:
+                        filas = sum(1 for _ in open(ruta, encoding='utf-8')) - 1
+                        inicio = time.perf_counter()
+                        call_command('importar', modelo, ruta, lote=lote, verbosity=0, stdout=StringIO(), stderr=StringIO())
+                        duracion = time.perf_counter() - inicio
+                        # ru_maxrss en KiB (Linux): máximo del proceso hasta este paso
+                        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                        self.stdout.write(
+                            f"{lote:>6} {modelo:<11} {filas:>9} {duracion:>9.2f} {filas / duracion:>10,.0f} {rss:>8.0f}"
+                        )
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def generar(self, directorio, productos, lineas, azar):
+        nombres = [f"{PLATOS[i % len(PLATOS)]} {i // len(PLATOS) + 1}" for i in range(productos)]
+        pedidos = lineas // 3
+        inicio = datetime(2024, 1, 1, 12)
+        rutas = {
+            modelo: os.path.join(directorio, f'{modelo}.csv')
+            for modelo in ('categorias', 'productos', 'pedidos', 'detalles')
+        }
+        escribir_csv(rutas['categorias'], ['nombre', 'descripcion'], ((c, '') for c in CATEGORIAS))
+        escribir_csv(rutas['productos'], ['nombre', 'categoria', 'precio'], (
+            (nombre, CATEGORIAS[i % len(CATEGORIAS)], f"{azar.randrange(500, 12000, 50) / 100:.2f}")
+            for i, nombre in enumerate(nombres)
+        ))
+        escribir_csv(rutas['pedidos'], ['id', 'fecha', 'tipo', 'estado', 'mesa', 'cliente_nombre'], (
+            (
+                n,
+                (inicio + timedelta(minutes=n * 525600 // pedidos)).isoformat(),
+                'MESA' if n % 5 else 'LLEVAR',
+                'CANCELADO' if n % 13 == 0 else 'ENTREGADO',
+                str(n % 20 + 1) if n % 5 else '',
+                '' if n % 5 else f'Cliente {n % 1000}',
+            )
+            for n in range(1, pedidos + 1)
+        ))
+        escribir_csv(rutas['detalles'], ['pedido', 'producto', 'cantidad', 'precio_unitario'], (
+            # Agrupadas por pedido, como salen de una exportación
+            (n * pedidos // lineas + 1, azar.choice(nombres), azar.choice((1, 1, 1, 2, 3)), '')
+            for n in range(lineas)
+        ))
+        return list(rutas.items())
@@ -0,0 +1,72 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from restaurante import metricas
+from restaurante.benchmarks.utilidades import base_temporal, pedir_wsgi
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+MIDDLEWARE_METRICAS = 'restaurante.metricas.metricas_middleware'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo del middleware de métricas: las mismas peticiones con y sin "
+        "instrumentación, alternadas una a una (mediana por petición). Usa una base temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=1000, help="Peticiones por vista y configuración.")
+
+    def handle(self, *args, **options):
+        # Sin DEBUG: Django no guarda cada consulta en connection.queries
+        with base_temporal(), override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']):
+            categoria = Categoria.objects.create(nombre="Bench")
+            productos = Producto.objects.bulk_create(
+                Producto(nombre=f"Producto {i}", categoria=categoria, precio=Decimal('9.90')) for i in range(40)
+            )
+            for n in range(200):
+                pedido = Pedido.objects.create(mesa=str(n % 15))
+                DetallePedido.objects.bulk_create(
+                    DetallePedido(pedido=pedido, producto=productos[(n + i) % 40], cantidad=1, precio_unitario=Decimal('9.90'))
+                    for i in range(5)
+                )
+            Pedido.objects.recalcular_totales()
+
+            vistas = [
+                ('lista_pedidos', reverse('lista_pedidos'), None),
+                ('detalle_pedido', reverse('detalle_pedido', args=[pedido.pk]), {'x-requested-with': 'XMLHttpRequest'}),
+                ('lista_productos', reverse('lista_productos'), None),
+            ]
+            # Los dos handlers se arman al inicio (la cadena de middlewares se carga
+            # ahí) y se alternan petición por petición, así el ruido del equipo
+            # afecta a ambos por igual
+            sin_metricas = [m for m in settings.MIDDLEWARE if m != MIDDLEWARE_METRICAS]
+            with override_settings(MIDDLEWARE=sin_metricas):
+                handler_sin = WSGIHandler()
+            with override_settings(MIDDLEWARE=[MIDDLEWARE_METRICAS] + sin_metricas):
+                handler_con = WSGIHandler()
+
+            tiempos = {(vista, config): [] for vista, _, _ in vistas for config in ('sin', 'con')}
+            for vista, ruta, cabeceras in vistas:
+                for _ in range(20):
+                    pedir_wsgi(handler_sin, ruta, cabeceras)
+                    pedir_wsgi(handler_con, ruta, cabeceras)
+                for _ in range(options['peticiones']):
+                    for config, aplicacion in (('sin', handler_sin), ('con', handler_con)):
+                        inicio = time.perf_counter()
+                        pedir_wsgi(aplicacion, ruta, cabeceras)
+                        tiempos[vista, config].append(time.perf_counter() - inicio)
+            metricas.registro.reiniciar()
+
+            self.stdout.write(f"{'vista':<16} {'sin ms':>8} {'con ms':>8} {'costo':>7}")
+            for vista, _, _ in vistas:
+                sin = statistics.median(tiempos[vista, 'sin']) * 1000
+                con = statistics.median(tiempos[vista, 'con']) * 1000
+                self.stdout.write(f"{vista:<16} {sin:>8.3f} {con:>8.3f} {(con / sin - 1) * 100:>6.1f}%")
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from restaurante import impresion, tickets
+from restaurante.benchmarks.utilidades import base_temporal
+from restaurante.models import Categoria, DetallePedido, Pedido, Producto
+
+
+class Command(BaseCommand):
+    help = "Compara tickets por segundo: texto plano, ESC/POS y PDF (xhtml2pdf en el mismo proceso)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=50)
+        parser.add_argument('--lineas', type=int, default=8, help="Líneas por pedido.")
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        with base_temporal():
+            categoria = Categoria.objects.create(nombre="Bench")
+            productos = Producto.objects.bulk_create(
+                Producto(nombre=f"Plato especial número {i}", categoria=categoria, precio=Decimal('25.50'))
+                for i in range(options['lineas'])
+            )
+            pedido = Pedido.objects.create(mesa='3', cliente_nombre='Cliente de prueba')
+            DetallePedido.objects.bulk_create(
+                DetallePedido(pedido=pedido, producto=p, cantidad=2, precio_unitario=p.precio) for p in productos
+            )
+            pedido.recalcular_total()
+            # Mismo pedido ya cargado para los tres formatos: sólo se mide el renderizado
+            pedido = Pedido.objects.con_detalles().get(pk=pedido.pk)
+
+            directorio = tempfile.mkdtemp(prefix='bench-tickets-')
+
+            def pdf():
+                ticket = tickets.Ticket(pedido)
+                tickets._generar_pdf(ticket.html, os.path.join(directorio, f'ticket_{pedido.id}_bench.pdf'))
+
+            formatos = [
+                ('texto', lambda: impresion.ticket_texto(pedido)),
+                ('escpos', lambda: impresion.ticket_escpos(pedido)),
+                ('pdf', pdf),
+            ]
+            resultados = {}
+            try:
+                for nombre, generar in formatos:
+                    # El PDF es dos o tres órdenes de magnitud más lento: menos vueltas
+                    vueltas = repeticiones if nombre == 'pdf' else repeticiones * 100
+                    inicio = time.perf_counter()
+                    for _ in range(vueltas):
+                        generar()
+                    resultados[nombre] = vueltas / (time.perf_counter() - inicio)
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+
+            self.stdout.write(f"{'formato':<8} {'tickets/s':>12} {'x PDF':>8}")
+            for nombre, por_segundo in resultados.items():
+                self.stdout.write(f"{nombre:<8} {por_segundo:>12.1f} {por_segundo / resultados['pdf']:>8.0f}")
@@ -0,0 +1,120 @@
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from restaurante import tickets
+from restaurante.benchmarks import datos, flujos
+from restaurante.benchmarks.utilidades import base_temporal
+
+
+def commit_actual():
+    try:
+        salida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=10,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una base temporal con datos realistas y mide los flujos clave del "
+        "restaurante (tiempos y consultas por petición). --json guarda el resultado y "
+        "--comparar lo contrasta con una corrida anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=300)
+        parser.add_argument('--pedidos', type=int, default=200000)
+        parser.add_argument('--lineas', type=int, default=3, help="Líneas promedio por pedido.")
+        parser.add_argument('--dias', type=int, default=365, help="Días de historial.")
+        parser.add_argument('--repeticiones', type=int, default=30, help="Peticiones medidas por flujo.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--flujos', nargs='+', help="Sólo estos flujos (por nombre o prefijo).")
+        parser.add_argument('--json', help="Archivo donde guardar el resultado ('-' para la salida estándar).")
+        parser.add_argument('--comparar', help="Resultado JSON de una corrida anterior.")
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar']) as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {exc}")
+
+        # Tickets con el pool de procesos configurado, como en producción, pero en
+        # un directorio temporal para que siempre se generen de cero
+        directorio = tempfile.mkdtemp(prefix='benchmark-tickets-')
+        ajustes = override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], TICKETS_DIR=directorio)
+        try:
+            with base_temporal(), ajustes:
+                inicio = time.perf_counter()
+                sembrados = datos.sembrar(
+                    productos=options['productos'], pedidos=options['pedidos'], lineas=options['lineas'],
+                    dias=options['dias'], semilla=options['semilla'],
+                )
+                self.stderr.write(
+                    f"Sembrados {sembrados['pedidos']} pedidos y {sembrados['lineas']} líneas "
+                    f"en {time.perf_counter() - inicio:.1f} s"
+                )
+                peticiones = flujos.preparar(options['repeticiones'] + flujos.CALENTAMIENTO, options['semilla'])
+                if options['flujos']:
+                    peticiones = {
+                        nombre: lista for nombre, lista in peticiones.items()
+                        if any(nombre.startswith(prefijo) for prefijo in options['flujos'])
+                    }
+                resultados = {}
+                for nombre, lista in peticiones.items():
+                    self.stderr.write(f"  {nombre}...")
+                    resultados[nombre] = flujos.ejecutar(lista)
+                    # Los tickets que crear_pedido dejó en el pool no deben pisar al flujo siguiente
+                    tickets.esperar_pendientes()
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+        informe = {
+            'commit': commit_actual(),
+            'fecha': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'datos': sembrados,
+            'repeticiones': options['repeticiones'],
+            'flujos': resultados,
+        }
+        # Con el JSON en la salida estándar, la tabla va a stderr
+        self.mostrar(informe, anterior, self.stderr if options['json'] == '-' else self.stdout)
+        if options['json'] == '-':
+            json.dump(informe, sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        elif options['json']:
+            with open(options['json'], 'w') as archivo:
+                json.dump(informe, archivo, indent=2)
+
+    def mostrar(self, informe, anterior, salida):
+        previos = (anterior or {}).get('flujos', {})
+        salida.write(f"{'flujo':<28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'consultas':>10} {'errores':>8}")
+        if anterior:
+            salida.write(f"(comparado con la corrida de {anterior.get('commit') or anterior.get('fecha')})")
+        for nombre, fila in informe['flujos'].items():
+            linea = (
+                f"{nombre:<28} {fila['p50_ms']:>8.2f} {fila['p95_ms']:>8.2f} {fila['p99_ms']:>8.2f} "
+                f"{fila['consultas']:>10} {fila['errores']:>8}"
+            )
+            previo = previos.get(nombre)
+            if previo and previo['p50_ms']:
+                cambio = (fila['p50_ms'] / previo['p50_ms'] - 1) * 100
+                linea += f"   p50 {cambio:+.1f}%  consultas {previo['consultas']} -> {fila['consultas']}"
+            salida.write(linea)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+import tracemalloc
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+
+from restaurante import eventos
+from restaurante.benchmarks.utilidades import resumir
+
+
+class Pantalla:
+    # Cliente SSE simulado: habla ASGI directamente con el handler de Django,
+    # sin sockets, y anota cuándo recibe cada evento
+    def __init__(self, aplicacion):
+        self.aplicacion = aplicacion
+        self.latencias = []
+        self.conectada = asyncio.Event()
+        self._cierre = asyncio.Event()
+        self._pedido_enviado = False
+        self._resto = ''
+
+    async def recibir(self):
+        if not self._pedido_enviado:
+            self._pedido_enviado = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self._cierre.wait()
+        return {'type': 'http.disconnect'}
+
+    async def enviar(self, mensaje):
+        if mensaje['type'] != 'http.response.body':
+            return
+        ahora = time.perf_counter()
+        self._resto += mensaje.get('body', b'').decode()
+        *bloques, self._resto = self._resto.split('\n\n')
+        for bloque in bloques:
+            if bloque.startswith('retry:'):
+                self.conectada.set()
+            for linea in bloque.split('\n'):
+                if linea.startswith('data: '):
+                    self.latencias.append(ahora - json.loads(linea[6:])['enviado'])
+
+    async def ejecutar(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/cocina/eventos/', 'raw_path': b'/cocina/eventos/',
+            'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        }
+        await self.aplicacion(scope, self.recibir, self.enviar)
+
+    def cerrar(self):
+        self._cierre.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga del feed de cocina: abre N conexiones SSE en el proceso contra el "
+        "handler ASGI, publica eventos desde otro hilo (como una vista WSGI) y mide la "
+        "latencia de entrega y la memoria."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pantallas', type=int, nargs='+', default=[10, 100, 500])
+        parser.add_argument('--eventos', type=int, default=50)
+        parser.add_argument('--intervalo', type=float, default=0.01, help="Segundos entre eventos.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'pantallas':>9} {'entregados':>11} {'p50 ms':>8} {'p99 ms':>8} {'KiB/pantalla':>13}"
+        )
+        for pantallas in options['pantallas']:
+            fila = asyncio.run(self.medir(pantallas, options['eventos'], options['intervalo']))
+            self.stdout.write(
+                f"{pantallas:>9} {fila['entregados']:>11} {fila['p50_ms']:>8.2f} "
+                f"{fila['p99_ms']:>8.2f} {fila['kib']:>13.1f}"
+            )
+
+    async def medir(self, cantidad, total_eventos, intervalo):
+        canal = eventos.CanalLocal()
+        eventos._canal = canal
+        aplicacion = ASGIHandler()
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        pantallas = [Pantalla(aplicacion) for _ in range(cantidad)]
+        tareas = [asyncio.create_task(p.ejecutar()) for p in pantallas]
+        await asyncio.gather(*(p.conectada.wait() for p in pantallas))
+        memoria = (tracemalloc.get_traced_memory()[0] - base) / cantidad / 1024
+        tracemalloc.stop()
+
+        def publicar():
+            for n in range(total_eventos):
+                canal.publicar({'tipo': eventos.PEDIDO_CREADO, 'id': n, 'enviado': time.perf_counter()})
+                time.sleep(intervalo)
+
+        hilo = threading.Thread(target=publicar)
+        hilo.start()
+        await asyncio.to_thread(hilo.join)
+        # Margen para que las últimas entregas terminen de salir
+        esperado = cantidad * total_eventos
+        for _ in range(200):
+            if sum(len(p.latencias) for p in pantallas) >= esperado:
+                break
+            await asyncio.sleep(0.01)
+
+        for p in pantallas:
+            p.cerrar()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        eventos._canal = None
+
+        latencias = [lat for p in pantallas for lat in p.latencias]
+        return {'entregados': len(latencias), 'kib': memoria, **resumir(latencias)}
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurante.importacion import IMPORTADORES, ImportadorDetalles, leer_filas
+
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa categorías, productos, pedidos o líneas de pedido desde CSV o JSON Lines, "
+        "leyendo el archivo de a una fila y guardando por lotes. Importar en ese orden: "
+        "cada paso resuelve las referencias al anterior."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('modelo', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo', help="Ruta del archivo o '-' para la entrada estándar.")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help="Por defecto según la extensión.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por lote/transacción.")
+        parser.add_argument(
+            '--sin-totales', action='store_true',
+            help="No sumar las líneas a Pedido.total al importarlas (luego: verificar_totales --reparar).",
+        )
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or FORMATOS.get(os.path.splitext(options['archivo'])[1].lower())
+        if formato is None:
+            raise CommandError("No se reconoce el formato del archivo; indique --formato.")
+
+        ultimo = 0.0
+
+        def progreso(importador):
+            nonlocal ultimo
+            # Como mucho una línea por segundo
+            if options['verbosity'] and time.perf_counter() - ultimo >= 1:
+                ultimo = time.perf_counter()
+                self.stderr.write(
+                    f"  {importador.creadas} filas guardadas ({importador.por_segundo:,.0f} filas/s)"
+                )
+
+        clase = IMPORTADORES[options['modelo']]
+        extra = {'totales': not options['sin_totales']} if clase is ImportadorDetalles else {}
+        importador = clase(lote=options['lote'], progreso=progreso, **extra)
+
+        if options['archivo'] == '-':
+            importador.ejecutar(leer_filas(sys.stdin, formato))
+        else:
+            try:
+                # utf-8-sig: acepta los CSV con BOM que exporta Excel
+                with open(options['archivo'], newline='', encoding='utf-8-sig') as archivo:
+                    importador.ejecutar(leer_filas(archivo, formato))
+            except OSError as exc:
+                raise CommandError(f"No se pudo leer {options['archivo']}: {exc}")
+
+        for error in importador.errores:
+            self.stderr.write(self.style.WARNING(error))
+        if importador.rechazadas > len(importador.errores):
+            self.stderr.write(f"... y {importador.rechazadas - len(importador.errores)} filas rechazadas más")
+        self.stdout.write(self.style.SUCCESS(
+            f"{importador.creadas} {options['modelo']} importados de {importador.leidas} filas "
+            f"({importador.rechazadas} rechazadas) a {importador.por_segundo:,.0f} filas/s."
+        ))
+        if options['modelo'] == 'detalles':
+            self.stdout.write(
+                "Los pedidos cerrados importados entran al tablero con: manage.py reconstruir_ventas"
+            )
@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurante import ventas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen VentaDiaria a partir de los pedidos entregados y cancelados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help="Primer día a reconstruir (AAAA-MM-DD).")
+        parser.add_argument('--hasta', help="Último día a reconstruir (AAAA-MM-DD).")
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options['desde']) if options['desde'] else None
+            hasta = date.fromisoformat(options['hasta']) if options['hasta'] else None
+        except ValueError as e:
+            raise CommandError(f"Fecha inválida: {e}")
+
+        borradas, creadas = ventas.reconstruir(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen reconstruido: {borradas} fila(s) eliminadas, {creadas} fila(s) creadas."
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurante.models import Pedido
+
+
+class Command(BaseCommand):
+    help = "Compara el total guardado de cada pedido con la suma de sus líneas y, opcionalmente, lo corrige."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reparar', action='store_true',
+            help="Recalcula el total de los pedidos con diferencias.",
+        )
+        parser.add_argument(
+            '--mostrar', type=int, default=20,
+            help="Cantidad máxima de pedidos con diferencias a listar (por defecto 20).",
+        )
+
+    def handle(self, *args, **options):
+        desfasados = Pedido.objects.con_desfase().order_by('id')
+        ids = list(desfasados.values_list('id', flat=True))
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS("Todos los totales coinciden con sus líneas."))
+            return
+
+        for pedido in desfasados[:options['mostrar']]:
+            self.stdout.write(
+                f"Pedido #{pedido.id}: guardado {pedido.total} Bs, líneas {pedido.total_calculado} Bs"
+            )
+        self.stdout.write(self.style.WARNING(f"{len(ids)} pedido(s) con diferencias."))
+
+        if options['reparar']:
+            corregidos = 0
+            with transaction.atomic():
+                # Por bloques para no superar el límite de parámetros de SQLite
+                for i in range(0, len(ids), 500):
+                    corregidos += Pedido.objects.filter(id__in=ids[i:i + 500]).recalcular_totales()
+            self.stdout.write(self.style.SUCCESS(f"{corregidos} pedido(s) corregidos."))
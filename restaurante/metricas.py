@@ -0,0 +1,207 @@
+# Métricas por vista: tiempo total, consultas SQL (cantidad, tiempo y consultas
+# repetidas, típicas de un N+1) y tiempo de renderizado de plantillas. Cada
+# petición acumula en una Medicion guardada en un contextvar (sirve igual para
+# vistas síncronas y asíncronas) y al terminar se vuelca en un histograma
+# móvil en memoria del proceso. Se consulta en /metricas/ (sólo staff).
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.decorators import sync_and_async_middleware
+
+SERIES = ('tiempo_ms', 'consultas', 'sql_ms', 'plantillas_ms')
+CUANTILES = (50, 95, 99)
+
+_medicion = ContextVar('restaurante_medicion', default=None)
+
+
+class Medicion:
+    __slots__ = ('consultas', 'sql', 'plantillas', 'huellas')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.plantillas = 0.0
+        self.huellas = Counter()
+
+
+def huella(sql):
+    # Misma consulta con otros parámetros (o IN de otro largo) -> misma huella
+    return re.sub(r'\((?:%s, )*%s\)', '(...)', sql)
+
+
+def medir_sql(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql += time.perf_counter() - inicio
+        medicion.consultas += 1
+        medicion.huellas[huella(sql)] += 1
+
+
+def instrumentar(conexion):
+    # Se llama desde connection_created; el wrapper queda en el DatabaseWrapper,
+    # que sobrevive a las reconexiones
+    if medir_sql not in conexion.execute_wrappers:
+        conexion.execute_wrappers.append(medir_sql)
+
+
+class PlantillaMedida(Template):
+
+    def render(self, context=None, request=None):
+        medicion = _medicion.get()
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.plantillas += time.perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    # Backend de plantillas de Django que además mide cada render de primer nivel
+    # (los include quedan dentro del tiempo de la plantilla que los incluye)
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+class Registro:
+    # Últimas N muestras por vista y serie; los percentiles se calculan al leer
+
+    def __init__(self, muestras=1000):
+        self.muestras = muestras
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def _vista(self, nombre):
+        vista = self._vistas.get(nombre)
+        if vista is None:
+            vista = self._vistas[nombre] = {
+                'peticiones': 0,
+                'duplicadas': Counter(),
+                **{serie: deque(maxlen=self.muestras) for serie in SERIES},
+            }
+        return vista
+
+    def registrar(self, nombre, tiempo, medicion):
+        valores = {
+            'tiempo_ms': tiempo * 1000,
+            'consultas': medicion.consultas,
+            'sql_ms': medicion.sql * 1000,
+            'plantillas_ms': medicion.plantillas * 1000,
+        }
+        repetidas = [sql for sql, veces in medicion.huellas.items() if veces > 1]
+        with self._lock:
+            vista = self._vista(nombre)
+            vista['peticiones'] += 1
+            for serie, valor in valores.items():
+                vista[serie].append(valor)
+            for sql in repetidas:
+                vista['duplicadas'][sql] += medicion.huellas[sql]
+
+    def resumen(self):
+        with self._lock:
+            copia = {
+                nombre: {
+                    'peticiones': vista['peticiones'],
+                    'duplicadas': vista['duplicadas'].most_common(10),
+                    **{serie: sorted(vista[serie]) for serie in SERIES},
+                }
+                for nombre, vista in self._vistas.items()
+            }
+        resultado = {}
+        for nombre, vista in sorted(copia.items()):
+            resultado[nombre] = {
+                'peticiones': vista['peticiones'],
+                **{
+                    serie: {f'p{p}': round(percentil(vista[serie], p), 3) for p in CUANTILES}
+                    for serie in SERIES
+                },
+                'consultas_repetidas': [
+                    {'sql': sql, 'veces': veces} for sql, veces in vista['duplicadas']
+                ],
+            }
+        return resultado
+
+    def prometheus(self):
+        nombres = {
+            'tiempo_ms': ('restaurante_vista_segundos', 1000),
+            'consultas': ('restaurante_vista_consultas', 1),
+            'sql_ms': ('restaurante_vista_sql_segundos', 1000),
+            'plantillas_ms': ('restaurante_vista_plantillas_segundos', 1000),
+        }
+        resumen = self.resumen()
+        lineas = []
+        for serie, (metrica, divisor) in nombres.items():
+            lineas.append(f'# TYPE {metrica} summary')
+            for vista, datos in resumen.items():
+                etiqueta = vista.replace('\\', '\\\\').replace('"', '\\"')
+                for p in CUANTILES:
+                    valor = datos[serie][f'p{p}'] / divisor
+                    lineas.append(f'{metrica}{{vista="{etiqueta}",quantile="{p / 100}"}} {valor:g}')
+                lineas.append(f'{metrica}_count{{vista="{etiqueta}"}} {datos["peticiones"]}')
+        return '\n'.join(lineas) + '\n'
+
+    def reiniciar(self):
+        with self._lock:
+            self._vistas.clear()
+
+
+registro = Registro(getattr(settings, 'METRICAS_MUESTRAS', 1000))
+
+
+def _nombre_vista(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'sin_ruta'
+
+
+@sync_and_async_middleware
+def metricas_middleware(get_response):
+    # Va primero en MIDDLEWARE para que el tiempo incluya al resto de middlewares.
+    # En respuestas streaming se mide hasta que la vista devuelve la respuesta.
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            medicion = Medicion()
+            token = _medicion.set(medicion)
+            inicio = time.perf_counter()
+            try:
+                return await get_response(request)
+            finally:
+                _medicion.reset(token)
+                registro.registrar(_nombre_vista(request), time.perf_counter() - inicio, medicion)
+    else:
+        def middleware(request):
+            medicion = Medicion()
+            token = _medicion.set(medicion)
+            inicio = time.perf_counter()
+            try:
+                return get_response(request)
+            finally:
+                _medicion.reset(token)
+                registro.registrar(_nombre_vista(request), time.perf_counter() - inicio, medicion)
+    return middleware
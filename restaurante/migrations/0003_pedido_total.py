@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18 06:45
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def calcular_totales(apps, schema_editor):
+    Pedido = apps.get_model('restaurante', 'Pedido')
+    DetallePedido = apps.get_model('restaurante', 'DetallePedido')
+    importe = models.DecimalField(max_digits=12, decimal_places=2)
+    lineas = (
+        DetallePedido.objects.filter(pedido=OuterRef('pk'))
+        .values('pedido')
+        .annotate(importe=Sum(F('cantidad') * F('precio_unitario'), output_field=importe))
+        .values('importe')
+    )
+    Pedido.objects.update(
+        total=Round(Coalesce(Subquery(lineas), Value(Decimal('0.00'))), 2, output_field=importe)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0002_indices_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18 06:41
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0003_pedido_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('MESA', 'En mesa'), ('LLEVAR', 'Para llevar')], max_length=20)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PREPARANDO', 'Preparando'), ('ENTREGADO', 'Entregado'), ('CANCELADO', 'Cancelado')], max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('importe', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ventas_diarias', to='restaurante.categoria')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='ventas_diarias', to='restaurante.producto')),
+            ],
+            options={
+                'verbose_name': 'Venta diaria',
+                'verbose_name_plural': 'Ventas diarias',
+                'indexes': [models.Index(fields=['estado', 'dia'], name='venta_estado_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'tipo', 'estado', 'producto', 'categoria'), name='venta_diaria_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-18 07:45
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+CAMPOS = {'PREPARANDO': 'preparando_en', 'ENTREGADO': 'entregado_en', 'CANCELADO': 'cancelado_en'}
+
+
+def desde_transiciones(apps, schema_editor):
+    # Los cambios de estado anteriores a estos campos ya quedaron en el historial
+    Pedido = apps.get_model('restaurante', 'Pedido')
+    TransicionPedido = apps.get_model('restaurante', 'TransicionPedido')
+    for estado, campo in CAMPOS.items():
+        entrada = TransicionPedido.objects.filter(pedido=OuterRef('pk'), estado_nuevo=estado).order_by('fecha')
+        Pedido.objects.filter(transiciones__estado_nuevo=estado).update(
+            **{campo: Subquery(entrada.values('fecha')[:1])}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0005_transicion_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='cancelado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='entregado_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='preparando_en',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['entregado_en'], name='pedido_entregado_idx'),
+        ),
+        migrations.RunPython(desde_transiciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 09:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0006_tiempos_por_estado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedido_fecha_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha', 'actualizado'], name='pedido_fecha_act_idx'),
+        ),
+    ]
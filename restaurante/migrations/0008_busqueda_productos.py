@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 10:30
+
+from django.db import migrations
+
+# Índice de texto completo de productos (restaurante/busqueda.py): una fila por
+# producto con rowid = id del producto. Sólo SQLite; en otros motores la
+# búsqueda usa LIKE y la migración no hace nada.
+CREAR = """
+CREATE VIRTUAL TABLE restaurante_producto_busqueda USING fts5(
+    nombre, categoria, descripcion,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+LLENAR = """
+INSERT INTO restaurante_producto_busqueda (rowid, nombre, categoria, descripcion)
+SELECT p.id, p.nombre, c.nombre, COALESCE(c.descripcion, '')
+FROM restaurante_producto p INNER JOIN restaurante_categoria c ON c.id = p.categoria_id
+"""
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREAR)
+        schema_editor.execute(LLENAR)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS restaurante_producto_busqueda')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0007_actualizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurante', '0008_busqueda_productos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -1,9 +1,17 @@
+from decimal import Decimal
+
+from django.conf import settings
 from django.db import models
+from django.db.models import F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     descripcion = models.TextField(blank=True, null=True)
+    # Última modificación: base del ETag/Last-Modified de las páginas (restaurante/condicional.py)
+    actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _("Categoría")
@@ -17,6 +25,7 @@ class Producto(models.Model):
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name="productos")
     precio = models.DecimalField(max_digits=10, decimal_places=2)
     activo = models.BooleanField(default=True)
+    actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _("Producto")
@@ -26,6 +35,56 @@ class Producto(models.Model):
         return f"{self.nombre} ({self.precio} Bs.)"
 
 
+# Sum(cantidad * precio_unitario) calculado en SQL y redondeado a centavos (SQLite
+# opera en coma flotante); 'prefijo' permite llegar a las líneas desde otro modelo
+# (p. ej. 'detalles__' desde Pedido)
+def suma_subtotales(prefijo=''):
+    importe = models.DecimalField(max_digits=12, decimal_places=2)
+    suma = Sum(F(f'{prefijo}cantidad') * F(f'{prefijo}precio_unitario'), output_field=importe)
+    return Round(Coalesce(suma, Value(Decimal('0.00'))), 2, output_field=importe)
+
+
+def prefetch_detalles():
+    return Prefetch('detalles', queryset=DetallePedido.objects.select_related('producto').order_by('id'))
+
+
+def subconsulta_total():
+    # Total de las líneas del pedido externo (OuterRef) como subconsulta escalar
+    lineas = (
+        DetallePedido.objects.filter(pedido=OuterRef('pk'))
+        .values('pedido')
+        .annotate(importe=suma_subtotales())
+        .values('importe')
+    )
+    return Coalesce(Subquery(lineas), Value(Decimal('0.00')))
+
+
+class PedidoQuerySet(models.QuerySet):
+
+    def ingresos(self):
+        # Suma de la columna total de los pedidos filtrados en una sola consulta
+        return self.aggregate(ingresos=Coalesce(Sum('total'), Value(Decimal('0.00'))))['ingresos']
+
+    async def aingresos(self):
+        resultado = await self.aaggregate(ingresos=Coalesce(Sum('total'), Value(Decimal('0.00'))))
+        return resultado['ingresos']
+
+    def con_total_calculado(self):
+        return self.annotate(total_calculado=suma_subtotales('detalles__'))
+
+    def con_desfase(self):
+        # Pedidos cuyo total guardado no coincide con la suma de sus líneas
+        return self.con_total_calculado().exclude(total=F('total_calculado'))
+
+    def recalcular_totales(self):
+        return self.update(total=subconsulta_total(), actualizado=timezone.now())
+
+    def con_detalles(self):
+        # Líneas con su producto en una segunda consulta: plantillas, tickets y
+        # DetallePedido.__str__ no vuelven a la base por cada línea
+        return self.prefetch_related(prefetch_detalles())
+
+
 class Pedido(models.Model):
 
     class TipoPedido(models.TextChoices):
@@ -51,19 +110,47 @@ class Pedido(models.Model):
     )
     mesa = models.CharField(max_length=20, blank=True, null=True)
     cliente_nombre = models.CharField(max_length=100, blank=True, null=True)
+    # Suma de las líneas guardada en la fila; se mantiene al guardar el formset
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    # Momento en que el pedido entró a cada estado (restaurante/estados.py los
+    # escribe en el mismo UPDATE que cambia el estado); 'fecha' es el PENDIENTE
+    preparando_en = models.DateTimeField(null=True, blank=True, editable=False)
+    entregado_en = models.DateTimeField(null=True, blank=True, editable=False)
+    cancelado_en = models.DateTimeField(null=True, blank=True, editable=False)
+    # Clave que manda el terminal en la API de pedidos (restaurante/api_pedidos.py):
+    # un reintento con la misma clave no crea otro pedido. NULL en los del formulario.
+    clave_idempotencia = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # auto_now sólo corre en save(): los UPDATE directos (estados.py,
+    # recalcular_totales, la importación) la escriben a mano
+    actualizado = models.DateTimeField(auto_now=True)
+
+    objects = PedidoQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Pedido")
         verbose_name_plural = _("Pedidos")
+        # Coinciden con los filtros de lista_pedidos: rango de fechas solo o
+        # combinado con estado/tipo (el id va implícito en cada índice de SQLite).
+        # El de fecha lleva además 'actualizado': la versión de la lista (cantidad
+        # y última modificación del rango) se resuelve sin leer la tabla
+        indexes = [
+            models.Index(fields=['fecha', 'actualizado'], name='pedido_fecha_act_idx'),
+            models.Index(fields=['estado', 'fecha'], name='pedido_estado_fecha_idx'),
+            models.Index(fields=['tipo', 'fecha'], name='pedido_tipo_fecha_idx'),
+            # Analítica de cocina: pedidos entregados en las últimas horas
+            models.Index(fields=['entregado_en'], name='pedido_entregado_idx'),
+        ]
 
     
     def __str__(self):
         fecha_str = self.fecha.strftime('%Y-%m-%d %H:%M') if getattr(self, 'fecha', None) else 'sin fecha'
         return f"Pedido #{self.id if getattr(self, 'id', None) else 'sin id'} - {fecha_str}"
 
-    @property
-    def total(self):
-        return sum(det.subtotal for det in self.detalles.all())
+    def recalcular_total(self):
+        # Un único UPDATE con la suma de las líneas; llamar dentro de la transacción
+        # que modificó los detalles
+        Pedido.objects.filter(pk=self.pk).recalcular_totales()
+        self.refresh_from_db(fields=['total'])
 
 class DetallePedido(models.Model):
     pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="detalles")
@@ -81,3 +168,69 @@ class DetallePedido(models.Model):
 
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
+
+
+class TransicionPedido(models.Model):
+    # Historial de cambios de estado; lo escribe restaurante/estados.py en la
+    # misma transacción que el UPDATE condicional del pedido
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name="transiciones")
+    estado_anterior = models.CharField(max_length=20, choices=Pedido.Estado.choices)
+    estado_nuevo = models.CharField(max_length=20, choices=Pedido.Estado.choices)
+    fecha = models.DateTimeField(auto_now_add=True)
+    # Sin FOREIGN KEY en la base: el historial se archiva junto con el pedido
+    # (restaurante/archivo.py) y la base de archivo no tiene usuarios
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+",
+        db_constraint=False,
+    )
+
+    class Meta:
+        verbose_name = _("Transición de Pedido")
+        verbose_name_plural = _("Transiciones de Pedidos")
+
+    def __str__(self):
+        return f"Pedido #{self.pedido_id}: {self.estado_anterior} -> {self.estado_nuevo}"
+
+
+class VentaDiaria(models.Model):
+    # Resumen por día, tipo, estado y producto de los pedidos cerrados
+    # (ENTREGADO/CANCELADO); se mantiene en restaurante/ventas.py
+    dia = models.DateField()
+    tipo = models.CharField(max_length=20, choices=Pedido.TipoPedido.choices)
+    estado = models.CharField(max_length=20, choices=Pedido.Estado.choices)
+    producto = models.ForeignKey(Producto, on_delete=models.PROTECT, related_name="ventas_diarias")
+    categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name="ventas_diarias")
+    cantidad = models.PositiveIntegerField(default=0)
+    importe = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        verbose_name = _("Venta diaria")
+        verbose_name_plural = _("Ventas diarias")
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'tipo', 'estado', 'producto', 'categoria'],
+                name='venta_diaria_unica',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['estado', 'dia'], name='venta_estado_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.producto_id} x{self.cantidad} ({self.importe} Bs.)"
+
+
+class CorteArchivo(models.Model):
+    # Cada pasada de manage.py archivar_pedidos: los pedidos cerrados con fecha
+    # anterior a 'hasta' pueden estar en la base de archivo. Se guarda en la base
+    # principal, en la misma transacción que borra la primera tanda movida.
+    hasta = models.DateTimeField()
+    pedidos = models.PositiveIntegerField(default=0)
+    fecha = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Corte de archivo")
+        verbose_name_plural = _("Cortes de archivo")
+
+    def __str__(self):
+        return f"Archivado hasta {self.hasta:%Y-%m-%d} ({self.pedidos} pedidos)"
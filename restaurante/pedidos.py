@@ -0,0 +1,41 @@
+from django.db.models import Count, Max, aprefetch_related_objects
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, get_object_or_404
+
+from . import archivo
+from .models import Pedido, prefetch_detalles
+
+
+def cargar_pedido(pk):
+    # Pedido listo para mostrar o imprimir: cabecera y líneas en dos consultas.
+    # Si no está en la base principal puede estar archivado (sólo lectura).
+    try:
+        return Pedido.objects.con_detalles().get(pk=pk)
+    except Pedido.DoesNotExist:
+        if archivo.limite() is None:
+            raise Http404("No existe el pedido")
+        return get_object_or_404(Pedido.objects.using(archivo.ALIAS).con_detalles(), pk=pk)
+
+
+async def acargar_pedido(pk):
+    try:
+        return await Pedido.objects.con_detalles().aget(pk=pk)
+    except Pedido.DoesNotExist:
+        if await archivo.alimite() is None:
+            raise Http404("No existe el pedido")
+        return await aget_object_or_404(Pedido.objects.using(archivo.ALIAS).con_detalles(), pk=pk)
+
+
+async def acabecera(pk):
+    # Sólo la cabecera del pedido, con lo que define la versión de su página
+    # (cuántas líneas tiene y la última modificación de sus productos, que se
+    # muestran); None si no está en la base principal
+    return await Pedido.objects.annotate(
+        lineas=Count('detalles'), productos_actualizado=Max('detalles__producto__actualizado')
+    ).filter(pk=pk).afirst()
+
+
+async def acargar_detalles(pedido):
+    # Las líneas de una cabecera ya leída, en una consulta (como con_detalles)
+    await aprefetch_related_objects([pedido], prefetch_detalles())
+    return pedido
@@ -0,0 +1,36 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import busqueda, catalogo, metricas
+from .models import Categoria, Producto
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_catalogo(sender, **kwargs):
+    catalogo.invalidar()
+
+
+# Índice de búsqueda de productos (restaurante/busqueda.py), en la misma
+# transacción que el cambio
+@receiver(post_save, sender=Producto)
+def indexar_producto(sender, instance, using, **kwargs):
+    busqueda.indexar_productos([instance.pk], using)
+
+
+@receiver(post_delete, sender=Producto)
+def quitar_producto(sender, instance, using, **kwargs):
+    busqueda.quitar_producto(instance.pk, using)
+
+
+@receiver(post_save, sender=Categoria)
+def indexar_categoria(sender, instance, using, **kwargs):
+    busqueda.indexar_categoria(instance.pk, using)
+
+
+@receiver(connection_created)
+def medir_consultas(sender, connection, **kwargs):
+    metricas.instrumentar(connection)
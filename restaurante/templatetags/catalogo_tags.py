@@ -0,0 +1,19 @@
+from django import template
+from django.utils.html import format_html
+
+from restaurante.catalogo import obtener_catalogo
+
+register = template.Library()
+
+
+@register.simple_tag
+def opcion_producto(seleccionado=None):
+    # Sólo la <option> del producto elegido (formulario reenviado con errores);
+    # las demás llegan con la búsqueda
+    try:
+        producto = obtener_catalogo().por_id[int(seleccionado)]
+    except (KeyError, TypeError, ValueError):
+        return ''
+    return format_html(
+        '<option value="{}" selected data-precio="{}">{}</option>', producto.id, producto.precio, producto.nombre
+    )
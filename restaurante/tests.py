@@ -1,3 +1,1449 @@
-from django.test import TestCase
+import asyncio
+import codecs
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from xml.etree import ElementTree
+import zipfile
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.http import QueryDict
+from django.template import engines
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import analitica, api_pedidos, archivo, busqueda, catalogo, escritura, estados, eventos, exportacion, importacion, metricas, pedidos, tickets, ventas, views
+from .benchmarks import datos, flujos
+from .catalogo import obtener_catalogo
+from .forms import DetallePedidoFormSet
+from .models import Categoria, CorteArchivo, DetallePedido, Pedido, Producto, TransicionPedido, VentaDiaria
+
+
+def crear_pedidos(cantidad, producto, lineas=2, estado=Pedido.Estado.ENTREGADO):
+    pedidos = []
+    for _ in range(cantidad):
+        pedido = Pedido.objects.create(estado=estado)
+        for _ in range(lineas):
+            DetallePedido.objects.create(
+                pedido=pedido, producto=producto, cantidad=2, precio_unitario=producto.precio
+            )
+        pedido.recalcular_total()
+        pedidos.append(pedido)
+    return pedidos
+
+
+class ListaPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre="Platos")
+        cls.producto = Producto.objects.create(
+            nombre="Pique macho", categoria=cls.categoria, precio=Decimal('45.50')
+        )
+
+    def consultas_lista(self):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('lista_pedidos'))
+        self.assertEqual(respuesta.status_code, 200)
+        return len(ctx.captured_queries), respuesta
+
+    def test_consultas_constantes(self):
+        crear_pedidos(1, self.producto)
+        pocas, _ = self.consultas_lista()
+
+        crear_pedidos(25, self.producto)
+        muchas, _ = self.consultas_lista()
+
+        self.assertEqual(pocas, muchas)
+
+    def test_totales_y_ganancia(self):
+        crear_pedidos(3, self.producto)
+        crear_pedidos(1, self.producto, estado=Pedido.Estado.CANCELADO)
+
+        _, respuesta = self.consultas_lista()
+
+        # 2 líneas x 2 unidades x 45.50 = 182.00 por pedido; sólo cuentan los entregados
+        self.assertEqual(respuesta.context['ganancia_total'], Decimal('546.00'))
+        totales = {p.total for p in respuesta.context['pedidos']}
+        self.assertEqual(totales, {Decimal('182.00')})
+
+
+class PaginacionPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Bebidas")
+        producto = Producto.objects.create(nombre="Mocochinchi", categoria=categoria, precio=Decimal('8'))
+        crear_pedidos(7, producto, lineas=1)
+        crear_pedidos(2, producto, lineas=1, estado=Pedido.Estado.PENDIENTE)
+        # Misma fecha para todos: el desempate por id debe mantener el orden estable
+        Pedido.objects.update(fecha=timezone.now())
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos = []
+        url = reverse('lista_pedidos') + '?estado=ENTREGADO'
+        with mock.patch.object(views, 'PEDIDOS_POR_PAGINA', 3):
+            while url:
+                respuesta = self.client.get(url)
+                vistos.extend(p.id for p in respuesta.context['pedidos'])
+                siguiente = respuesta.context['url_siguiente']
+                url = reverse('lista_pedidos') + siguiente if siguiente else None
+                if siguiente:
+                    self.assertIn('estado=ENTREGADO', siguiente)
+
+        esperados = list(
+            Pedido.objects.filter(estado=Pedido.Estado.ENTREGADO).order_by('-fecha', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    async def test_modo_streaming(self):
+        respuesta = await self.async_client.get(reverse('lista_pedidos') + '?stream=1')
+        self.assertTrue(respuesta.streaming)
+        html = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        async for pedido in Pedido.objects.all():
+            self.assertIn(f'#{pedido.id}</td>', html)
+        self.assertIn('</html>', html)
+
+    async def test_pagina_y_modal_asincronos(self):
+        respuesta = await self.async_client.get(reverse('lista_pedidos') + '?estado=ENTREGADO')
+        self.assertEqual(respuesta.context['total_registros'], 7)
+        self.assertEqual(respuesta.context['ganancia_total'], Decimal('112.00'))
+
+        pedido = respuesta.context['pedidos'][0]
+        modal = await self.async_client.get(
+            reverse('detalle_pedido', args=[pedido.pk]), headers={'x-requested-with': 'XMLHttpRequest'}
+        )
+        self.assertContains(modal, 'Mocochinchi')
+        self.assertTemplateUsed(modal, 'pedidos/includes/modal_detalle_body.html')
+        faltante = await self.async_client.get(reverse('detalle_pedido', args=[0]))
+        self.assertEqual(faltante.status_code, 404)
+
+
+class FiltrosFechaTests(TestCase):
+
+    def plan(self, params):
+        qs, _ = views.filtrar_pedidos(QueryDict(params))
+        return qs.explain()
+
+    def test_rango_semiabierto_en_zona_configurada(self):
+        with self.settings(TIME_ZONE='America/La_Paz'):
+            inicio, fin = views.rango_de_fechas(date(2025, 12, 1), date(2025, 12, 1))
+        self.assertEqual(inicio.isoformat(), '2025-12-01T00:00:00-04:00')
+        self.assertEqual(fin - inicio, timedelta(days=1))
+
+    def test_filtra_por_dia_local(self):
+        with self.settings(TIME_ZONE='America/La_Paz'):
+            pedido = Pedido.objects.create()
+            # 23:30 en La Paz ya es el día siguiente en UTC
+            Pedido.objects.filter(pk=pedido.pk).update(
+                fecha=datetime(2025, 12, 2, 3, 30, tzinfo=dt_timezone.utc)
+            )
+            qs, _ = views.filtrar_pedidos(QueryDict('desde=2025-12-01&hasta=2025-12-01'))
+            self.assertEqual(list(qs), [pedido])
+
+    def test_plan_usa_indices(self):
+        self.assertIn('pedido_estado_fecha_idx', self.plan('estado=ENTREGADO&desde=2025-12-01&hasta=2025-12-31'))
+        self.assertIn('pedido_tipo_fecha_idx', self.plan('tipo=LLEVAR&desde=2025-12-01&hasta=2025-12-31'))
+        self.assertIn('pedido_fecha_act_idx', self.plan('hoy=true'))
+
+
+class TotalGuardadoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Postres")
+        cls.helado = Producto.objects.create(nombre="Helado", categoria=categoria, precio=Decimal('0.10'))
+        cls.flan = Producto.objects.create(nombre="Flan", categoria=categoria, precio=Decimal('12.00'))
+
+    def datos_formset(self, filas, iniciales=0):
+        datos = {
+            'detalles-TOTAL_FORMS': str(len(filas)),
+            'detalles-INITIAL_FORMS': str(iniciales),
+            'detalles-MIN_NUM_FORMS': '0',
+            'detalles-MAX_NUM_FORMS': '1000',
+        }
+        for i, fila in enumerate(filas):
+            for campo, valor in fila.items():
+                datos[f'detalles-{i}-{campo}'] = valor
+        return datos
+
+    def test_crear_pedido_guarda_total(self):
+        datos = {'tipo': 'LLEVAR', 'estado': 'PENDIENTE', 'mesa': '', 'cliente_nombre': ''}
+        datos.update(self.datos_formset([
+            {'producto': self.helado.pk, 'cantidad': '3', 'precio_unitario': ''},
+            {'producto': self.flan.pk, 'cantidad': '1', 'precio_unitario': '10.50'},
+        ]))
+        respuesta = self.client.post(reverse('crear_pedido'), datos)
+        pedido = Pedido.objects.get()
+        self.assertRedirects(respuesta, reverse('detalle_pedido', args=[pedido.id]))
+        self.assertEqual(pedido.total, Decimal('10.80'))
+        self.assertFalse(Pedido.objects.con_desfase().exists())
+
+    def test_crear_pedido_consultas_constantes(self):
+        def publicar(lineas):
+            datos = {'tipo': 'MESA', 'estado': 'PENDIENTE', 'mesa': '4', 'cliente_nombre': ''}
+            datos.update(self.datos_formset([
+                {'producto': (self.flan if i % 2 else self.helado).pk, 'cantidad': '1', 'precio_unitario': ''}
+                for i in range(lineas)
+            ]))
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(reverse('crear_pedido'), datos)
+            return len(ctx.captured_queries)
+
+        obtener_catalogo()
+        self.assertEqual(publicar(2), publicar(30))
+        ultimo = Pedido.objects.latest('id')
+        self.assertEqual(ultimo.detalles.count(), 30)
+        self.assertEqual(ultimo.total, Decimal('181.50'))
+
+    def test_formset_actualiza_total_al_editar_y_borrar(self):
+        pedido = Pedido.objects.create()
+        a = DetallePedido.objects.create(pedido=pedido, producto=self.flan, cantidad=1, precio_unitario=Decimal('12'))
+        b = DetallePedido.objects.create(pedido=pedido, producto=self.helado, cantidad=1, precio_unitario=Decimal('0.10'))
+        datos = self.datos_formset([
+            {'id': a.pk, 'producto': self.flan.pk, 'cantidad': '2', 'precio_unitario': '12'},
+            {'id': b.pk, 'producto': self.helado.pk, 'cantidad': '1', 'precio_unitario': '0.10', 'DELETE': 'on'},
+        ], iniciales=2)
+        formset = DetallePedidoFormSet(datos, instance=pedido)
+        self.assertTrue(formset.is_valid(), formset.errors)
+        formset.save()
+        self.assertEqual(pedido.total, Decimal('24.00'))
+        self.assertEqual(Pedido.objects.get(pk=pedido.pk).total, Decimal('24.00'))
+
+    def test_comando_repara_desfase(self):
+        pedido, = crear_pedidos(1, self.helado, lineas=3)
+        Pedido.objects.filter(pk=pedido.pk).update(total=Decimal('99'))
+
+        salida = StringIO()
+        call_command('verificar_totales', stdout=salida)
+        self.assertIn(f'Pedido #{pedido.id}', salida.getvalue())
+        self.assertEqual(Pedido.objects.get(pk=pedido.pk).total, Decimal('99.00'))
+
+        call_command('verificar_totales', '--reparar', stdout=StringIO())
+        self.assertEqual(Pedido.objects.get(pk=pedido.pk).total, Decimal('0.60'))
+        self.assertFalse(Pedido.objects.con_desfase().exists())
+
+
+class VentaDiariaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre="Sopas")
+        cls.sopa = Producto.objects.create(nombre="Sopa de maní", categoria=cls.categoria, precio=Decimal('15'))
+
+    def cerrar(self, pedido, estado):
+        return self.client.post(reverse('cambiar_estado_pedido', args=[pedido.pk]), {'nuevo_estado': estado})
+
+    def test_cierre_actualiza_resumen_una_sola_vez(self):
+        a, b = crear_pedidos(2, self.sopa, estado=Pedido.Estado.PREPARANDO)
+        self.cerrar(a, Pedido.Estado.ENTREGADO)
+        self.cerrar(b, Pedido.Estado.ENTREGADO)
+        # Un segundo cierre del mismo pedido no vuelve a sumar
+        self.cerrar(b, Pedido.Estado.CANCELADO)
+
+        fila = VentaDiaria.objects.get()
+        self.assertEqual((fila.estado, fila.cantidad, fila.importe), ('ENTREGADO', 8, Decimal('120.00')))
+        self.assertEqual(Pedido.objects.get(pk=b.pk).estado, Pedido.Estado.ENTREGADO)
+
+    def test_reconstruir_coincide_con_incremental(self):
+        for pedido in crear_pedidos(3, self.sopa, estado=Pedido.Estado.PREPARANDO):
+            self.cerrar(pedido, Pedido.Estado.ENTREGADO)
+        self.cerrar(crear_pedidos(1, self.sopa, estado=Pedido.Estado.PENDIENTE)[0], Pedido.Estado.CANCELADO)
+        incremental = sorted(VentaDiaria.objects.values_list('estado', 'cantidad', 'importe'))
+
+        call_command('reconstruir_ventas', stdout=StringIO())
+        self.assertEqual(sorted(VentaDiaria.objects.values_list('estado', 'cantidad', 'importe')), incremental)
+
+    def test_tablero_lee_solo_el_resumen(self):
+        for pedido in crear_pedidos(2, self.sopa, estado=Pedido.Estado.PREPARANDO):
+            self.cerrar(pedido, Pedido.Estado.ENTREGADO)
+
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('datos_dashboard'))
+        tablas = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('restaurante_detallepedido', tablas)
+        self.assertEqual(Decimal(respuesta.json()['importe']), Decimal('120.00'))
+        self.assertEqual(self.client.get(reverse('home')).context['resumen']['unidades'], 8)
+
+    def test_rango_del_tablero_acotado(self):
+        url = reverse('datos_dashboard')
+        self.assertEqual(self.client.get(url, {'desde': '0001-01-01', 'hasta': '2026-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'hasta': '9999-12-31'}).status_code, 400)
+        # El último día posible no desborda al recorrer los días
+        respuesta = self.client.get(url, {'desde': '9999-12-31', 'hasta': '9999-12-31'})
+        self.assertEqual(len(respuesta.json()['por_dia']), 1)
+        respuesta = self.client.get(url, {'desde': '2025-01-01', 'hasta': '2025-12-31'})
+        self.assertEqual(len(respuesta.json()['por_dia']), 365)
+
+    def test_formulario_no_crea_pedidos_cerrados(self):
+        datos = {
+            'tipo': Pedido.TipoPedido.MESA, 'estado': Pedido.Estado.ENTREGADO, 'mesa': '4',
+            'detalles-TOTAL_FORMS': '1', 'detalles-INITIAL_FORMS': '0',
+            'detalles-0-producto': self.sopa.pk, 'detalles-0-cantidad': '2', 'detalles-0-precio_unitario': '15',
+        }
+        self.client.post(reverse('crear_pedido'), datos)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(VentaDiaria.objects.exists())
+
+        datos['estado'] = Pedido.Estado.PENDIENTE
+        self.client.post(reverse('crear_pedido'), datos)
+        self.assertEqual(Pedido.objects.get().estado, Pedido.Estado.PENDIENTE)
+
+
+class CatalogoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre="Parrilla")
+        cls.producto = Producto.objects.create(nombre="Churrasco", categoria=cls.categoria, precio=Decimal('50'))
+        Producto.objects.create(nombre="Chorizo", categoria=cls.categoria, precio=Decimal('20'), activo=False)
+
+    def test_carga_una_vez_con_categoria(self):
+        catalogo = obtener_catalogo()
+        with self.assertNumQueries(0):
+            catalogo = obtener_catalogo()
+            self.assertEqual([p.nombre for p in catalogo.activos], ["Churrasco"])
+            self.assertEqual(catalogo.por_id[self.producto.pk].categoria.nombre, "Parrilla")
+
+    def test_signals_invalidan(self):
+        antes = obtener_catalogo()
+        self.producto.precio = Decimal('55')
+        self.producto.save()
+        self.assertIsNot(obtener_catalogo(), antes)
+        self.assertEqual(obtener_catalogo().por_id[self.producto.pk].precio, Decimal('55'))
+
+        self.categoria.nombre = "Parrillada"
+        self.categoria.save()
+        self.assertEqual(obtener_catalogo().por_id[self.producto.pk].categoria.nombre, "Parrillada")
+
+    def test_lista_productos_sin_consultas_por_fila(self):
+        Producto.objects.bulk_create(
+            Producto(nombre=f"Extra {i}", categoria=self.categoria, precio=Decimal('1')) for i in range(20)
+        )
+        catalogo.invalidar()
+        obtener_catalogo()
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(reverse('lista_productos'))
+        self.assertContains(respuesta, "Extra 19")
+
+    def test_opcion_elegida_en_el_formulario(self):
+        plantilla = engines['django'].from_string('{% load catalogo_tags %}{% opcion_producto pk %}')
+        self.assertEqual(
+            plantilla.render({'pk': str(self.producto.pk)}),
+            f'<option value="{self.producto.pk}" selected data-precio="50.00">Churrasco</option>',
+        )
+        self.assertEqual(plantilla.render({'pk': 'x'}), '')
+
+        # El formulario ya no trae el menú: los productos llegan con la búsqueda
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(reverse('crear_pedido'))
+        self.assertNotContains(respuesta, 'Churrasco')
+
+
+class TicketPdfTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Almuerzos")
+        cls.producto = Producto.objects.create(nombre="Silpancho", categoria=categoria, precio=Decimal('30'))
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = self.settings(TICKETS_DIR=self.directorio, TICKETS_PROCESOS=0)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_cache_por_contenido_y_etag(self):
+        pedido, = crear_pedidos(1, self.producto, lineas=1)
+        url = reverse('exportar_ticket_pdf', args=[pedido.pk])
+
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(respuesta.streaming_content).startswith(b'%PDF'))
+        etag = respuesta['ETag']
+        self.assertEqual(len(os.listdir(self.directorio)), 1)
+
+        with mock.patch('restaurante.tickets._generar_pdf') as generar:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(url).status_code, 200)
+        generar.assert_not_called()
+
+        # Cambia una línea: nuevo contenido, nuevo ETag y el PDF viejo se descarta
+        pedido.detalles.update(cantidad=5)
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(len(os.listdir(self.directorio)), 1)
+
+    def test_pool_de_procesos(self):
+        pedido, = crear_pedidos(1, self.producto, lineas=1)
+        with self.settings(TICKETS_PROCESOS=1):
+            ruta = tickets.Ticket(pedido).generar()
+        with open(ruta, 'rb') as pdf:
+            self.assertEqual(pdf.read(4), b'%PDF')
+
+    def test_pool_lento_o_caido_responde_503(self):
+        pedido, = crear_pedidos(1, self.producto, lineas=1)
+        url = reverse('exportar_ticket_pdf', args=[pedido.pk])
+        caido = Future()
+        caido.set_exception(BrokenProcessPool("murió un proceso hijo"))
+        with self.settings(TICKETS_TIMEOUT=0.01), self.assertLogs('restaurante.views', 'WARNING'):
+            for futuro in (Future(), caido):
+                with mock.patch.object(tickets.Ticket, 'solicitar', return_value=futuro), \
+                        mock.patch.object(tickets, '_descartar_pool') as descartar:
+                    respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 503)
+                self.assertEqual(respuesta['Retry-After'], '5')
+                self.assertEqual(descartar.called, futuro is caido)
+
+    def test_crear_pedido_pre_renderiza(self):
+        with mock.patch('restaurante.tickets.pre_renderizar_lote') as pre_renderizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('crear_pedido'), {
+                    'tipo': 'LLEVAR', 'estado': 'PENDIENTE',
+                    'detalles-TOTAL_FORMS': '1', 'detalles-INITIAL_FORMS': '0',
+                    'detalles-0-producto': self.producto.pk, 'detalles-0-cantidad': '1',
+                })
+        pre_renderizar.assert_called_once_with([Pedido.objects.get().pk])
+
+
+class TicketTermicoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Sopas")
+        sopa = Producto.objects.create(nombre="Sopa de maní con chuño", categoria=categoria, precio=Decimal('15'))
+        cls.pedido = Pedido.objects.create(pk=7, tipo=Pedido.TipoPedido.MESA, mesa='4', cliente_nombre='Ana')
+        DetallePedido.objects.create(pedido=cls.pedido, producto=sopa, cantidad=3, precio_unitario=Decimal('15'))
+        cls.pedido.recalcular_total()
+        Pedido.objects.filter(pk=cls.pedido.pk).update(fecha=datetime(2025, 12, 1, 18, 5, tzinfo=dt_timezone.utc))
+
+    def url(self, **params):
+        return reverse('exportar_ticket_termico', args=[self.pedido.pk]) + '?' + '&'.join(
+            f'{k}={v}' for k, v in params.items()
+        )
+
+    def test_texto(self):
+        esperado = (
+            "           El Porteño Restauran\n"
+            "      NIT: 123456789 | Cel: 70012345\n"
+            "El Varador Frente al puerto de carga #456\n"
+            "------------------------------------------\n"
+            "PEDIDO: #7                01/12/2025 18:05\n"
+            "TIPO: En mesa                      Mesa: 4\n"
+            "CLIENTE: Ana\n"
+            "------------------------------------------\n"
+            "CT. DETALLE                          SUBT.\n"
+            "3   Sopa de maní con chuño           45.00\n"
+            "------------------------------------------\n"
+            "          TOTAL:      Bs. 45.00\n"
+            "\n"
+            "         ¡Gracias por su visita!\n"
+            "Conserve su ticket para cualquier reclamo.\n"
+        )
+        respuesta = self.client.get(self.url())
+        self.assertEqual(respuesta['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertEqual(respuesta.content.decode(), esperado)
+
+    def test_escpos(self):
+        esperado = (
+            b'\x1b@\x1bt\x02'
+            b'\x1ba\x01\x1d!\x11\x1bE\x01El Porte\xa4o Restauran\n\x1bE\x00\x1d!\x00\x1ba\x00'
+            b'\x1ba\x01NIT: 123456789 | Cel: 70012345\n\x1ba\x00'
+            b'\x1ba\x01El Varador Frente al puerto de\n\x1ba\x00'
+            b'\x1ba\x01carga #456\n\x1ba\x00'
+            b'--------------------------------\n'
+            b'PEDIDO: #7      01/12/2025 18:05\n'
+            b'TIPO: En mesa            Mesa: 4\n'
+            b'CLIENTE: Ana\n'
+            b'--------------------------------\n'
+            b'\x1bE\x01CT. DETALLE                SUBT.\n\x1bE\x00'
+            b'3   Sopa de man\xa1 con       45.00\n'
+            b'    chu\xa4o\n'
+            b'--------------------------------\n'
+            b'\x1ba\x01\x1d!\x11\x1bE\x01TOTAL: Bs. 45.00\n\x1bE\x00\x1d!\x00\x1ba\x00'
+            b'\n'
+            b'\x1ba\x01\xadGracias por su visita!\n\x1ba\x00'
+            b'\x1ba\x01Conserve su ticket para\n\x1ba\x00'
+            b'\x1ba\x01cualquier reclamo.\n\x1ba\x00'
+            b'\x1dVB\x03'
+        )
+        respuesta = self.client.get(self.url(formato='escpos', papel='58'))
+        self.assertEqual(respuesta['Content-Type'], 'application/octet-stream')
+        self.assertEqual(respuesta.content, esperado)
+
+
+class CargaPedidoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Menú")
+        productos = Producto.objects.bulk_create(
+            Producto(nombre=f"Plato {i}", categoria=categoria, precio=Decimal('20')) for i in range(15)
+        )
+        cls.pedido = Pedido.objects.create(mesa='1')
+        DetallePedido.objects.bulk_create(
+            DetallePedido(pedido=cls.pedido, producto=p, cantidad=1, precio_unitario=p.precio) for p in productos
+        )
+        cls.pedido.recalcular_total()
+
+    def test_cargar_pedido_dos_consultas(self):
+        with self.assertNumQueries(2):
+            pedido = pedidos.cargar_pedido(self.pedido.pk)
+            lineas = [str(det) for det in pedido.detalles.all()]
+        self.assertEqual(lineas[-1], "1 x Plato 14")
+
+    def test_vistas_renderizan_en_dos_consultas(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        modal = {'x-requested-with': 'XMLHttpRequest'}
+        # En el detalle la versión (ETag) sale de la consulta de la cabecera
+        urls = [
+            (reverse('detalle_pedido', args=[self.pedido.pk]), {}, 2),
+            (reverse('detalle_pedido', args=[self.pedido.pk]), modal, 2),
+            (reverse('exportar_ticket_pdf', args=[self.pedido.pk]), {}, 2),
+            (reverse('exportar_ticket_termico', args=[self.pedido.pk]), {}, 2),
+        ]
+        with self.settings(TICKETS_DIR=directorio, TICKETS_PROCESOS=0):
+            for url, cabeceras, consultas in urls:
+                with self.subTest(url=url, **cabeceras), self.assertNumQueries(consultas):
+                    respuesta = self.client.get(url, headers=cabeceras)
+                    self.assertEqual(respuesta.status_code, 200)
+                    respuesta.close()
+
+
+class EventosCocinaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Parrilla")
+        cls.churrasco = Producto.objects.create(nombre="Churrasco", categoria=categoria, precio=Decimal('45'))
+
+    def setUp(self):
+        self.canal = eventos.CanalLocal()
+        parche = mock.patch.object(eventos, '_canal', self.canal)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    async def test_publicar_desde_otro_hilo(self):
+        async with self.canal.suscripcion() as cola:
+            self.assertEqual(self.canal.conectados, 1)
+            await asyncio.to_thread(self.canal.publicar, {'tipo': eventos.PEDIDO_CREADO, 'id': 1})
+            evento = await asyncio.wait_for(cola.get(), timeout=1)
+        self.assertEqual(evento['id'], 1)
+        self.assertEqual(self.canal.conectados, 0)
+
+    async def test_cola_llena_descarta_el_mas_viejo(self):
+        canal = eventos.CanalLocal(tamano_cola=2)
+        async with canal.suscripcion() as cola:
+            for n in range(3):
+                canal.publicar({'tipo': eventos.PEDIDO_CREADO, 'id': n})
+            await asyncio.sleep(0)
+            self.assertEqual([cola.get_nowait()['id'], cola.get_nowait()['id']], [1, 2])
+
+    async def test_flujo_sse(self):
+        respuesta = await views.eventos_cocina(AsyncRequestFactory().get(reverse('eventos_cocina')))
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        flujo = aiter(respuesta.streaming_content)
+        self.assertEqual(await anext(flujo), b'retry: 3000\n\n')
+        siguiente = asyncio.ensure_future(anext(flujo))
+        while not self.canal.conectados:
+            await asyncio.sleep(0)
+        self.canal.publicar({'tipo': eventos.ESTADO_CAMBIADO, 'id': 5, 'estado': 'PREPARANDO'})
+        bloque = (await asyncio.wait_for(siguiente, timeout=1)).decode()
+        await flujo.aclose()
+        evento, datos = bloque.strip().split('\n')
+        self.assertEqual(evento, 'event: estado_cambiado')
+        self.assertEqual(json.loads(datos.removeprefix('data: '))['estado'], 'PREPARANDO')
+
+    def test_flujo_sse_bajo_wsgi_responde_501(self):
+        respuesta = self.client.get(reverse('eventos_cocina'))
+        self.assertEqual(respuesta.status_code, 501)
+        self.assertEqual(self.canal.conectados, 0)
+
+    def test_crear_y_cambiar_estado_publican_al_confirmar(self):
+        datos = {
+            'tipo': 'MESA', 'estado': 'PENDIENTE', 'mesa': '2', 'cliente_nombre': '',
+            'detalles-TOTAL_FORMS': '1', 'detalles-INITIAL_FORMS': '0',
+            'detalles-MIN_NUM_FORMS': '0', 'detalles-MAX_NUM_FORMS': '1000',
+            'detalles-0-producto': self.churrasco.pk, 'detalles-0-cantidad': '2',
+            'detalles-0-precio_unitario': '',
+        }
+        with mock.patch.object(self.canal, 'publicar') as publicar:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('crear_pedido'), datos)
+            pedido = Pedido.objects.get()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('cambiar_estado_pedido', args=[pedido.pk]), {'nuevo_estado': 'PREPARANDO'}
+                )
+        creado, cambiado = [llamada.args[0] for llamada in publicar.call_args_list]
+        self.assertEqual(creado['tipo'], eventos.PEDIDO_CREADO)
+        self.assertEqual(creado['lineas'], [{'producto': 'Churrasco', 'cantidad': 2}])
+        self.assertEqual(cambiado['tipo'], eventos.ESTADO_CAMBIADO)
+        self.assertEqual((cambiado['id'], cambiado['estado']), (pedido.pk, 'PREPARANDO'))
+
+    def test_pantalla_lista_pedidos_abiertos(self):
+        abierto, = crear_pedidos(1, self.churrasco, estado=Pedido.Estado.PREPARANDO)
+        cerrado, = crear_pedidos(1, self.churrasco)
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(reverse('pantalla_cocina'))
+            self.assertEqual([p.pk for p in respuesta.context['pedidos']], [abierto.pk])
+
+
+class PerfilProduccionTests(TestCase):
+
+    def test_conexion_sqlite_ajustada(self):
+        from administrador import settings_produccion
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        conexiones = ConnectionHandler({
+            'default': {**settings_produccion.DATABASES['default'], 'NAME': os.path.join(directorio, 'p.sqlite3')},
+        })
+        conexion = conexiones['default']
+        self.addCleanup(conexion.close)
+        with conexion.cursor() as cursor:
+            pragmas = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 10000, 'mmap_size': 134217728})
+        self.assertEqual(conexion.transaction_mode, 'IMMEDIATE')
+        # Se sirve por ASGI: una conexión por petición, sin persistentes por hilo
+        self.assertEqual(settings_produccion.DATABASES['default']['CONN_MAX_AGE'], 0)
+
+
+class MetricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Refrescos")
+        cls.producto = Producto.objects.create(nombre="Somó", categoria=categoria, precio=Decimal('6'))
+        cls.pedido, = crear_pedidos(1, cls.producto)
+        cls.staff = User.objects.create_user('admin', password='x', is_staff=True)
+
+    def setUp(self):
+        metricas.registro.reiniciar()
+
+    def test_mide_vistas_sincronas_y_asincronas(self):
+        self.client.get(reverse('lista_pedidos'))
+        self.client.get(reverse('detalle_pedido', args=[self.pedido.pk]))
+        self.client.get(reverse('detalle_pedido', args=[self.pedido.pk]))
+        self.client.force_login(self.staff)
+        vistas = self.client.get(reverse('metricas')).json()['vistas']
+
+        self.assertEqual(vistas['detalle_pedido']['peticiones'], 2)
+        # Las consultas hechas en los hilos de sync_to_async también se cuentan
+        self.assertEqual(vistas['detalle_pedido']['consultas']['p50'], 2)
+        self.assertGreater(vistas['lista_pedidos']['consultas']['p99'], 0)
+        self.assertGreater(vistas['lista_pedidos']['plantillas_ms']['p50'], 0)
+        self.assertEqual(vistas['detalle_pedido']['consultas_repetidas'], [])
+
+    def test_detecta_consultas_repetidas(self):
+        registro = metricas.Registro(muestras=10)
+        medicion = metricas.Medicion()
+        token = metricas._medicion.set(medicion)
+        try:
+            # N+1 clásico: el producto de cada línea por separado
+            for detalle in DetallePedido.objects.all():
+                detalle.producto.nombre
+        finally:
+            metricas._medicion.reset(token)
+        registro.registrar('prueba', 0.01, medicion)
+
+        resumen = registro.resumen()['prueba']
+        self.assertEqual(resumen['consultas']['p50'], 3)
+        repetida, = resumen['consultas_repetidas']
+        self.assertEqual(repetida['veces'], 2)
+        self.assertIn('restaurante_producto', repetida['sql'])
+
+    def test_solo_staff_y_formato_prometheus(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 302)
+
+        self.client.get(reverse('detalle_pedido', args=[self.pedido.pk]))
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('metricas') + '?formato=prometheus')
+        self.assertTrue(respuesta['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = respuesta.content.decode()
+        self.assertIn('# TYPE restaurante_vista_segundos summary', texto)
+        self.assertIn('restaurante_vista_consultas{vista="detalle_pedido",quantile="0.99"} 2', texto)
+        self.assertIn('restaurante_vista_segundos_count{vista="detalle_pedido"} 1', texto)
+
+
+class BenchmarkTests(TestCase):
+
+    def test_siembra_y_flujos_sin_errores(self):
+        sembrados = datos.sembrar(productos=30, pedidos=300, dias=10)
+        self.assertEqual(Pedido.objects.count(), 300)
+        self.assertEqual(DetallePedido.objects.count(), sembrados['lineas'])
+        self.assertFalse(Pedido.objects.con_desfase().exists())
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        with self.settings(TICKETS_DIR=directorio, TICKETS_PROCESOS=0):
+            resultados = {
+                nombre: flujos.ejecutar(peticiones, calentamiento=0)
+                for nombre, peticiones in flujos.preparar(2).items()
+            }
+        self.assertEqual({nombre: r['errores'] for nombre, r in resultados.items() if r['errores']}, {})
+        self.assertEqual(resultados['detalle_pedido_ajax']['consultas_max'], 2)
+        self.assertEqual(resultados['cambiar_estado_pedido']['peticiones'], 2)
+
+
+class ImportacionTests(TestCase):
+
+    def importar(self, modelo, nombre, contenido):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ruta = os.path.join(directorio, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        salida, errores = StringIO(), StringIO()
+        call_command('importar', modelo, ruta, lote=2, stdout=salida, stderr=errores)
+        return salida.getvalue(), errores.getvalue()
+
+    def test_menu_pedidos_y_lineas(self):
+        self.importar('categorias', 'categorias.csv', "nombre,descripcion\nSopas,\nFondos,Platos\nSopas,\n")
+        salida, errores = self.importar(
+            'productos', 'productos.csv',
+            "nombre,categoria,precio,activo\nSopa de maní,Sopas,15,\nSilpancho,Fondos,30.5,si\nTrucha,Mariscos,40,\n",
+        )
+        self.assertIn("2 productos importados de 3 filas (1 rechazadas)", salida)
+        self.assertIn("categoría desconocida 'Mariscos'", errores)
+        self.assertEqual(Producto.objects.get(nombre="Silpancho").categoria.nombre, "Fondos")
+
+        self.importar('pedidos', 'pedidos.jsonl', '\n'.join([
+            '{"id": 10, "fecha": "2023-05-01T13:30:00", "tipo": "mesa", "mesa": "4"}',
+            '{"id": 11, "fecha": "2023-05-02T20:00:00", "tipo": "LLEVAR", "estado": "CANCELADO", "cliente_nombre": "Ana"}',
+            '{"id": 10, "fecha": "2023-05-03T12:00:00"}',
+            'no es json',
+        ]))
+        self.assertEqual(Pedido.objects.count(), 2)
+        pedido = Pedido.objects.get(pk=10)
+        # La fecha del historial se conserva (no la hora de la importación)
+        self.assertEqual(timezone.localtime(pedido.fecha).date(), date(2023, 5, 1))
+        self.assertEqual(pedido.estado, Pedido.Estado.ENTREGADO)
+
+        salida, errores = self.importar('detalles', 'detalles.csv', (
+            "pedido,producto,cantidad,precio_unitario\n"
+            "10,Sopa de maní,2,\n10,Silpancho,1,28\n11,Silpancho,1,\n"
+            "99,Silpancho,1,\n10,Pizza,1,\n10,Silpancho,cero,\n"
+        ))
+        self.assertIn("3 detalles importados de 6 filas (3 rechazadas)", salida)
+        self.assertIn("el pedido #99 no existe", errores)
+        self.assertEqual(Pedido.objects.get(pk=10).total, Decimal('58.00'))
+        self.assertEqual(Pedido.objects.get(pk=11).total, Decimal('30.50'))
+        self.assertFalse(Pedido.objects.con_desfase().exists())
+
+    def test_importador_sin_construir_no_se_instancia(self):
+        class SinConstruir(importacion.Importador):
+            modelo = Categoria
+
+        with self.assertRaises(TypeError):
+            SinConstruir()
+
+
+class ExportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Platos")
+        cls.producto = Producto.objects.create(nombre="Pique, macho", categoria=categoria, precio=Decimal('45.50'))
+        cls.entregados = crear_pedidos(3, cls.producto)
+        crear_pedidos(1, cls.producto, estado=Pedido.Estado.CANCELADO)
+
+    async def descargar(self, formato, params=''):
+        respuesta = await self.async_client.get(reverse('exportar_pedidos', args=[formato]) + params)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join([parte async for parte in respuesta.streaming_content])
+
+    async def test_csv_filtrado_con_totales_y_lineas(self):
+        respuesta, contenido = await self.descargar('csv', '?estado=ENTREGADO&hoy=true')
+        self.assertIn(f'filename="pedidos_{timezone.localdate()}.csv"', respuesta['Content-Disposition'])
+        filas = list(csv.reader(StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(filas[0], exportacion.COLUMNAS_PEDIDOS)
+        # Más recientes primero, como en la lista; total = 2 líneas x 2 x 45.50
+        self.assertEqual([int(f[0]) for f in filas[1:]], [p.pk for p in reversed(self.entregados)])
+        self.assertEqual({f[-1] for f in filas[1:]}, {'182.00'})
+
+        _, contenido = await self.descargar('csv', '?estado=ENTREGADO&detalle=lineas')
+        filas = list(csv.reader(StringIO(contenido.decode('utf-8-sig'))))
+        self.assertEqual(len(filas), 1 + 3 * 2)
+        self.assertEqual(filas[1][4:], ['Pique, macho', 'Platos', '2', '45.50', '91.00'])
+
+    async def test_xlsx_es_un_libro_valido(self):
+        with mock.patch.object(exportacion, 'TRAMO', 2):
+            respuesta, contenido = await self.descargar('xlsx', '?detalle=lineas')
+        libro = zipfile.ZipFile(io.BytesIO(contenido))
+        self.assertIsNone(libro.testzip())
+        hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+        ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+        filas = hoja.findall('.//x:row', ns)
+        self.assertEqual(len(filas), 1 + 4 * 2)
+        self.assertEqual(filas[1].findall('x:c', ns)[-1].find('x:v', ns).text, '91.00')
+
+    async def test_envia_por_tramos_sin_leer_todo_antes(self):
+        leidas = []
+        filas_pedidos = exportacion.filas_pedidos
+
+        def filas(qs):
+            for fila in filas_pedidos(qs):
+                leidas.append(fila[0])
+                yield fila
+
+        with mock.patch.object(exportacion, 'TRAMO', 2), mock.patch.object(exportacion, 'filas_pedidos', filas):
+            respuesta = await self.async_client.get(reverse('exportar_pedidos', args=['csv']))
+            partes = aiter(respuesta.streaming_content)
+            self.assertEqual(await anext(partes), codecs.BOM_UTF8)
+            await anext(partes)
+            # Encabezado y primer tramo enviados con sólo 2 de los 4 pedidos leídos
+            self.assertEqual(len(leidas), 2)
+            resto = b''.join([parte async for parte in partes])
+        self.assertEqual(len(leidas), 4)
+        self.assertEqual(resto.count(b'\r\n'), 2)
+
+    def test_texto_del_usuario_no_se_interpreta(self):
+        fila = ['=HYPERLINK("http://x")', '+1', '-2', '@SUM(A1)', 'Ana\x00\x1b', Decimal('-5.00')]
+        csv_ = b''.join(exportacion.generar_csv(['a'] * 6, [fila])).decode('utf-8-sig')
+        self.assertEqual(
+            list(csv.reader(StringIO(csv_)))[1],
+            ['\'=HYPERLINK("http://x")', "'+1", "'-2", "'@SUM(A1)", 'Ana\x00\x1b', '-5.00'],
+        )
+        libro = zipfile.ZipFile(io.BytesIO(b''.join(exportacion.generar_xlsx(['a'] * 6, [fila]))))
+        hoja = ElementTree.fromstring(libro.read('xl/worksheets/sheet1.xml'))
+        textos = [t.text for t in hoja.iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')]
+        self.assertIn('Ana', textos)
+
+    async def test_formato_desconocido(self):
+        respuesta = await self.async_client.get(reverse('exportar_pedidos', args=['pdf']))
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class EstadosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Fondos")
+        cls.producto = Producto.objects.create(nombre="Charque", categoria=categoria, precio=Decimal('40'))
+
+    def test_maquina_de_estados_e_historial(self):
+        pedido, = crear_pedidos(1, self.producto, estado=Pedido.Estado.PENDIENTE)
+        # No se salta PREPARANDO
+        self.assertEqual(estados.cambiar_estado([pedido.pk], Pedido.Estado.ENTREGADO), [])
+        self.assertEqual(len(estados.cambiar_estado([pedido.pk], Pedido.Estado.PREPARANDO)), 1)
+        self.assertEqual(len(estados.cambiar_estado([pedido.pk], Pedido.Estado.ENTREGADO)), 1)
+        # Cerrado: ya no se cancela ni vuelve atrás
+        self.assertEqual(estados.cambiar_estado([pedido.pk], Pedido.Estado.CANCELADO), [])
+        with self.assertRaises(estados.TransicionInvalida):
+            estados.cambiar_estado([pedido.pk], Pedido.Estado.PENDIENTE)
+
+        self.assertEqual(
+            list(pedido.transiciones.order_by('id').values_list('estado_anterior', 'estado_nuevo')),
+            [('PENDIENTE', 'PREPARANDO'), ('PREPARANDO', 'ENTREGADO')],
+        )
+        self.assertEqual(VentaDiaria.objects.get().cantidad, 4)
+
+    def test_update_condicional_sin_leer_antes(self):
+        pendientes = crear_pedidos(3, self.producto, estado=Pedido.Estado.PENDIENTE)
+        preparando = crear_pedidos(3, self.producto, estado=Pedido.Estado.PREPARANDO)
+        entregado, = crear_pedidos(1, self.producto)
+        ids = [p.pk for p in pendientes + preparando] + [entregado.pk]
+        with CaptureQueriesContext(connection) as ctx:
+            cambiados = estados.cambiar_estado(ids, Pedido.Estado.CANCELADO)
+        self.assertEqual([p.pk for p in cambiados], ids[:-1])
+        sentencias = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # Un UPDATE por estado de origen para todo el lote, antes de cualquier lectura
+        self.assertTrue(sentencias[0].startswith('UPDATE') and sentencias[1].startswith('UPDATE'), sentencias[:2])
+        self.assertIn("= 'PENDIENTE' RETURNING", sentencias[0])
+        self.assertIn("= 'PREPARANDO' RETURNING", sentencias[1])
+        self.assertEqual(sum(q.startswith('UPDATE "restaurante_pedido"') for q in sentencias), 2)
+        self.assertEqual(
+            sorted(TransicionPedido.objects.values_list('pedido', 'estado_anterior')),
+            [(p.pk, p.estado) for p in pendientes + preparando],
+        )
+
+    def test_base_bloqueada_rechaza_sin_error(self):
+        pedido, = crear_pedidos(1, self.producto, estado=Pedido.Estado.PENDIENTE)
+        self.client.force_login(User.objects.create_user('cocina'))
+        bloqueada = OperationalError('database is locked')
+        with mock.patch.object(estados, '_actualizar', side_effect=bloqueada), self.assertLogs('restaurante.estados'):
+            respuesta = self.client.post(
+                reverse('cambiar_estado_lote'), {'pedidos': [pedido.pk], 'nuevo_estado': 'PREPARANDO'}
+            )
+        self.assertEqual(respuesta.json(), {'cambiados': [], 'rechazados': [pedido.pk]})
+        self.assertFalse(TransicionPedido.objects.exists())
+
+    def test_lote_desde_cocina(self):
+        pendientes = crear_pedidos(2, self.producto, estado=Pedido.Estado.PENDIENTE)
+        entregado, = crear_pedidos(1, self.producto)
+        usuario = User.objects.create_user('cocina')
+        self.client.force_login(usuario)
+        url = reverse('cambiar_estado_lote')
+        ids = [p.pk for p in pendientes] + [entregado.pk, 999]
+        respuesta = self.client.post(url, {'pedidos': ids, 'nuevo_estado': 'PREPARANDO'})
+        self.assertEqual(respuesta.json(), {'cambiados': ids[:2], 'rechazados': [entregado.pk, 999]})
+        self.assertEqual(
+            set(TransicionPedido.objects.values_list('pedido', 'usuario')), {(pk, usuario.pk) for pk in ids[:2]}
+        )
+        self.assertEqual(self.client.post(url, {'pedidos': ids, 'nuevo_estado': 'PENDIENTE'}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'pedidos': ['x'], 'nuevo_estado': 'ENTREGADO'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+
+class EstadosConcurrentesTests(TransactionTestCase):
+    # Hilos con su propia conexión contra la misma base, como mozos distintos
+
+    def test_cierres_simultaneos_se_aplican_una_vez(self):
+        categoria = Categoria.objects.create(nombre="Fondos")
+        producto = Producto.objects.create(nombre="Charque", categoria=categoria, precio=Decimal('40'))
+        pedidos = crear_pedidos(5, producto, estado=Pedido.Estado.PREPARANDO)
+        ids = [p.pk for p in pedidos]
+        hilos = 8
+        barrera = threading.Barrier(hilos)
+        resultados, errores = [], []
+
+        def mozo(n):
+            destino = Pedido.Estado.ENTREGADO if n % 2 else Pedido.Estado.CANCELADO
+            try:
+                barrera.wait()
+                # La base de pruebas en memoria (caché compartida) no espera al
+                # bloqueo como la de disco: cambiar_estado los rechaza y el mozo
+                # vuelve a intentar mientras quede alguno sin cerrar
+                for _ in range(200):
+                    resultados.extend(pedido.pk for pedido in estados.cambiar_estado(ids, destino))
+                    try:
+                        if not Pedido.objects.filter(pk__in=ids, estado=Pedido.Estado.PREPARANDO).exists():
+                            break
+                    except OperationalError:
+                        pass
+                    time.sleep(0.005)
+                else:
+                    errores.append(n)
+            finally:
+                connections.close_all()
+
+        trabajadores = [threading.Thread(target=mozo, args=(n,)) for n in range(hilos)]
+        for hilo in trabajadores:
+            hilo.start()
+        for hilo in trabajadores:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        # Cada pedido cambió exactamente una vez, con una sola transición y una sola venta
+        self.assertEqual(sorted(resultados), ids)
+        self.assertEqual(TransicionPedido.objects.count(), len(ids))
+        cerrados = dict(Pedido.objects.values_list('id', 'estado'))
+        for transicion in TransicionPedido.objects.all():
+            self.assertEqual(transicion.estado_nuevo, cerrados[transicion.pedido_id])
+        self.assertEqual(sum(VentaDiaria.objects.values_list('cantidad', flat=True)), 2 * 2 * len(ids))
+
+
+class AnaliticaCocinaTests(TestCase):
+
+    def pedido(self, creado, espera=None, preparacion=None):
+        pedido = Pedido.objects.create()
+        campos = {'fecha': creado}
+        if espera is not None:
+            campos['preparando_en'] = creado + timedelta(minutes=espera)
+            campos['estado'] = Pedido.Estado.PREPARANDO
+        if preparacion is not None:
+            campos['entregado_en'] = campos['preparando_en'] + timedelta(minutes=preparacion)
+            campos['estado'] = Pedido.Estado.ENTREGADO
+        Pedido.objects.filter(pk=pedido.pk).update(**campos)
+        return pedido
+
+    def test_cambiar_estado_marca_la_hora(self):
+        pedido = Pedido.objects.create()
+        estados.cambiar_estado([pedido.pk], Pedido.Estado.PREPARANDO)
+        estados.cambiar_estado([pedido.pk], Pedido.Estado.ENTREGADO)
+        pedido.refresh_from_db()
+        self.assertTrue(pedido.fecha <= pedido.preparando_en <= pedido.entregado_en)
+        self.assertIsNone(pedido.cancelado_en)
+
+    def test_percentiles_por_hora_y_cola(self):
+        ahora = timezone.now()
+        # Entregados dentro de una misma hora, hace entre 2 y 3 h: preparación
+        # de 1 a 10 minutos
+        hora_entregas = ahora.replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+        for minutos in range(1, 11):
+            self.pedido(hora_entregas, espera=5, preparacion=minutos)
+        self.pedido(ahora - timedelta(minutes=20), espera=3)
+        self.pedido(ahora - timedelta(minutes=5))
+
+        with self.assertNumQueries(len(analitica.TIEMPOS) + 3):
+            resumen = analitica.resumen_cocina(horas=6)
+        self.assertEqual(resumen['preparacion'], {'p50': 5.0, 'p90': 9.0, 'p99': 10.0})
+        self.assertEqual(resumen['espera']['p50'], 5.0)
+        self.assertEqual(len(resumen['por_hora']), 6)
+        hora = next(f for f in resumen['por_hora'] if f['entregados'])
+        self.assertEqual((hora['entregados'], hora['preparacion']['p90']), (10, 9.0))
+        self.assertEqual(sum(f['recibidos'] for f in resumen['por_hora']), 12)
+        self.assertEqual(
+            {estado: datos['pedidos'] for estado, datos in resumen['cola'].items()},
+            {'PENDIENTE': 1, 'PREPARANDO': 1},
+        )
+
+        respuesta = self.client.get(reverse('analitica_cocina'), {'horas': '6', 'formato': 'json'})
+        self.assertEqual(respuesta.json()['preparacion']['p50'], 5.0)
+        self.assertContains(self.client.get(reverse('analitica_cocina')), 'Rendimiento de cocina')
+
+
+class PeticionesCondicionalesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre="Sopas")
+        cls.producto = Producto.objects.create(nombre="Chairo", categoria=cls.categoria, precio=Decimal('25'))
+        cls.pedido, cls.otro = crear_pedidos(2, cls.producto, estado=Pedido.Estado.PENDIENTE)
+
+    def revalidar(self, url, respuesta, **cabeceras):
+        return self.client.get(url, headers={'if-none-match': respuesta['ETag'], **cabeceras})
+
+    def test_lista_pedidos_304_con_una_consulta(self):
+        url = reverse('lista_pedidos')
+        # La primera visita deja la cookie CSRF, que entra en la versión
+        self.client.get(url)
+        primera = self.client.get(url)
+        self.assertEqual(primera['Cache-Control'], 'private, no-cache')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidar(url, primera).status_code, 304)
+
+        # Un cambio de estado (UPDATE directo) y un borrado cambian la versión
+        estados.cambiar_estado([self.pedido.pk], Pedido.Estado.PREPARANDO)
+        segunda = self.revalidar(url, primera)
+        self.assertEqual(segunda.status_code, 200)
+        self.otro.delete()
+        self.assertEqual(self.revalidar(url, segunda).status_code, 200)
+        # Otro filtro es otra página
+        self.assertEqual(self.revalidar(url + '?estado=PENDIENTE', segunda).status_code, 200)
+
+    def test_detalle_distingue_modal_y_producto(self):
+        url = reverse('detalle_pedido', args=[self.pedido.pk])
+        modal = {'x-requested-with': 'XMLHttpRequest'}
+        primera = self.client.get(url, headers=modal)
+        self.assertIn('X-Requested-With', primera['Vary'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidar(url, primera, **modal).status_code, 304)
+        self.assertEqual(self.revalidar(url, primera).status_code, 200)
+
+        self.producto.nombre = "Chairo paceño"
+        self.producto.save()
+        self.assertContains(self.revalidar(url, primera, **modal), "Chairo paceño")
+        self.assertEqual(self.client.get(reverse('detalle_pedido', args=[999])).status_code, 404)
+
+    def test_productos_y_categorias(self):
+        url = reverse('lista_productos')
+        primera = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.revalidar(url, primera).status_code, 304)
+        self.categoria.nombre = "Caldos"
+        self.categoria.save()
+        self.assertContains(self.revalidar(url, primera), "Caldos")
+
+        url = reverse('lista_categorias')
+        primera = self.client.get(url)
+        self.assertEqual(self.revalidar(url, primera).status_code, 304)
+        Categoria.objects.create(nombre="Postres")
+        self.assertEqual(self.revalidar(url, primera).status_code, 200)
+
+
+class BusquedaProductosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.parrilla = Categoria.objects.create(nombre="Parrilla", descripcion="Carnes a la brasa")
+        cls.bebidas = Categoria.objects.create(nombre="Bebidas")
+        cls.churrasco = Producto.objects.create(nombre="Churrasco", categoria=cls.parrilla, precio=Decimal('50'))
+        cls.chorizo = Producto.objects.create(nombre="Chorizo criollo", categoria=cls.parrilla, precio=Decimal('20'))
+        cls.limonada = Producto.objects.create(nombre="Limonada", categoria=cls.bebidas, precio=Decimal('8.5'))
+        combos = Categoria.objects.create(nombre="Combos")
+        Producto.objects.create(nombre="Parrillada familiar", categoria=combos, precio=Decimal('150'))
+        Producto.objects.create(nombre="Chuleta", categoria=cls.parrilla, precio=Decimal('45'), activo=False)
+
+    def nombres(self, texto):
+        return [p.nombre for p in busqueda.buscar(texto)]
+
+    def test_prefijos_categoria_y_relevancia(self):
+        self.assertEqual(self.nombres("chu"), ["Churrasco"])
+        self.assertEqual(self.nombres("ch cri"), ["Chorizo criollo"])
+        self.assertEqual(set(self.nombres("brasa")), {"Chorizo criollo", "Churrasco"})
+        # Coincidir en el nombre pesa más que en la categoría
+        self.assertEqual(self.nombres("parri")[0], "Parrillada familiar")
+        self.assertEqual(len(self.nombres("parri")), 3)
+        # Sin distinguir tildes; la sintaxis de FTS5 escrita se toma como texto
+        self.assertEqual(self.nombres("limón"), ["Limonada"])
+        self.assertEqual(self.nombres('"limón" OR'), [])
+        self.assertEqual(self.nombres("  "), [])
+
+    def test_signals_mantienen_el_indice(self):
+        self.limonada.nombre = "Limonada con menta"
+        self.limonada.save()
+        self.assertEqual(self.nombres("ment"), ["Limonada con menta"])
+        self.bebidas.nombre = "Refrescos"
+        self.bebidas.save()
+        self.assertEqual(self.nombres("refr"), ["Limonada con menta"])
+        self.limonada.delete()
+        self.assertEqual(self.nombres("limon"), [])
+
+    def test_endpoint_json(self):
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(reverse('buscar_productos'), {'q': 'churr'})
+        self.assertEqual(respuesta.json()['resultados'], [
+            {'id': self.churrasco.pk, 'nombre': "Churrasco", 'precio': "50.00", 'categoria': "Parrilla"},
+        ])
+        self.assertEqual(len(self.client.get(reverse('buscar_productos'), {'q': 'c', 'limite': '1'}).json()['resultados']), 1)
+
+
+class ApiPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Salteñería")
+        cls.saltena = Producto.objects.create(nombre="Salteña", categoria=categoria, precio=Decimal('7.50'))
+        cls.api = Producto.objects.create(nombre="Api", categoria=categoria, precio=Decimal('5'))
+        cls.inactivo = Producto.objects.create(nombre="Tucumana", categoria=categoria, precio=Decimal('6'), activo=False)
+
+    def enviar(self, cuerpo, **kwargs):
+        return self.client.post(reverse('api_pedidos'), json.dumps(cuerpo), content_type='application/json', **kwargs)
+
+    def lote(self, cantidad, prefijo='t1'):
+        return {'pedidos': [
+            {
+                'clave': f'{prefijo}-{n}', 'tipo': 'MESA', 'mesa': str(n),
+                'lineas': [{'producto': self.saltena.pk, 'cantidad': 2}, {'producto': self.api.pk, 'precio_unitario': '4.25'}],
+            }
+            for n in range(cantidad)
+        ]}
+
+    def test_lote_en_una_transaccion_y_consultas_constantes(self):
+        obtener_catalogo()
+
+        def consultas(cantidad, prefijo):
+            with CaptureQueriesContext(connection) as ctx:
+                respuesta = self.enviar(self.lote(cantidad, prefijo))
+            self.assertEqual(respuesta.status_code, 201)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(consultas(1, 'a'), consultas(40, 'b'))
+        self.assertEqual(Pedido.objects.count(), 41)
+        self.assertEqual(DetallePedido.objects.count(), 82)
+        self.assertFalse(Pedido.objects.con_desfase().exists())
+        self.assertEqual(Pedido.objects.get(clave_idempotencia='b-3').total, Decimal('19.25'))
+
+    def test_reintento_no_duplica(self):
+        primera = self.enviar(self.lote(3)).json()['resultados']
+        self.assertEqual([r['estado'] for r in primera], ['creado'] * 3)
+
+        # El terminal reintenta el mismo envío con un pedido más
+        segunda = self.enviar(self.lote(4))
+        self.assertEqual(segunda.status_code, 201)
+        resultados = segunda.json()['resultados']
+        self.assertEqual([r['estado'] for r in resultados], ['existente'] * 3 + ['creado'])
+        self.assertEqual([r['id'] for r in resultados[:3]], [r['id'] for r in primera])
+        self.assertEqual(resultados[0]['total'], '19.25')
+        self.assertEqual(self.enviar(self.lote(4)).status_code, 200)
+        self.assertEqual(Pedido.objects.count(), 4)
+
+    def test_reintento_con_lineas_ya_insertadas(self):
+        guardar = api_pedidos._guardar
+        intentos = []
+
+        def choque(validos):
+            # El primer intento inserta todo y se revierte; otro envío ocupa
+            # los id que habían tomado sus líneas
+            intentos.append(validos)
+            if len(intentos) > 1:
+                return guardar(validos)
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                guardar(validos)
+                raise IntegrityError
+            otro = Pedido.objects.create(mesa="99")
+            DetallePedido.objects.bulk_create(
+                DetallePedido(pedido=otro, producto=self.api, precio_unitario=Decimal('4')) for _ in range(2)
+            )
+            raise IntegrityError
+
+        with mock.patch.object(api_pedidos, '_guardar', side_effect=choque):
+            resultados = api_pedidos.registrar_lote(self.lote(1)['pedidos'])
+
+        pedido = Pedido.objects.get(pk=resultados[0]['id'])
+        self.assertEqual(resultados[0]['estado'], api_pedidos.CREADO)
+        self.assertEqual(pedido.detalles.count(), 2)
+        self.assertEqual(DetallePedido.objects.count(), 4)
+
+    def test_rechazos_por_pedido_y_por_envio(self):
+        cuerpo = [
+            {'clave': 'x1', 'tipo': 'LLEVAR', 'mesa': '9', 'lineas': [{'producto': self.api.pk}]},
+            {'clave': 'x1', 'lineas': [{'producto': self.api.pk}]},
+            {'clave': 'x2', 'lineas': [{'producto': self.inactivo.pk}]},
+            {'clave': 'x3', 'lineas': [{'producto': self.api.pk, 'cantidad': 0}]},
+            {'clave': 'x4', 'lineas': [{'producto': self.api.pk, 'precio_unitario': '1.005'}]},
+            {'lineas': [{'producto': self.api.pk}]},
+            {'clave': 'x5', 'lineas': []},
+        ]
+        resultados = self.enviar(cuerpo).json()['resultados']
+        self.assertEqual([r['estado'] for r in resultados], ['creado'] + ['rechazado'] * 6)
+        self.assertIn('repetida', resultados[1]['error'])
+        self.assertIsNone(Pedido.objects.get().mesa)
+
+        url = reverse('api_pedidos')
+        self.assertEqual(self.client.post(url, {'clave': 'x'}).status_code, 415)
+        self.assertEqual(self.client.post(url, '{', content_type='application/json').status_code, 400)
+        self.assertEqual(self.enviar([]).status_code, 400)
+        self.assertEqual(self.enviar(self.lote(api_pedidos.MAX_PEDIDOS + 1)).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+
+class ApiPedidosConcurrenteTests(TransactionTestCase):
+
+    def test_reintentos_simultaneos_crean_un_pedido_por_clave(self):
+        categoria = Categoria.objects.create(nombre="Salteñería")
+        producto = Producto.objects.create(nombre="Salteña", categoria=categoria, precio=Decimal('7.50'))
+        lote = [{'clave': f'c-{n}', 'lineas': [{'producto': producto.pk, 'cantidad': 1}]} for n in range(10)]
+        hilos = 6
+        barrera = threading.Barrier(hilos)
+        creados, errores = [], []
+
+        def terminal(n):
+            try:
+                barrera.wait()
+                for _ in range(200):
+                    try:
+                        resultados = api_pedidos.registrar_lote(lote)
+                        creados.extend(r['clave'] for r in resultados if r['estado'] == api_pedidos.CREADO)
+                        break
+                    except OperationalError:
+                        # Ver EstadosConcurrentesTests: la base en memoria no espera al bloqueo
+                        time.sleep(0.005)
+                else:
+                    errores.append(n)
+            finally:
+                connections.close_all()
+
+        # Al confirmar se pre-renderizan los tickets: que no caigan en media/
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        trabajadores = [threading.Thread(target=terminal, args=(n,)) for n in range(hilos)]
+        with self.settings(TICKETS_DIR=directorio, TICKETS_PROCESOS=0):
+            for hilo in trabajadores:
+                hilo.start()
+            for hilo in trabajadores:
+                hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(sorted(creados), sorted(p['clave'] for p in lote))
+        self.assertEqual(Pedido.objects.count(), len(lote))
+        self.assertEqual(DetallePedido.objects.count(), len(lote))
+
+
+@mock.patch('restaurante.tickets.pre_renderizar_lote')
+class EscrituraAgrupadaTests(TransactionTestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Salteñería")
+        self.producto = Producto.objects.create(nombre="Salteña", categoria=categoria, precio=Decimal('7.50'))
+        ajustes = self.settings(ESCRITURA_LOTE=50, ESCRITURA_ESPERA_MS=50)
+        ajustes.enable()
+        self.addCleanup(escritura.obtener_cola)  # con la cola desactivada detiene el hilo
+        self.addCleanup(ajustes.disable)
+
+    def pedido(self, **campos):
+        detalle = DetallePedido(producto=self.producto, cantidad=2, precio_unitario=Decimal('7.50'))
+        return Pedido(mesa="3", **campos), [detalle]
+
+    def en_paralelo(self, pedidos):
+        barrera = threading.Barrier(len(pedidos))
+        resultados = [None] * len(pedidos)
+
+        def peticion(n):
+            barrera.wait()
+            try:
+                resultados[n] = escritura.guardar(*pedidos[n])
+            except Exception as e:
+                resultados[n] = e
+
+        hilos = [threading.Thread(target=peticion, args=(n,)) for n in range(len(pedidos))]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def test_peticiones_simultaneas_comparten_transaccion(self, pre_renderizar):
+        with mock.patch.object(escritura, 'guardar_lote', wraps=escritura.guardar_lote) as guardar_lote:
+            guardados = self.en_paralelo([self.pedido() for _ in range(8)])
+
+        # Cada petición recibe su propio pedido con el id asignado
+        ids = [pedido.pk for pedido in guardados]
+        self.assertEqual(sorted(ids), sorted(Pedido.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(set(ids)), 8)
+        self.assertLess(guardar_lote.call_count, 8)
+        self.assertEqual(DetallePedido.objects.count(), 8)
+        self.assertEqual(sum(len(llamada.args[0]) for llamada in pre_renderizar.call_args_list), 8)
+        self.assertEqual(Pedido.objects.get(pk=ids[0]).total, Decimal('15.00'))
+
+    def test_pedido_invalido_no_tumba_el_lote(self, pre_renderizar):
+        pedidos = [self.pedido() for _ in range(4)] + [self.pedido(estado=None)]
+        resultados = self.en_paralelo(pedidos)
+
+        self.assertIsInstance(resultados[-1], IntegrityError)
+        self.assertEqual(Pedido.objects.count(), 4)
+        self.assertEqual(sorted(p.pk for p in resultados[:-1]), sorted(Pedido.objects.values_list('pk', flat=True)))
+        self.assertEqual(
+            sorted(DetallePedido.objects.values_list('pedido_id', flat=True)), sorted(p.pk for p in resultados[:-1])
+        )
+
+    def test_vista_crear_pedido(self, pre_renderizar):
+        respuesta = self.client.post(reverse('crear_pedido'), {
+            'tipo': 'LLEVAR', 'estado': 'PENDIENTE',
+            'detalles-TOTAL_FORMS': '1', 'detalles-INITIAL_FORMS': '0',
+            'detalles-0-producto': self.producto.pk, 'detalles-0-cantidad': '1',
+        })
+        pedido = Pedido.objects.get()
+        self.assertRedirects(respuesta, reverse('detalle_pedido', args=[pedido.pk]))
+        self.assertIsNotNone(escritura.obtener_cola()._hilo)
+        pre_renderizar.assert_called_once_with([pedido.pk])
+
+    def test_dentro_de_una_transaccion_no_usa_la_cola(self, pre_renderizar):
+        with transaction.atomic():
+            pedido = escritura.guardar(*self.pedido())
+            transaction.set_rollback(True)
+        self.assertIsNotNone(pedido.pk)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertIsNone(escritura.obtener_cola()._hilo)
+
+
+class ArchivoPedidosTests(TestCase):
+    databases = {'default', archivo.ALIAS}
+
+    @classmethod
+    def setUpTestData(cls):
+        categoria = Categoria.objects.create(nombre="Sopas")
+        cls.producto = Producto.objects.create(nombre="Chairo", categoria=categoria, precio=Decimal('25'))
+        usuario = User.objects.create_user('cajero')
+        # Hace 100 días: tres entregados y un cancelado (se archivan) y uno
+        # pendiente (se queda); más dos entregados de hoy
+        cls.viejos = crear_pedidos(3, cls.producto) + crear_pedidos(1, cls.producto, estado=Pedido.Estado.CANCELADO)
+        cls.abierto, = crear_pedidos(1, cls.producto, estado=Pedido.Estado.PENDIENTE)
+        Pedido.objects.filter(pk__in=[p.pk for p in cls.viejos + [cls.abierto]]).update(
+            fecha=timezone.now() - timedelta(days=100)
+        )
+        TransicionPedido.objects.create(
+            pedido=cls.viejos[0], estado_anterior='PREPARANDO', estado_nuevo='ENTREGADO', usuario=usuario
+        )
+        cls.recientes = crear_pedidos(2, cls.producto)
+        cls.hace_un_anio = (timezone.localdate() - timedelta(days=365)).isoformat()
+
+    def archivar(self, dias=30, **opciones):
+        call_command('archivar_pedidos', dias=dias, stdout=StringIO(), stderr=StringIO(), **opciones)
+
+    def test_mueve_los_cerrados_viejos_por_tandas(self):
+        self.archivar(lote=3)
+        archivados = Pedido.objects.using(archivo.ALIAS)
+        self.assertEqual(sorted(archivados.values_list('pk', flat=True)), sorted(p.pk for p in self.viejos))
+        self.assertEqual(DetallePedido.objects.using(archivo.ALIAS).count(), 4 * 2)
+        transicion = TransicionPedido.objects.using(archivo.ALIAS).get()
+        self.assertEqual(transicion.pedido_id, self.viejos[0].pk)
+        self.assertIsNotNone(transicion.usuario_id)
+        self.assertEqual(Producto.objects.using(archivo.ALIAS).get().nombre, "Chairo")
+        self.assertEqual(
+            sorted(Pedido.objects.values_list('pk', flat=True)),
+            sorted(p.pk for p in [self.abierto] + self.recientes),
+        )
+        self.assertFalse(DetallePedido.objects.filter(pedido__in=self.viejos).exists())
+        corte = CorteArchivo.objects.get()
+        self.assertEqual(corte.pedidos, 4)
+
+        # Otra pasada no encuentra nada ni deja otro corte
+        self.archivar()
+        self.assertEqual(archivados.count(), 4)
+        self.assertEqual(CorteArchivo.objects.count(), 1)
+
+        with self.assertRaises(CommandError):
+            self.archivar(dias=1)
+
+    def test_lista_abarca_las_dos_bases(self):
+        url = reverse('lista_pedidos')
+        rango = {'desde': self.hace_un_anio, 'hasta': timezone.localdate().isoformat()}
+        antes = self.client.get(url, rango)
+        self.archivar()
+
+        respuesta = self.client.get(url, rango)
+        self.assertEqual(respuesta.context['total_registros'], 7)
+        self.assertEqual(respuesta.context['ganancia_total'], antes.context['ganancia_total'])
+        self.assertEqual(
+            [p.pk for p in respuesta.context['pedidos']], [p.pk for p in antes.context['pedidos']]
+        )
+        self.assertNotEqual(respuesta['ETag'], antes['ETag'])
+
+        # Paginando de a 2 se recorren las dos bases en orden, sin repetir
+        vistos = []
+        with mock.patch.object(views, 'PEDIDOS_POR_PAGINA', 2):
+            pagina = self.client.get(url, rango)
+            while True:
+                vistos.extend(p.pk for p in pagina.context['pedidos'])
+                if not pagina.context['url_siguiente']:
+                    break
+                pagina = self.client.get(url + pagina.context['url_siguiente'])
+        self.assertEqual(vistos, [p.pk for p in antes.context['pedidos']])
+
+        # Un rango de días recientes no consulta el archivo
+        hoy = timezone.localdate().isoformat()
+        with CaptureQueriesContext(connections[archivo.ALIAS]) as consultas:
+            respuesta = self.client.get(url, {'desde': hoy, 'hasta': hoy})
+        self.assertEqual(respuesta.context['total_registros'], 2)
+        self.assertEqual(len(consultas), 0)
+
+    async def test_streaming_incluye_archivados(self):
+        await sync_to_async(self.archivar)()
+        respuesta = await self.async_client.get(
+            reverse('lista_pedidos'), {'desde': self.hace_un_anio, 'hasta': timezone.localdate().isoformat(), 'stream': '1'}
+        )
+        html = b''.join([parte async for parte in respuesta.streaming_content]).decode()
+        posiciones = [html.index(f'#{p.pk}</td>') for p in self.recientes[::-1] + [self.abierto] + self.viejos[::-1]]
+        self.assertEqual(posiciones, sorted(posiciones))
+
+    async def test_exportacion_incluye_archivados(self):
+        await sync_to_async(self.archivar)()
+        respuesta = await self.async_client.get(
+            reverse('exportar_pedidos', args=['csv']),
+            {'desde': self.hace_un_anio, 'hasta': timezone.localdate().isoformat(), 'detalle': 'lineas'},
+        )
+        contenido = b''.join([parte async for parte in respuesta.streaming_content])
+        filas = list(csv.reader(StringIO(contenido.decode('utf-8-sig'))))[1:]
+        self.assertEqual(len(filas), 7 * 2)
+        self.assertEqual([int(f[0]) for f in filas[::2]], [p.pk for p in self.recientes[::-1] + [self.abierto] + self.viejos[::-1]])
+
+    def test_detalle_y_resumen_de_ventas(self):
+        ventas.reconstruir()
+        resumen = sorted(VentaDiaria.objects.values_list('dia', 'estado', 'cantidad', 'importe'))
+        self.archivar()
+
+        respuesta = self.client.get(reverse('detalle_pedido', args=[self.viejos[0].pk]))
+        self.assertContains(respuesta, 'Chairo')
+        self.assertEqual(self.client.get(reverse('detalle_pedido', args=[0])).status_code, 404)
+
+        # El resumen reconstruido suma también las líneas archivadas
+        ventas.reconstruir()
+        self.assertEqual(sorted(VentaDiaria.objects.values_list('dia', 'estado', 'cantidad', 'importe')), resumen)
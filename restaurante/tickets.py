@@ -0,0 +1,163 @@
+# Generación de tickets PDF fuera del hilo de la petición. El HTML se renderiza
+# en Django (es barato) y su hash identifica el contenido: el PDF se guarda en
+# disco como ticket_<id>_<hash>.pdf, así una reimpresión sin cambios sale del
+# disco y cualquier cambio en el pedido o en la plantilla genera otro archivo.
+# pisa corre en un pool de procesos para no retener el GIL de los workers.
+#
+# Este módulo no importa modelos a nivel de módulo: los procesos hijos (spawn)
+# lo importan para ejecutar _generar_pdf sin configurar Django.
+import glob
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+PLANTILLA = 'pedidos/ticket_pdf.html'
+
+_pool = None
+_pendientes = {}
+_lock = threading.Lock()
+
+
+class ErrorTicket(Exception):
+    pass
+
+
+class TicketNoDisponible(ErrorTicket):
+    # El pool no lo generó dentro de TICKETS_TIMEOUT o dejó de funcionar; a
+    # diferencia de un error de pisa, reintentar más tarde puede funcionar
+    pass
+
+
+def _directorio():
+    return getattr(settings, 'TICKETS_DIR', os.path.join(settings.MEDIA_ROOT, 'tickets'))
+
+
+def _generar_pdf(html, ruta):
+    # Se ejecuta en el proceso hijo; escribe el archivo de forma atómica
+    from xhtml2pdf import pisa
+
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            estado = pisa.CreatePDF(html, dest=destino)
+        if estado.err:
+            raise ErrorTicket(f"pisa devolvió {estado.err} error(es)")
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    # Las versiones anteriores del mismo ticket ya no se van a servir
+    prefijo = os.path.basename(ruta).rsplit('_', 1)[0]
+    for viejo in glob.glob(os.path.join(directorio, f'{prefijo}_*.pdf')):
+        if viejo != ruta:
+            try:
+                os.remove(viejo)
+            except OSError:
+                pass
+    return ruta
+
+
+def _obtener_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.TICKETS_PROCESOS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _descartar_pool():
+    # Un pool roto (murió un proceso hijo) rechaza todo lo que se le envía: el
+    # próximo ticket arranca uno nuevo
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class Ticket:
+
+    def __init__(self, pedido):
+        self.pedido = pedido
+        self.html = render_to_string(PLANTILLA, {'pedido': pedido})
+        self.huella = hashlib.sha256(self.html.encode()).hexdigest()[:20]
+        self.ruta = os.path.join(_directorio(), f'ticket_{pedido.id}_{self.huella}.pdf')
+
+    @property
+    def etag(self):
+        return f'"{self.huella}"'
+
+    def en_cache(self):
+        return os.path.exists(self.ruta)
+
+    def solicitar(self):
+        # Devuelve un Future con la ruta del PDF; no encola dos veces el mismo archivo
+        if self.en_cache():
+            futuro = Future()
+            futuro.set_result(self.ruta)
+            return futuro
+
+        if not getattr(settings, 'TICKETS_PROCESOS', 0):
+            # Sin pool (tests, desarrollo): se genera en el mismo proceso
+            futuro = Future()
+            try:
+                futuro.set_result(_generar_pdf(self.html, self.ruta))
+            except Exception as e:
+                futuro.set_exception(e)
+            return futuro
+
+        pool = _obtener_pool()
+        with _lock:
+            futuro = _pendientes.get(self.ruta)
+            if futuro is None:
+                futuro = pool.submit(_generar_pdf, self.html, self.ruta)
+                _pendientes[self.ruta] = futuro
+                futuro.add_done_callback(lambda f, ruta=self.ruta: _pendientes.pop(ruta, None))
+        return futuro
+
+    def generar(self, timeout=None):
+        try:
+            return self.solicitar().result(timeout=timeout or getattr(settings, 'TICKETS_TIMEOUT', 30))
+        except TimeoutError as e:
+            raise TicketNoDisponible(f"El ticket del pedido #{self.pedido.id} no terminó a tiempo") from e
+        except BrokenProcessPool as e:
+            _descartar_pool()
+            raise TicketNoDisponible("El pool de tickets dejó de funcionar") from e
+
+
+def esperar_pendientes(timeout=None):
+    # Espera a que el pool termine los tickets encolados (benchmarks, apagado)
+    with _lock:
+        futuros = list(_pendientes.values())
+    wait(futuros, timeout=timeout)
+
+
+def pre_renderizar(pedido_id):
+    # Pensado para transaction.on_commit: encola el ticket y vuelve enseguida
+    from .models import Pedido
+
+    try:
+        pedido = Pedido.objects.con_detalles().get(pk=pedido_id)
+    except Pedido.DoesNotExist:
+        return None
+    return Ticket(pedido).solicitar()
+
+
+def pre_renderizar_lote(pedido_ids):
+    # Igual que pre_renderizar para muchos pedidos, con dos consultas en total
+    from .models import Pedido
+
+    return [Ticket(pedido).solicitar() for pedido in Pedido.objects.con_detalles().filter(pk__in=pedido_ids)]
@@ -8,6 +8,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('', views.login_view, name='login'),
     path('dashboard/', views.home, name='home'),
+    path('dashboard/ventas/', views.datos_dashboard, name='datos_dashboard'),
     # Categorías
     path('categorias/', views.lista_categorias, name='lista_categorias'),
     path('categorias/crear/', views.crear_categoria, name='crear_categoria'),
@@ -15,6 +16,7 @@ urlpatterns = [
     # Productos
     path('productos/', views.lista_productos, name='lista_productos'),
     path('productos/crear/', views.gestionar_producto, name='crear_producto'),
+    path('productos/buscar/', views.buscar_productos, name='buscar_productos'),
     
     path('productos/editar/<int:pk>/', views.gestionar_producto, name='editar_producto'),
     
@@ -22,8 +24,20 @@ urlpatterns = [
     
     # Pedidos
     path('listarpedidos/', views.lista_pedidos, name='lista_pedidos'),
+    path('listarpedidos/exportar/<str:formato>/', views.exportar_pedidos, name='exportar_pedidos'),
     path('nuevo/', views.crear_pedido, name='crear_pedido'),
     path('<int:pk>/', views.detalle_pedido, name='detalle_pedido'),
     path('pedidos/<int:pk>/cambiar_estado/', views.cambiar_estado_pedido, name='cambiar_estado_pedido'),
+    path('pedidos/cambiar_estado/', views.cambiar_estado_lote, name='cambiar_estado_lote'),
+    path('api/pedidos/', views.recibir_pedidos, name='api_pedidos'),
     path('pedido/<int:pk>/ticket-pdf/', views.exportar_ticket_pdf, name='exportar_ticket_pdf'),
+    path('pedido/<int:pk>/ticket-termico/', views.exportar_ticket_termico, name='exportar_ticket_termico'),
+
+    # Métricas (sólo staff)
+    path('metricas/', views.ver_metricas, name='metricas'),
+
+    # Cocina
+    path('cocina/', views.pantalla_cocina, name='pantalla_cocina'),
+    path('cocina/eventos/', views.eventos_cocina, name='eventos_cocina'),
+    path('cocina/analitica/', views.analitica_cocina, name='analitica_cocina'),
 ]+ static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,134 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import archivo
+from .models import DetallePedido, Pedido, VentaDiaria, suma_subtotales
+
+ESTADOS_CERRADOS = [Pedido.Estado.ENTREGADO, Pedido.Estado.CANCELADO]
+# Días que abarca como máximo un resumen (el gráfico tiene una barra por día)
+DIAS_MAXIMOS = 366
+
+
+def agrupar_lineas(detalles):
+    # Una fila por (día, tipo, estado, producto, categoría) con sus sumas
+    return (
+        detalles.order_by()
+        .values(
+            dia_venta=TruncDate('pedido__fecha'),
+            tipo=F('pedido__tipo'),
+            estado=F('pedido__estado'),
+            producto_venta=F('producto_id'),
+            categoria_venta=F('producto__categoria_id'),
+        )
+        .annotate(unidades=Sum('cantidad'), monto=suma_subtotales())
+    )
+
+
+def _clave(fila):
+    return {
+        'dia': fila['dia_venta'],
+        'tipo': fila['tipo'],
+        'estado': fila['estado'],
+        'producto_id': fila['producto_venta'],
+        'categoria_id': fila['categoria_venta'],
+    }
+
+
+def registrar_venta(pedido):
+    # Suma las líneas de un pedido recién cerrado al resumen; se llama una sola
+    # vez por pedido, en la misma transacción que cambia su estado
+    with transaction.atomic():
+        for fila in agrupar_lineas(DetallePedido.objects.filter(pedido=pedido)):
+            clave = _clave(fila)
+            actualizadas = VentaDiaria.objects.filter(**clave).update(
+                cantidad=F('cantidad') + fila['unidades'],
+                importe=F('importe') + fila['monto'],
+            )
+            if not actualizadas:
+                VentaDiaria.objects.create(cantidad=fila['unidades'], importe=fila['monto'], **clave)
+
+
+def reconstruir(desde=None, hasta=None):
+    # Recalcula el resumen desde las líneas de pedido para el rango [desde, hasta]
+    detalles = DetallePedido.objects.filter(pedido__estado__in=ESTADOS_CERRADOS)
+    resumen = VentaDiaria.objects.all()
+    if desde:
+        detalles = detalles.filter(pedido__fecha__date__gte=desde)
+        resumen = resumen.filter(dia__gte=desde)
+    if hasta:
+        detalles = detalles.filter(pedido__fecha__date__lte=hasta)
+        resumen = resumen.filter(dia__lte=hasta)
+
+    inicio = timezone.make_aware(datetime.combine(desde, time.min)) if desde else None
+
+    with transaction.atomic():
+        borradas, _ = resumen.delete()
+        # Los días archivados se leen también del archivo (restaurante/archivo.py);
+        # un mismo día puede tener pedidos en las dos bases y se suman
+        filas = {}
+        for consulta in archivo.consultas(detalles, inicio):
+            for fila in agrupar_lineas(consulta).iterator(chunk_size=2000):
+                clave = _clave(fila)
+                venta = filas.get(tuple(clave.values()))
+                if venta is None:
+                    filas[tuple(clave.values())] = VentaDiaria(cantidad=fila['unidades'], importe=fila['monto'], **clave)
+                else:
+                    venta.cantidad += fila['unidades']
+                    venta.importe += fila['monto']
+        VentaDiaria.objects.bulk_create(filas.values(), batch_size=500)
+    return borradas, len(filas)
+
+
+def resumen_ventas(desde, hasta):
+    # Cifras del tablero leídas sólo del resumen (nunca de DetallePedido)
+    entregadas = VentaDiaria.objects.filter(
+        estado=Pedido.Estado.ENTREGADO, dia__gte=desde, dia__lte=hasta
+    )
+    importe = Coalesce(Sum('importe'), Value(Decimal('0.00')), output_field=VentaDiaria._meta.get_field('importe'))
+
+    totales = entregadas.aggregate(importe=importe, unidades=Coalesce(Sum('cantidad'), 0))
+    cancelado = VentaDiaria.objects.filter(
+        estado=Pedido.Estado.CANCELADO, dia__gte=desde, dia__lte=hasta
+    ).aggregate(importe=importe)['importe']
+
+    por_dia = {
+        fila['dia']: fila['importe']
+        for fila in entregadas.values('dia').annotate(importe=Sum('importe')).order_by('dia')
+    }
+    # Contando días desde 'desde': sumar un día a 9999-12-31 desbordaría
+    dias = []
+    for n in range((hasta - desde).days + 1):
+        dia = desde + timedelta(days=n)
+        dias.append({'dia': dia, 'importe': por_dia.get(dia, Decimal('0.00'))})
+
+    productos = list(
+        entregadas.values('producto_id', nombre=F('producto__nombre'))
+        .annotate(unidades=Sum('cantidad'), importe=Sum('importe'))
+        .order_by('-importe')[:10]
+    )
+    categorias = list(
+        entregadas.values('categoria_id', nombre=F('categoria__nombre'))
+        .annotate(unidades=Sum('cantidad'), importe=Sum('importe'))
+        .order_by('-importe')
+    )
+    por_tipo = {
+        fila['tipo']: fila['importe']
+        for fila in entregadas.values('tipo').annotate(importe=Sum('importe')).order_by()
+    }
+
+    return {
+        'desde': desde,
+        'hasta': hasta,
+        'importe': totales['importe'],
+        'unidades': totales['unidades'],
+        'cancelado': cancelado,
+        'por_dia': dias,
+        'productos': productos,
+        'categorias': categorias,
+        'por_tipo': por_tipo,
+    }
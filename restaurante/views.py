@@ -1,18 +1,26 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.db import transaction
 from django.contrib import messages
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 
 from .models import Pedido, Producto
 from .forms import PedidoForm, DetallePedidoFormSet
+from .pedidos import acabecera, acargar_detalles, acargar_pedido, cargar_pedido
 
 from .models import Categoria, Producto
 from .forms import CategoriaForm, ProductoForm
+from . import analitica, api_pedidos, archivo, busqueda, condicional, escritura, estados, eventos, exportacion, impresion, metricas, tickets, ventas
+from .catalogo import obtener_catalogo
 
 # ----- Categoría -----
 def lista_categorias(request):
     categorias = Categoria.objects.all()
-    return render(request, 'categorias/lista_categorias.html', {'categorias': categorias})
+    version = condicional.version(request, categorias)
+    no_modificado = version.no_modificado(request)
+    if no_modificado is not None:
+        return no_modificado
+    return version.marcar(render(request, 'categorias/lista_categorias.html', {'categorias': categorias}))
 
 def crear_categoria(request):
     if request.method == "POST":
@@ -27,8 +35,26 @@ def crear_categoria(request):
 
 # ----- Producto -----
 def lista_productos(request):
-    productos = Producto.objects.all()
-    return render(request, 'productos/lista_productos.html', {'productos': productos})
+    catalogo = obtener_catalogo()
+    # La versión sale del catálogo en memoria: con la copia al día, 304 sin consultas
+    version = condicional.Version(request, catalogo.modificacion)
+    no_modificado = version.no_modificado(request)
+    if no_modificado is not None:
+        return no_modificado
+    return version.marcar(render(request, 'productos/lista_productos.html', {'productos': catalogo.productos}))
+
+def buscar_productos(request):
+    # Búsqueda del formulario de pedidos (?q=): productos activos por relevancia,
+    # así la página no carga el menú entero en cada selector
+    try:
+        limite = max(1, min(int(request.GET.get('limite', busqueda.LIMITE)), 50))
+    except ValueError:
+        limite = busqueda.LIMITE
+    resultados = [
+        {'id': p.id, 'nombre': p.nombre, 'precio': p.precio, 'categoria': p.categoria_nombre}
+        for p in busqueda.buscar(request.GET.get('q', ''), limite)
+    ]
+    return JsonResponse({'resultados': resultados})
 
 def gestionar_producto(request, pk=None):
 
@@ -73,15 +99,21 @@ def eliminar_producto(request, pk):
     
     return render(request, 'productos/confirmar_eliminar.html', {'producto': producto})
 
+import asyncio
+import json
 import logging
 
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
 
 logger = logging.getLogger(__name__)
 
 # ----- Pedido -----
 def crear_pedido(request):
-    productos = Producto.objects.filter(activo=True)
-
     if request.method == 'POST':
         form = PedidoForm(request.POST)
 
@@ -95,25 +127,20 @@ def crear_pedido(request):
 
         if form.is_valid() and is_fs_valid:
             try:
-                with transaction.atomic():
-                    pedido.save()
-
-                    detalles = formset.save(commit=False)
-                    detalles_validos = [det for det in detalles if getattr(det, 'producto', None)]
-
-                    if not detalles_validos:
-                        messages.error(request, "Debe agregar al menos un producto al pedido.")
-                        raise ValueError("No hay productos en el pedido")
+                detalles = formset.save(commit=False)
+                detalles_validos = [det for det in detalles if getattr(det, 'producto', None)]
 
-                    for det in detalles_validos:
-                        det.pedido = pedido
-                        det.save()
+                if not detalles_validos:
+                    messages.error(request, "Debe agregar al menos un producto al pedido.")
+                    raise ValueError("No hay productos en el pedido")
 
-                    for det_del in formset.deleted_objects:
-                        det_del.delete()
+                # Fuera de atomic(): con ESCRITURA_LOTE el pedido se confirma
+                # junto con los de otras peticiones (restaurante/escritura.py).
+                # Al confirmar se avisa a cocina y se genera el ticket.
+                escritura.guardar(pedido, detalles_validos)
 
-                    messages.success(request, f"Pedido #{pedido.id} creado correctamente. Total: Bs{pedido.total}")
-                    return redirect(reverse('detalle_pedido', args=[pedido.id]))
+                messages.success(request, f"Pedido #{pedido.id} creado correctamente. Total: Bs{pedido.total}")
+                return redirect(reverse('detalle_pedido', args=[pedido.id]))
 
             except Exception as e:
                 # Registrar el error y mostrar mensaje al usuario
@@ -133,123 +160,451 @@ def crear_pedido(request):
     return render(request, 'pedidos/order_form.html', {
         'form': form,
         'formset': formset,
-        'productos': productos,
         'is_create': True,
     })
 
 
+@csrf_exempt
+@require_POST
+def recibir_pedidos(request):
+    # API de los terminales de venta (restaurante/api_pedidos.py). Sin sesión ni
+    # cookie CSRF; sólo se acepta JSON, que un formulario de otro sitio no puede
+    # enviar sin pasar por CORS.
+    if request.content_type != 'application/json':
+        return JsonResponse({'error': "Se espera Content-Type: application/json"}, status=415)
+    try:
+        datos = api_pedidos.leer_lote(request.body)
+    except api_pedidos.ErrorLote as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    resultados = api_pedidos.registrar_lote(datos)
+    creados = any(r['estado'] == api_pedidos.CREADO for r in resultados)
+    return JsonResponse({'resultados': resultados}, status=201 if creados else 200)
+
+
 def cambiar_estado_pedido(request, pk):
     pedido = get_object_or_404(Pedido, pk=pk)
 
     if request.method == "POST":
         nuevo_estado = request.POST.get("nuevo_estado")
-        if nuevo_estado in [Pedido.Estado.ENTREGADO, Pedido.Estado.CANCELADO]:
-            pedido.estado = nuevo_estado
-            pedido.save()
-            messages.success(request, f"Estado actualizado a {nuevo_estado}")
-        else:
+        try:
+            cambiados = estados.cambiar_estado([pedido.pk], nuevo_estado, request.user)
+        except estados.TransicionInvalida:
             messages.error(request, "Estado no válido")
+        else:
+            if cambiados:
+                messages.success(request, f"Estado actualizado a {nuevo_estado}")
+            else:
+                # Otro usuario lo cambió antes o la transición no está permitida
+                pedido.refresh_from_db(fields=['estado'])
+                messages.error(
+                    request, f"El pedido #{pedido.id} está {pedido.get_estado_display()} y no puede pasar a {nuevo_estado}"
+                )
 
     return redirect('lista_pedidos')
 
+
+@require_POST
+def cambiar_estado_lote(request):
+    # Varios pedidos a la vez (p. ej. desde la pantalla de cocina); responde con
+    # los que cambiaron y los que no, que ya estaban en otro estado o no existen
+    try:
+        pks = [int(pk) for pk in request.POST.getlist('pedidos')]
+        cambiados = estados.cambiar_estado(pks, request.POST.get('nuevo_estado'), request.user)
+    except (ValueError, estados.TransicionInvalida):
+        return JsonResponse({'error': "Pedidos o estado no válidos"}, status=400)
+    ids = [pedido.pk for pedido in cambiados]
+    return JsonResponse({'cambiados': ids, 'rechazados': [pk for pk in dict.fromkeys(pks) if pk not in ids]})
+
 # views.py
-def detalle_pedido(request, pk):
-    pedido = get_object_or_404(Pedido, pk=pk)
+# Vistas de lectura asíncronas: bajo ASGI no ocupan un hilo por petición mientras
+# esperan a la base. Todo lo que usan las plantillas llega precargado, porque
+# renderizar no puede hacer consultas dentro del event loop.
+async def detalle_pedido(request, pk):
+    es_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    # La cabecera trae la versión de la página: con la que ya tiene el navegador,
+    # 304 con esa sola consulta; si no, las líneas en la segunda
+    pedido = await acabecera(pk)
+    if pedido is None:
+        # Archivado (se renderiza siempre) o inexistente (404)
+        version = condicional.Version(request, {'filas': 0}, es_ajax)
+        pedido = await acargar_pedido(pk)
+    else:
+        version = condicional.Version(request, {
+            'filas': pedido.lineas, 'pedido': pedido.actualizado, 'productos': pedido.productos_actualizado,
+        }, es_ajax)
+        no_modificado = version.no_modificado(request)
+        if no_modificado is not None:
+            return no_modificado
+        await acargar_detalles(pedido)
     # Si es una petición AJAX, devolvemos un template pequeño sin el "extends base.html"
-    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return render(request, 'pedidos/includes/modal_detalle_body.html', {'pedido': pedido})
-    # Si entran directo por URL, se ve la página normal
-    return render(request, 'pedidos/order_detail.html', {'pedido': pedido})
+    if es_ajax:
+        response = render(request, 'pedidos/includes/modal_detalle_body.html', {'pedido': pedido})
+    else:
+        # Si entran directo por URL, se ve la página normal
+        response = render(request, 'pedidos/order_detail.html', {'pedido': pedido})
+    patch_vary_headers(response, ['X-Requested-With'])
+    return version.marcar(response)
 
 
 from django.db.models import F, Sum, DecimalField 
 from .models import Pedido 
 
 from django.utils import timezone
-from django.db.models import Sum
-from datetime import datetime, time
-
-def lista_pedidos(request):
-  
-    estado_filtro = request.GET.get('estado')
-    tipo_filtro = request.GET.get('tipo')
-    fecha_desde = request.GET.get('desde')
-    fecha_hasta = request.GET.get('hasta')
-    solo_hoy = request.GET.get('hoy') == 'true'
-   
-    qs = Pedido.objects.all().order_by('-fecha')
+from django.db.models import Q, Sum
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from datetime import date, datetime, time, timedelta
+import base64
+from itertools import islice
+
+PEDIDOS_POR_PAGINA = 50
+# Marca que separa la cabecera y el pie de la página en modo streaming
+MARCA_FILAS = '<!--filas-pedidos-->'
+
+
+def rango_de_fechas(desde, hasta):
+    # Días completos en la zona horaria configurada (TIME_ZONE), fin excluido
+    inicio = timezone.make_aware(datetime.combine(desde, time.min))
+    fin = timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+def filtrar_pedidos(params):
+    estado_filtro = params.get('estado')
+    tipo_filtro = params.get('tipo')
+    fecha_desde = params.get('desde')
+    fecha_hasta = params.get('hasta')
+    solo_hoy = params.get('hoy') == 'true'
+
+    qs = Pedido.objects.all().order_by('-fecha', '-id')
+    inicio = None
     
+    # Las fechas se convierten a un rango [inicio, fin) de datetimes para que
+    # la consulta compare la columna directamente y pueda usar los índices
     if solo_hoy:
-        hoy = timezone.now().date()
-       
-        qs = qs.filter(fecha__date=hoy)
+        hoy = timezone.localdate()
+        inicio, fin = rango_de_fechas(hoy, hoy)
+        qs = qs.filter(fecha__gte=inicio, fecha__lt=fin)
     elif fecha_desde and fecha_hasta:
-      
-        qs = qs.filter(fecha__date__range=[fecha_desde, fecha_hasta])
+        try:
+            inicio, fin = rango_de_fechas(date.fromisoformat(fecha_desde), date.fromisoformat(fecha_hasta))
+        except ValueError:
+            # Fechas mal formadas: se ignora el filtro en lugar de fallar
+            pass
+        else:
+            qs = qs.filter(fecha__gte=inicio, fecha__lt=fin)
 
     if estado_filtro and estado_filtro != 'TODOS':
         qs = qs.filter(estado=estado_filtro)
 
     if tipo_filtro and tipo_filtro != 'TODOS':
         qs = qs.filter(tipo=tipo_filtro)
-    
-    total_registros = qs.count()
 
-    pedidos_entregados = qs.filter(estado='ENTREGADO')
-    
-   
-    ganancia_solo_entregados = sum(p.total for p in pedidos_entregados)
-    
-   
-    context = {
-        'pedidos': qs,
-        'estados_choices': Pedido.Estado.choices,
-        'tipos_choices': Pedido.TipoPedido.choices,
+    filtros = {
         'estado_seleccionado': estado_filtro or 'TODOS',
         'tipo_seleccionado': tipo_filtro or 'TODOS',
         'fecha_desde': fecha_desde,
         'fecha_hasta': fecha_hasta,
         'es_hoy': solo_hoy,
+        # Para repartir la consulta con la base de archivo (None = sin límite)
+        'inicio': inicio,
+    }
+    return qs, filtros
+
+
+# ----- Paginación por cursor (keyset) sobre (fecha, id) -----
+def codificar_cursor(pedido):
+    valor = f"{pedido.fecha.isoformat()}|{pedido.id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        fecha, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        # Un cursor corrupto simplemente vuelve a la primera página
+        return None
+
+
+def despues_del_cursor(qs, cursor):
+    posicion = decodificar_cursor(cursor) if cursor else None
+    if posicion is None:
+        return qs
+    fecha, pk = posicion
+    return qs.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk))
+
+
+def url_con_parametros(request, **cambios):
+    # Conserva los filtros actuales y reemplaza/quita (valor None) los indicados
+    params = request.GET.copy()
+    for clave, valor in cambios.items():
+        params.pop(clave, None)
+        if valor is not None:
+            params[clave] = valor
+    return f"?{params.urlencode()}"
+
+
+async def lista_pedidos(request):
+    qs, filtros = filtrar_pedidos(request.GET)
+
+    # Cantidad y última modificación de los pedidos filtrados en una consulta:
+    # sin cambios, 304 antes de sumar, paginar o renderizar
+    version = await condicional.aversion(request, qs)
+    no_modificado = version.no_modificado(request)
+    if no_modificado is not None:
+        return no_modificado
+    # Si el rango llega a días archivados la consulta se repite en el archivo
+    # (restaurante/archivo.py). La versión sólo mira la base principal: lo
+    # archivado no cambia y archivar borra de la principal, lo que ya la cambia.
+    consultas = await archivo.aconsultas(qs, filtros['inicio'])
+    total_registros = version.filas + sum([await consulta.acount() for consulta in consultas[1:]])
+
+    # Ganancia de los entregados en una sola consulta agregada (por base)
+    ganancia_solo_entregados = sum([
+        await consulta.filter(estado=Pedido.Estado.ENTREGADO).aingresos() for consulta in consultas
+    ])
+    
+   
+    context = {
+        'estados_choices': Pedido.Estado.choices,
+        'tipos_choices': Pedido.TipoPedido.choices,
         'total_registros': total_registros,
         'ganancia_total': ganancia_solo_entregados, 
+        **filtros,
     }
+
+    # Para rangos grandes se puede pedir la tabla completa en streaming (?stream=1)
+    if request.GET.get('stream') == '1' and total_registros:
+        return version.marcar(lista_pedidos_streaming(request, consultas, context))
+
+    cursor = request.GET.get('cursor')
+    paginas = [
+        [p async for p in despues_del_cursor(consulta, cursor)[:PEDIDOS_POR_PAGINA + 1]] for consulta in consultas
+    ]
+    pagina = list(islice(archivo.mezclar(paginas), PEDIDOS_POR_PAGINA + 1))
+    hay_mas = len(pagina) > PEDIDOS_POR_PAGINA
+    pagina = pagina[:PEDIDOS_POR_PAGINA]
+
+    context.update({
+        'pedidos': pagina,
+        'url_primera': url_con_parametros(request, cursor=None) if cursor else None,
+        'url_siguiente': url_con_parametros(request, cursor=codificar_cursor(pagina[-1])) if hay_mas else None,
+        'url_streaming': url_con_parametros(request, cursor=None, stream='1'),
+        'parametros_exportar': url_con_parametros(request, cursor=None, stream=None),
+    })
     
-    return render(request, 'pedidos/listar_pedidos.html', context)
+    return version.marcar(render(request, 'pedidos/listar_pedidos.html', context))
+
+
+def lista_pedidos_streaming(request, consultas, context):
+    # Renderizamos la página sin filas y la partimos en la marca: la cabecera sale
+    # de inmediato y las filas se envían a medida que se leen de la base
+    pagina = render_to_string('pedidos/listar_pedidos.html', {**context, 'streaming': True}, request)
+    cabecera, pie = pagina.split(MARCA_FILAS, 1)
+    fila = get_template('pedidos/includes/fila_pedido.html')
+
+    async def generar():
+        yield cabecera
+        bloque = []
+        async for pedido in archivo.amezclar(consultas, chunk_size=500):
+            bloque.append(fila.render({'pedido': pedido}))
+            if len(bloque) == 100:
+                yield ''.join(bloque)
+                bloque = []
+        if bloque:
+            yield ''.join(bloque)
+        yield pie
+
+    return StreamingHttpResponse(generar(), content_type='text/html; charset=utf-8')
+
+
+FORMATOS_EXPORTACION = {
+    'csv': (exportacion.generar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (exportacion.generar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+async def exportar_pedidos(request, formato):
+    # Mismos filtros que la lista; ?detalle=lineas exporta una fila por producto vendido
+    if formato not in FORMATOS_EXPORTACION:
+        raise Http404("Formato de exportación desconocido")
+    generar, tipo_contenido = FORMATOS_EXPORTACION[formato]
+    qs, filtros = filtrar_pedidos(request.GET)
+
+    if request.GET.get('detalle') == 'lineas':
+        nombre, columnas, generar_filas = 'ventas', exportacion.COLUMNAS_LINEAS, exportacion.filas_lineas
+    else:
+        nombre, columnas, generar_filas = 'pedidos', exportacion.COLUMNAS_PEDIDOS, exportacion.filas_pedidos
+    # Las filas de la base principal y del archivo, unidas por (fecha, pedido)
+    filas = archivo.mezclar(
+        [generar_filas(consulta) for consulta in await archivo.aconsultas(qs, filtros['inicio'])],
+        clave=lambda fila: (fila[1], fila[0]),
+    )
+
+    if filtros['es_hoy']:
+        nombre += f"_{timezone.localdate().isoformat()}"
+    elif filtros['fecha_desde'] and filtros['fecha_hasta']:
+        try:
+            desde, hasta = date.fromisoformat(filtros['fecha_desde']), date.fromisoformat(filtros['fecha_hasta'])
+        except ValueError:
+            pass
+        else:
+            nombre += f"_{desde.isoformat()}_{hasta.isoformat()}"
+
+    # Las consultas corren tramo a tramo en el hilo de la petición (ver en_tramos)
+    response = StreamingHttpResponse(exportacion.en_tramos(generar(columnas, filas)), content_type=tipo_contenido)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
+
 
 def login_view(request):
     return render(request, 'login.html')
 
 def home(request):
-    return render(request, 'dashboard.html')
-
-
+    hoy = timezone.localdate()
+    resumen = ventas.resumen_ventas(hoy.replace(day=1), hoy)
+
+    # Anchos relativos para las barras del tablero
+    maximo_dia = max((d['importe'] for d in resumen['por_dia']), default=0) or 1
+    for d in resumen['por_dia']:
+        d['porcentaje'] = round(d['importe'] * 100 / maximo_dia)
+    maximo_producto = resumen['productos'][0]['importe'] if resumen['productos'] else 1
+    for p in resumen['productos']:
+        p['porcentaje'] = round(p['importe'] * 100 / maximo_producto)
+
+    return render(request, 'dashboard.html', {'resumen': resumen})
+
+
+def datos_dashboard(request):
+    hoy = timezone.localdate()
+    try:
+        desde = date.fromisoformat(request.GET['desde']) if request.GET.get('desde') else hoy.replace(day=1)
+        hasta = date.fromisoformat(request.GET['hasta']) if request.GET.get('hasta') else hoy
+    except ValueError:
+        return JsonResponse({'error': "Fechas inválidas, use AAAA-MM-DD"}, status=400)
+    if (hasta - desde).days >= ventas.DIAS_MAXIMOS:
+        return JsonResponse({'error': f"El rango no puede superar {ventas.DIAS_MAXIMOS} días"}, status=400)
+
+    resumen = ventas.resumen_ventas(desde, hasta)
+    return JsonResponse({
+        'desde': desde,
+        'hasta': hasta,
+        'importe': resumen['importe'],
+        'unidades': resumen['unidades'],
+        'cancelado': resumen['cancelado'],
+        'por_dia': resumen['por_dia'],
+        'por_tipo': resumen['por_tipo'],
+        'productos': resumen['productos'],
+        'categorias': resumen['categorias'],
+    })
 
-from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
-from .models import Pedido
 
 def exportar_ticket_pdf(request, pk):
-    pedido = get_object_or_404(Pedido, pk=pk)
-    template_path = 'pedidos/ticket_pdf.html'
-    context = {'pedido': pedido}
-    
-    # Creamos el objeto de respuesta de Django y definimos el tipo de contenido como PDF
-    response = HttpResponse(content_type='application/pdf')
-    
+    pedido = cargar_pedido(pk)
+    ticket = tickets.Ticket(pedido)
+
+    # Si el navegador ya tiene esta versión del ticket, 304 sin tocar el PDF
+    no_modificado = get_conditional_response(request, etag=ticket.etag)
+    if no_modificado is not None:
+        return no_modificado
+
+    try:
+        ruta = ticket.generar()
+    except tickets.TicketNoDisponible:
+        # El pool no lo terminó a tiempo o se cayó: el PDF sigue en camino (o
+        # se vuelve a pedir a un pool nuevo), así que se pide reintentar
+        logger.warning("Ticket del pedido #%s no disponible", pedido.id, exc_info=True)
+        response = HttpResponse("El ticket se está generando, intente de nuevo en unos segundos.", status=503)
+        response['Retry-After'] = '5'
+        return response
+    except tickets.ErrorTicket:
+        logger.exception("Error al generar el ticket del pedido #%s", pedido.id)
+        return HttpResponse('Error al generar el ticket <pre>' + ticket.html + '</pre>')
+
     # 'inline' hace que se abra en el navegador. 'attachment' obligaría a la descarga.
+    response = FileResponse(open(ruta, 'rb'), content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="ticket_{pedido.id}.pdf"'
-    
-    # Buscamos el template y lo renderizamos con el contexto
-    template = get_template(template_path)
-    html = template.render(context)
+    response['ETag'] = ticket.etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def exportar_ticket_termico(request, pk):
+    pedido = cargar_pedido(pk)
+    ancho = 32 if request.GET.get('papel') == '58' else impresion.ANCHO
+
+    # Bytes listos para enviar a la impresora (ESC/POS) o texto plano de ancho fijo
+    if request.GET.get('formato') == 'escpos':
+        response = HttpResponse(impresion.ticket_escpos(pedido, ancho), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="ticket_{pedido.id}.bin"'
+        return response
+    return HttpResponse(impresion.ticket_texto(pedido, ancho), content_type='text/plain; charset=utf-8')
+
+
+# ----- Cocina -----
+def pantalla_cocina(request):
+    pedidos = (
+        Pedido.objects.filter(estado__in=[Pedido.Estado.PENDIENTE, Pedido.Estado.PREPARANDO])
+        .con_detalles()
+        .order_by('fecha', 'id')
+    )
+    return render(request, 'pedidos/cocina.html', {'pedidos': pedidos})
+
+
+HORAS_ANALITICA = (8, 24, 72, 168)
+
+
+def analitica_cocina(request):
+    try:
+        horas = min(max(int(request.GET.get('horas', 24)), 1), max(HORAS_ANALITICA))
+    except ValueError:
+        horas = 24
+    resumen = analitica.resumen_cocina(horas)
+    if request.GET.get('formato') == 'json':
+        return JsonResponse(resumen)
+    return render(request, 'pedidos/analitica.html', {
+        'resumen': resumen,
+        'opciones_horas': HORAS_ANALITICA,
+        'media_movil': analitica.MEDIA_MOVIL,
+    })
 
-    # Creamos el PDF
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    
-    # Si hay errores, los mostramos
-    if pisa_status.err:
-       return HttpResponse('Error al generar el ticket <pre>' + html + '</pre>')
-    
-    return response
\ No newline at end of file
+
+async def eventos_cocina(request):
+    # Server-sent events: requiere servir el proyecto por ASGI (administrador/asgi.py).
+    # Bajo WSGI (runserver) el flujo infinito ocuparía un hilo para siempre:
+    # se responde 501 y la pantalla queda sin actualización en vivo
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "La cocina en vivo requiere servir el proyecto por ASGI (ver administrador/asgi.py).",
+            status=501, content_type='text/plain; charset=utf-8',
+        )
+    canal = eventos.obtener_canal()
+
+    async def flujo():
+        yield 'retry: 3000\n\n'
+        async with canal.suscripcion() as cola:
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Comentario SSE para que proxies y navegadores no corten la conexión
+                    yield ': ping\n\n'
+                    continue
+                datos = json.dumps(evento, cls=DjangoJSONEncoder)
+                yield f"event: {evento['tipo']}\ndata: {datos}\n\n"
+
+    response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ----- Métricas -----
+@staff_member_required
+def ver_metricas(request):
+    if request.GET.get('formato') == 'prometheus':
+        return HttpResponse(
+            metricas.registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+    return JsonResponse({'vistas': metricas.registro.resumen()})